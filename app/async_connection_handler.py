@@ -0,0 +1,417 @@
+import asyncio
+import threading
+from typing import List, Optional, Tuple
+from PyQt5 import QtCore
+from app import framing
+from app.connection_handler import ConnectionHandler
+
+
+class AsyncConnectionHandler(ConnectionHandler):
+    """
+    Класс обработчика соединения на основе asyncio.
+
+    Ожидание подключения, подключение, запрос на подключение, обмен ключами и обмен сообщениями
+    выполняются сопрограммами в цикле событий, работающем в потоке обработчика (метод run).
+    Сигналы, состояния и методы управления совпадают с ConnectionHandler,
+    вызовы из потока интерфейса передаются в цикл событий через call_soon_threadsafe.
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.loop = None
+        self.loop_ready = threading.Event()
+        self.async_commands = None
+        self.operation = None
+        self.server = None
+        self.reader = None
+        self.writer = None
+        self.decision = None
+
+    def call(self, callback, *args) -> None:
+        """
+        Метод потокобезопасного вызова функции в цикле событий.
+
+        :param callback: callable, вызываемая функция
+        :param args: аргументы функции
+        :return: None
+        """
+
+        self.loop_ready.wait()
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback, *args)
+
+    def post_command(self, command: str, args) -> None:
+        """
+        Метод постановки команды в очередь цикла событий.
+
+        :param command: str, команда
+        :param args: аргументы команды
+        :return: None
+        """
+
+        self.call(lambda: self.async_commands.put_nowait((command, args)))
+
+    def post_decision(self, decision: str) -> None:
+        """
+        Метод передачи решения пользователя по входящему запросу сопрограмме согласования.
+
+        :param decision: str, решение (apply/reject)
+        :return: None
+        """
+
+        def resolve():
+            if self.decision is not None and not self.decision.done():
+                self.decision.set_result(decision)
+
+        self.call(resolve)
+
+    @QtCore.pyqtSlot()
+    def run(self) -> None:
+        """
+        Метод запуска потока обработчика.
+
+        Создаёт цикл событий и выполняет в нём сопрограмму dispatcher до получения команды stop.
+
+        :return: None
+        """
+
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.async_commands = asyncio.Queue()
+        self.loop_ready.set()
+        try:
+            self.loop.run_until_complete(self.dispatcher())
+        finally:
+            for task in asyncio.all_tasks(self.loop):
+                task.cancel()
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+
+    async def dispatcher(self) -> None:
+        """
+        Сопрограмма выполнения команд.
+
+        Как и метод run синхронного обработчика, выполняет команды по одной
+        и после завершения каждой возвращает обработчик в состояние idle.
+
+        :return: None
+        """
+
+        while True:
+            command, args = await self.async_commands.get()
+            if command == self.STOP_COMMAND:
+                self.set_state(state=self.CLOSING_STATE)
+                break
+            if command == self.LISTEN_COMMAND:
+                self.ip, self.port = args
+                self.operation = self.loop.create_task(self.server_waiting_async())
+            elif command == self.CONNECT_COMMAND:
+                self.companion = args
+                self.operation = self.loop.create_task(self.connect_to_async(_to=args))
+            else:
+                continue
+            await asyncio.wait([self.operation])
+            if self.is_chatting:
+                self.operation = self.loop.create_task(self.chatting_async())
+                await asyncio.wait([self.operation])
+            self.operation = None
+            self.set_state(state=self.IDLE_STATE)
+
+    async def server_waiting_async(self) -> None:
+        """
+        Сопрограмма открытия сервера и ожидания подтверждённого подключения.
+
+        Подключение с собственного IP-адреса закрывает сервер (см. KuznechikChatApp.disconnect_myself),
+        подключения во время обработки другого запроса сразу закрываются.
+
+        :return: None
+        """
+
+        self.role = self.SERVER
+        accepted = self.loop.create_future()
+
+        async def on_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            address = writer.get_extra_info('peername')
+            if address[0] == self.ip:
+                writer.close()
+                if not accepted.done():
+                    accepted.set_result(False)
+                return
+            if self.writer is not None or accepted.done():
+                writer.close()
+                return
+            self.reader, self.writer, self.companion = reader, writer, address
+            self.set_state(state=self.HANDSHAKING_STATE)
+            if await self.request_and_response_async():
+                self.set_state(state=self.CHATTING_STATE)
+                self.CONN_SUCCESS_SIGNAL.emit()
+                if not accepted.done():
+                    accepted.set_result(True)
+                return
+            self.set_state(state=self.LISTENING_STATE)
+            writer.close()
+            self.reader, self.writer, self.companion = None, None, None
+
+        try:
+            self.server = await asyncio.start_server(on_connection, self.ip, self.port, reuse_address=True)
+        except OSError:
+            self.SERVER_ERROR_SIGNAL.emit()
+            return
+        self.set_state(state=self.LISTENING_STATE)
+        self.SERVER_SUCCESS_SIGNAL.emit()
+        try:
+            await accepted
+        finally:
+            self.server.close()
+            self.server = None
+
+    async def connect_to_async(self, _to: Tuple[str, int]) -> None:
+        """
+        Сопрограмма подключения к серверу и отправки запроса на подключение.
+
+        :param _to: tuple, кортеж (IP-адрес, порт)
+        :return: None
+        """
+
+        self.role = self.CLIENT
+        self.set_state(state=self.CONNECTING_STATE)
+        self.WAITING_CONN_SIGNAL.emit()
+        try:
+            self.reader, self.writer = await asyncio.wait_for(asyncio.open_connection(*_to),
+                                                              timeout=self.request_timeout)
+            self.set_state(state=self.HANDSHAKING_STATE)
+            if await self.request_and_response_async():
+                self.set_state(state=self.CHATTING_STATE)
+                self.CONN_SUCCESS_SIGNAL.emit()
+                return
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        self.close_writer()
+        self.CONN_ERROR_SIGNAL.emit()
+
+    async def receive_response_async(self) -> bytes:
+        """
+        Сопрограмма чтения ответа сервера на запрос подключения (OK, NOK или WAIT).
+
+        :return: bytes, ответ сервера
+        """
+
+        first = await self.reader.readexactly(1)
+        for response in self.RESPONSES:
+            if first == response[:1]:
+                return first + await self.reader.readexactly(len(response) - 1)
+        return b''
+
+    async def wait_for_decision_async(self) -> Optional[str]:
+        """
+        Сопрограмма ожидания решения пользователя по входящему запросу.
+
+        Параллельно с ожиданием читает сокет, чтобы сразу обнаружить отключение клиента,
+        и раз в keepalive_interval секунд отправляет клиенту сообщение WAIT.
+
+        :return: str, решение (apply/reject) или None, если клиент отключился
+        """
+
+        deadline = self.loop.time() + self.request_timeout
+        watcher = self.loop.create_task(self.reader.read(self.RECV_BUFFER_SIZE))
+        try:
+            while True:
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    return self.REJECT_DECISION
+                timeout = min(remaining, self.keepalive_interval) if self.keepalive_interval else remaining
+                done = (await asyncio.wait([self.decision, watcher], timeout=timeout,
+                                           return_when=asyncio.FIRST_COMPLETED))[0]
+                if self.decision in done:
+                    return self.decision.result()
+                if watcher in done:
+                    if not watcher.result():
+                        return None
+                    watcher = self.loop.create_task(self.reader.read(self.RECV_BUFFER_SIZE))
+                elif self.keepalive_interval:
+                    self.writer.write(self.WAIT_RESPONSE)
+                    await self.writer.drain()
+        finally:
+            watcher.cancel()
+
+    async def request_and_response_async(self) -> bool:
+        """
+        Сопрограмма обработки входящего/исходящего запроса на подключение.
+
+        Протокол совпадает с ConnectionHandler.request_and_response.
+
+        :return: bool, принят ли запрос на подключение
+        """
+
+        try:
+            if self.role == self.CLIENT:
+                self.writer.write(self.REQUEST_MESSAGE)
+                await self.writer.drain()
+                while True:
+                    response = await asyncio.wait_for(self.receive_response_async(), timeout=self.request_timeout)
+                    if response != self.WAIT_RESPONSE:
+                        return response == self.OK_RESPONSE
+            request = await asyncio.wait_for(self.reader.readexactly(len(self.REQUEST_MESSAGE)),
+                                             timeout=self.request_timeout)
+            if request != self.REQUEST_MESSAGE:
+                return False
+            self.decision = self.loop.create_future()
+            self.GOT_REQUEST_SIGNAL.emit()
+            decision = await self.wait_for_decision_async()
+            self.decision = None
+            if decision == self.APPLY_DECISION:
+                self.writer.write(self.OK_RESPONSE)
+                await self.writer.drain()
+                return True
+            self.REQUEST_CANCELLED_SIGNAL.emit()
+            if decision is not None:
+                self.writer.write(self.NOK_RESPONSE)
+                await self.writer.drain()
+            return False
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+            if self.role == self.SERVER:
+                self.decision = None
+                self.REQUEST_CANCELLED_SIGNAL.emit()
+            return False
+
+    async def receive_frames_async(self) -> None:
+        """
+        Сопрограмма чтения очередной порции данных и разбора её на кадры.
+
+        :return: None
+        """
+
+        data = await self.reader.read(self.RECV_BUFFER_SIZE)
+        if not data:
+            raise ConnectionResetError
+        self.frames.extend(self.decoder.feed(data))
+
+    async def masterkey_exchange_async(self) -> Tuple[str, List[str]]:
+        """
+        Сопрограмма формирования мастер-ключа.
+
+        :return: tuple, (мастер-ключ длиной 256 бит, список режимов шифрования собеседника)
+        """
+
+        my_secret, my_open = self.session.create_open_key(address=self.writer.get_extra_info('sockname'))
+        self.writer.write(framing.encode_frame(frame_type=framing.KEY_FRAME, payload=my_open))
+        await self.writer.drain()
+        while True:
+            while self.frames:
+                frame = self.frames.popleft()
+                if frame.type == framing.KEY_FRAME:
+                    return self.session.compute_master(secret=my_secret, companion_open=frame.payload)
+            await self.receive_frames_async()
+
+    async def chatting_async(self) -> None:
+        """
+        Сопрограмма обмена сообщениями.
+
+        :return: None
+        """
+
+        self.decoder = framing.FrameDecoder()
+        self.frames.clear()
+        self.session = self.create_session()
+        try:
+            hex_master, companion_modes = await self.masterkey_exchange_async()
+            self.session.start(hex_master=hex_master, companion_modes=companion_modes)
+        except (OSError, ValueError, IndexError):
+            self.disconnect()
+            self.DISCONNECTED_COMPANION_SIGNAL.emit()
+            return
+        self.start_sender()
+        while self.is_chatting:
+            try:
+                if not self.frames:
+                    await self.receive_frames_async()
+                    continue
+                self.handle_frame(frame=self.frames.popleft())
+            except Exception:
+                if self.is_chatting:
+                    self.disconnect()
+                    self.DISCONNECTED_COMPANION_SIGNAL.emit()
+
+    async def write_async(self, data: bytes) -> None:
+        """
+        Сопрограмма записи данных в соединение с ожиданием освобождения буфера записи.
+
+        :param data: bytes, данные
+        :return: None
+        """
+
+        if self.writer is None or self.writer.is_closing():
+            raise ConnectionResetError
+        self.writer.write(data)
+        await self.writer.drain()
+
+    def send_many(self, messages: List[str]) -> List[str]:
+        """
+        Метод отправки нескольких сообщений одной записью в соединение.
+
+        Сообщения шифруются в вызывающем потоке, запись выполняется в цикле событий.
+        Вызывающий поток (поток отправки, но не поток цикла событий) блокируется,
+        пока буфер записи не освободится, поэтому медленный собеседник создаёт обратное давление.
+        Длинное сообщение записывается по мере шифрования порциями (см. ChatSession.encode_message_stream).
+        Сообщения, которые нельзя передать одним кадром, не отправляются, остальные отправляются.
+
+        :param messages: list, тексты отправляемых сообщений
+        :return: list, неотправленные сообщения, превышающие максимальную длину кадра
+        """
+
+        if self.writer is None:
+            raise ConnectionResetError
+        self.loop_ready.wait()
+        rejected = []
+        for data in self.session.iterate_writes(messages=messages, rejected=rejected):
+            asyncio.run_coroutine_threadsafe(self.write_async(data=data), self.loop).result()
+        return rejected
+
+    def close_writer(self) -> None:
+        """
+        Метод закрытия соединения (выполняется в цикле событий).
+
+        :return: None
+        """
+
+        if self.writer is not None:
+            self.writer.close()
+        self.reader, self.writer = None, None
+
+    def cancel_connection(self) -> None:
+        """
+        Метод отмены исходящего подключения.
+
+        :return: None
+        """
+
+        def cancel():
+            if self.is_connecting and self.operation is not None:
+                self.operation.cancel()
+
+        self.call(cancel)
+
+    def close_connection(self) -> None:
+        """
+        Метод закрытия соединения с собеседником до начала обмена сообщениями.
+
+        :return: None
+        """
+
+        self.call(self.close_writer)
+
+    def disconnect(self) -> None:
+        """
+        Метод закрытия подключения.
+
+        Сопрограмма обмена сообщениями, ожидающая данные, получает конец потока и завершается.
+
+        :return: None
+        """
+
+        self.set_state(state=self.CLOSING_STATE, expected=[self.CHATTING_STATE])
+        self.stop_sender()
+        if self.session:
+            self.session.stop()
+        self.call(self.close_writer)
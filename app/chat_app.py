@@ -1,8 +1,12 @@
 import os
 import socket
 import sys
-from typing import Tuple
+import time
+from typing import List, Tuple
+from app import history, search
+from app.async_connection_handler import AsyncConnectionHandler
 from app.connection_handler import ConnectionHandler
+from app.message_store import MessageStore, StoredMessage
 from app.windows.chat_window import ChatWindow
 from app.windows.main_window import MainWindow
 from app.windows.open_server_window import OpenServerWindow
@@ -31,16 +35,22 @@ class KuznechikChatApp(QtWidgets.QApplication):
 
     """
 
-    def __init__(self, *args, **kwargs):
+    DELIVERY_INTERVAL = 16
+    HISTORY_PAGE = 200
+
+    def __init__(self, *args, use_asyncio: bool = False, **kwargs):
         super().__init__(*args, **kwargs)
         self.setWindowIcon(QtGui.QIcon(resource_path('logo.ico')))
-        self.connection_handler = ConnectionHandler()
+        self.connection_handler = AsyncConnectionHandler() if use_asyncio else ConnectionHandler()
         self.main_window = MainWindow()
         self.open_port_window = OpenServerWindow()
         self.connect_window = ConnectWindow()
         self.request_dialog = RequestDialog()
         self.chat_window = ChatWindow()
         self.thread = QtCore.QThread()
+        self.delivery_timer = QtCore.QTimer()
+        self.history = None
+        self.search_index = None
         self.configure()
         self.main_window.show()
 
@@ -59,10 +69,18 @@ class KuznechikChatApp(QtWidgets.QApplication):
         self.connection_handler.CONN_SUCCESS_SIGNAL.connect(self.main_window.connection_success)
         self.connection_handler.CONN_ERROR_SIGNAL.connect(self.main_window.connection_error)
         self.connection_handler.GOT_REQUEST_SIGNAL.connect(self.show_request_dialog)
-        self.connection_handler.GET_MESSAGE_SIGNAL.connect(self.show_received_message)
+        self.connection_handler.REQUEST_CANCELLED_SIGNAL.connect(self.request_dialog.close)
+        self.connection_handler.GET_MESSAGE_SIGNAL.connect(self.schedule_delivery)
+        self.connection_handler.SENT_MESSAGE_SIGNAL.connect(self.show_sent_message)
+        self.connection_handler.SEND_ERROR_SIGNAL.connect(self.chat_window.show_send_error)
+        self.connection_handler.SEND_BACKPRESSURE_SIGNAL.connect(self.chat_window.set_send_blocked)
         self.connection_handler.DISCONNECTED_COMPANION_SIGNAL.connect(self.disconnected_companion)
         self.thread.started.connect(self.connection_handler.run)
         self.thread.start()
+        # Конфигурация таймера вывода полученных сообщений
+        self.delivery_timer.setSingleShot(True)
+        self.delivery_timer.setInterval(self.DELIVERY_INTERVAL)
+        self.delivery_timer.timeout.connect(self.show_received_message)
         # Конфигурация главного окна
         self.main_window.CLOSE_APP_SIGNAL.connect(self.close_app)
         self.main_window.SHOW_SERVER_SIGNAL.connect(self.show_server_window)
@@ -82,6 +100,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
         # Конфигурация окна чата
         self.chat_window.SEND_SIGNAL.connect(self.send_message)
         self.chat_window.DISCONNECT_SIGNAL.connect(self.disconnect_chat)
+        self.chat_window.SEARCH_SIGNAL.connect(self.search_history)
 
     def disconnect_myself(self) -> None:
         """
@@ -112,7 +131,8 @@ class KuznechikChatApp(QtWidgets.QApplication):
         if reply == QtWidgets.QMessageBox.Yes:
             if self.connection_handler.is_waiting:
                 self.disconnect_myself()
-            self.connection_handler.is_end = True
+            self.connection_handler.stop()
+            self.close_history()
             self.thread.exit()
             event.accept()
             self.closeAllWindows()
@@ -123,15 +143,13 @@ class KuznechikChatApp(QtWidgets.QApplication):
         """
         Метод для открытия серверного сокета.
 
-        Переводит обработчик соединения в режим прослушивания сокета.
+        Передаёт обработчику соединения команду перехода в режим прослушивания сокета.
 
         :param ip_port: tuple, кортеж (IP-адрес, порт)
         :return: None
         """
 
-        self.connection_handler.ip = ip_port[0]
-        self.connection_handler.port = ip_port[1]
-        self.connection_handler.is_waiting = True
+        self.connection_handler.start_server(ip=ip_port[0], port=ip_port[1])
 
     def server_is_opened(self) -> None:
         """
@@ -150,8 +168,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
         :return: None
         """
 
-        self.connection_handler.companion = data
-        self.connection_handler.is_connecting = True
+        self.connection_handler.start_connection(companion=data)
 
     def show_server_window(self) -> None:
         """
@@ -190,7 +207,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
         """
 
         if self.connection_handler.is_connecting:
-            self.connection_handler.socket.close()
+            self.connection_handler.cancel_connection()
         else:
             self.connect_window.is_connect = False
             self.connect_window.show()
@@ -202,8 +219,78 @@ class KuznechikChatApp(QtWidgets.QApplication):
         :return: None
         """
 
+        companion = self.connection_handler.companion
+        self.close_history()
+        try:
+            self.history = history.open_history(companion=companion[0])
+            self.search_index = search.open_index(path=self.history.path, key=history.load_local_key(),
+                                                  history=self.history)
+            previous = self.history.get_range(start=len(self.history) - self.HISTORY_PAGE, stop=len(self.history))
+        except (OSError, ValueError):
+            self.close_history()
+            previous = []
         self.chat_window.show()
-        self.chat_window.start_chatting(companion=self.connection_handler.companion)
+        self.chat_window.start_chatting(companion=companion, previous=previous)
+
+    def add_to_history(self, messages: List[StoredMessage]) -> None:
+        """
+        Метод добавления сообщений в историю переписки с текущим собеседником.
+
+        Шифрование и запись выполняются потоком истории, поэтому метод не блокирует интерфейс.
+        Сообщения сразу добавляются в поисковый индекс.
+        После ошибки записи истории (например, при нехватке места на диске) история закрывается.
+
+        :param messages: list, сообщения
+        :return: None
+        """
+
+        if self.history is not None:
+            try:
+                for message in messages:
+                    seq = self.history.append(message=message)
+                    if self.search_index is not None:
+                        self.search_index.add(seq=seq, text=message.text)
+            except OSError:
+                self.close_history()
+
+    def search_history(self, query: str) -> None:
+        """
+        Метод поиска по истории переписки с текущим собеседником.
+
+        :param query: str, поисковый запрос (слова ищутся по началу)
+        :return: None
+        """
+
+        if self.search_index is None or not query.strip():
+            return
+        seqs = self.search_index.search(query=query)
+        try:
+            self.history.flush()
+        except OSError:
+            self.close_history()
+            return
+        messages = []
+        for seq in seqs:
+            try:
+                messages.append(self.history.get(seq=seq))
+            except (IndexError, ValueError):
+                continue
+        self.chat_window.show_search_results(query=query, messages=messages)
+
+    def close_history(self) -> None:
+        """
+        Метод закрытия истории переписки с текущим собеседником и её поискового индекса.
+
+        :return: None
+        """
+
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+        if self.history is not None:
+            self.history.close()
+            self.history = None
+        self.search_index = None
 
     def show_request_dialog(self) -> None:
         """
@@ -223,7 +310,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
         """
 
         self.request_dialog.close()
-        self.connection_handler.is_applied = True
+        self.connection_handler.apply_request()
 
     def reject_request(self) -> None:
         """
@@ -233,7 +320,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
         """
 
         self.request_dialog.close()
-        self.connection_handler.is_rejected = True
+        self.connection_handler.reject_request()
 
     def close_connection(self) -> None:
         """
@@ -242,38 +329,58 @@ class KuznechikChatApp(QtWidgets.QApplication):
         :return: None
         """
 
-        if self.connection_handler.connection:
-            self.connection_handler.connection.close()
-        self.connection_handler.connection = None
+        self.connection_handler.close_connection()
+
+    def schedule_delivery(self) -> None:
+        """
+        Метод, вызывающийся при появлении сообщений в очереди входящих сообщений.
+
+        Сообщения выводятся не сразу, а по таймеру через DELIVERY_INTERVAL мс (примерно один кадр экрана),
+        поэтому все сообщения, полученные за это время, выводятся одним обновлением окна чата.
+
+        :return: None
+        """
+
+        if not self.delivery_timer.isActive():
+            self.delivery_timer.start()
 
     def show_received_message(self) -> None:
         """
-        Метод, выводящий на экран полученное от собеседника сообщение.
+        Метод, выводящий на экран полученные от собеседника сообщения.
 
         :return: None
         """
 
-        _msg = self.connection_handler.received_message
-        self.chat_window.chat_plain.Text(f'Собеседник: {_msg}')
+        messages = [StoredMessage(sender=MessageStore.COMPANION, text=msg.text, timestamp=msg.timestamp)
+                    for msg in self.connection_handler.take_messages()]
+        self.chat_window.append_messages(messages=messages)
+        self.add_to_history(messages=messages)
 
     def send_message(self) -> None:
         """
         Метод для отправки сообщения собеседнику.
 
-        Передаёт сообщение обработчику соединения.
-        После успешной отправки сообщения, выводит его на экран.
+        Ставит сообщение в очередь отправки обработчика соединения, не дожидаясь шифрования и записи.
+        Если очередь заполнена, текст остаётся в поле ввода.
 
         :return: None
         """
 
         _msg = self.chat_window.msg_input_line.text()
-        if _msg != '':
-            try:
-                self.connection_handler.send(msg=_msg)
-                self.chat_window.chat_plain.appendPlainText(f'Вы: {_msg}')
-                self.chat_window.msg_input_line.clear()
-            except (ConnectionRefusedError, ConnectionResetError, AttributeError):
-                self.disconnected_companion()
+        if _msg != '' and self.connection_handler.post_message(msg=_msg):
+            self.chat_window.msg_input_line.clear()
+
+    def show_sent_message(self, msg: str) -> None:
+        """
+        Метод, выводящий на экран отправленное собеседнику сообщение.
+
+        :param msg: str, текст отправленного сообщения
+        :return: None
+        """
+
+        messages = [StoredMessage(sender=MessageStore.OWN, text=msg, timestamp=time.time())]
+        self.chat_window.append_messages(messages=messages)
+        self.add_to_history(messages=messages)
 
     def disconnected_companion(self) -> None:
         """
@@ -293,6 +400,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
 
         if self.chat_window.lost_companion:
             self.chat_window.lost_companion = False
+            self.close_history()
             self.chat_window.close()
             self.main_window.server_is_closed()
             self.main_window.show()
@@ -304,6 +412,7 @@ class KuznechikChatApp(QtWidgets.QApplication):
             )
             if reply == QtWidgets.QMessageBox.Yes:
                 self.connection_handler.disconnect()
+                self.close_history()
                 self.chat_window.close()
                 self.main_window.server_is_closed()
                 self.main_window.show()
@@ -1,18 +1,34 @@
-import binascii
-import random
+import collections
+import queue
+import select
 import socket
+import threading
 import time
-from typing import Tuple
+from typing import List, NamedTuple, Optional, Tuple
 from PyQt5 import QtCore
-from gost.crypto import GOST34122018
-from gost.utils import data_splitting
-from gost.consts import PRIMES
+from app import framing
+from app.session import ChatSession
+from gost.modes import CTR_PARALLEL_THRESHOLD, RESERVOIR_HIGH_WATERMARK, RESERVOIR_LOW_WATERMARK
+
+
+class ReceivedMessage(NamedTuple):
+    """
+    Класс полученного сообщения.
+
+    """
+
+    text: str
+    timestamp: float
 
 
 class ConnectionHandler(QtCore.QObject):
     """
     Класс обработчика соединения.
 
+    Работает как конечный автомат с состояниями idle, listening, connecting, handshaking, chatting и closing.
+    Переходы между состояниями выполняются по командам из очереди,
+    поэтому в состоянии ожидания поток обработчика заблокирован и не расходует процессорное время.
+
     """
 
     SERVER_SUCCESS_SIGNAL = QtCore.pyqtSignal()
@@ -21,56 +37,253 @@ class ConnectionHandler(QtCore.QObject):
     CONN_SUCCESS_SIGNAL = QtCore.pyqtSignal()
     CONN_ERROR_SIGNAL = QtCore.pyqtSignal()
     GOT_REQUEST_SIGNAL = QtCore.pyqtSignal()
+    REQUEST_CANCELLED_SIGNAL = QtCore.pyqtSignal()
     GET_MESSAGE_SIGNAL = QtCore.pyqtSignal()
-    SENT_MESSAGE_SIGNAL = QtCore.pyqtSignal()
+    SENT_MESSAGE_SIGNAL = QtCore.pyqtSignal(str)
+    SEND_ERROR_SIGNAL = QtCore.pyqtSignal(str)
+    SEND_BACKPRESSURE_SIGNAL = QtCore.pyqtSignal(bool)
     DISCONNECTED_COMPANION_SIGNAL = QtCore.pyqtSignal()
-    CLIENT = 'client'
-    SERVER = 'server'
+    STATE_CHANGED_SIGNAL = QtCore.pyqtSignal(str)
+    CLIENT = ChatSession.CLIENT
+    SERVER = ChatSession.SERVER
+    IDLE_STATE = 'idle'
+    LISTENING_STATE = 'listening'
+    CONNECTING_STATE = 'connecting'
+    HANDSHAKING_STATE = 'handshaking'
+    CHATTING_STATE = 'chatting'
+    CLOSING_STATE = 'closing'
+    LISTEN_COMMAND = 'listen'
+    CONNECT_COMMAND = 'connect'
+    STOP_COMMAND = 'stop'
+    APPLY_DECISION = 'apply'
+    REJECT_DECISION = 'reject'
+    REQUEST_MESSAGE = ChatSession.REQUEST_MESSAGE
+    OK_RESPONSE = ChatSession.OK_RESPONSE
+    NOK_RESPONSE = ChatSession.NOK_RESPONSE
+    WAIT_RESPONSE = ChatSession.WAIT_RESPONSE
+    RESPONSES = ChatSession.RESPONSES
+    REQUEST_TIMEOUT = 60.0
+    KEEPALIVE_INTERVAL = 15.0
+    RECV_BUFFER_SIZE = 64 * 1024
+    SEND_QUEUE_SIZE = 256
+    SEND_BATCH_SIZE = 32
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.main_window = None
         self.ip = None
         self.port = None
-        self.is_waiting = False
-        self.is_connecting = False
-        self.is_chatting = False
-        self.is_applied = False
-        self.is_rejected = False
-        self.is_end = False
+        self.state = self.IDLE_STATE
+        self.state_lock = threading.Lock()
+        self.commands = queue.Queue()
+        self.decisions = queue.Queue()
+        self.request_timeout = self.REQUEST_TIMEOUT
+        self.keepalive_interval = self.KEEPALIVE_INTERVAL
         self.socket = None
-        self.gost = None
+        self.session = None
+        self.ctr_parallel_threshold = CTR_PARALLEL_THRESHOLD
+        self.reservoir_low_watermark = RESERVOIR_LOW_WATERMARK
+        self.reservoir_high_watermark = RESERVOIR_HIGH_WATERMARK
         self.companion = None
         self.connection = None
         self.role = None
-        self.received_message = None
+        self.inbound = collections.deque()
+        self.inbound_lock = threading.Lock()
+        self.delivery_pending = False
+        self.decoder = None
+        self.frames = collections.deque()
+        self.send_queue_size = self.SEND_QUEUE_SIZE
+        self.outgoing = None
+        self.sender = None
+        self.send_blocked = False
+        self.send_lock = threading.Lock()
+
+    @property
+    def is_waiting(self) -> bool:
+        """
+        Свойство, указывающее, что сервер открыт и ожидает (или обрабатывает) запрос на подключение.
+
+        :return: bool
+        """
+
+        return self.state == self.LISTENING_STATE or (self.state == self.HANDSHAKING_STATE and
+                                                      self.role == self.SERVER)
+
+    @property
+    def is_connecting(self) -> bool:
+        """
+        Свойство, указывающее, что выполняется исходящее подключение.
+
+        :return: bool
+        """
+
+        return self.state == self.CONNECTING_STATE or (self.state == self.HANDSHAKING_STATE and
+                                                       self.role == self.CLIENT)
+
+    @property
+    def is_chatting(self) -> bool:
+        """
+        Свойство, указывающее, что идёт обмен сообщениями.
+
+        :return: bool
+        """
+
+        return self.state == self.CHATTING_STATE
+
+    @property
+    def is_end(self) -> bool:
+        """
+        Свойство, указывающее, что обработчик завершает работу.
+
+        :return: bool
+        """
+
+        return self.state == self.CLOSING_STATE
+
+    def set_state(self, state: str, expected: Optional[List[str]] = None) -> bool:
+        """
+        Метод перехода в новое состояние.
+
+        :param state: str, новое состояние
+        :param expected: list, состояния, из которых допустим переход (по умолчанию – из любого)
+        :return: bool, выполнен ли переход
+        """
+
+        with self.state_lock:
+            if expected is not None and self.state not in expected:
+                return False
+            changed = self.state != state
+            self.state = state
+        if changed:
+            self.STATE_CHANGED_SIGNAL.emit(state)
+        return True
+
+    def post_command(self, command: str, args) -> None:
+        """
+        Метод постановки команды в очередь потока обработчика.
+
+        :param command: str, команда
+        :param args: аргументы команды
+        :return: None
+        """
+
+        self.commands.put((command, args))
+
+    def post_decision(self, decision: str) -> None:
+        """
+        Метод передачи решения пользователя по входящему запросу потоку обработчика.
+
+        :param decision: str, решение (apply/reject)
+        :return: None
+        """
+
+        self.decisions.put(decision)
+
+    def start_server(self, ip: str, port: int) -> None:
+        """
+        Метод постановки в очередь команды открытия серверного сокета.
+
+        Может вызываться из любого потока.
+
+        :param ip: str, IP-адрес
+        :param port: int, порт
+        :return: None
+        """
+
+        self.post_command(command=self.LISTEN_COMMAND, args=(ip, port))
+
+    def start_connection(self, companion: Tuple[str, int]) -> None:
+        """
+        Метод постановки в очередь команды подключения к собеседнику.
+
+        Может вызываться из любого потока.
+
+        :param companion: tuple, кортеж (IP-адрес, порт)
+        :return: None
+        """
+
+        self.post_command(command=self.CONNECT_COMMAND, args=companion)
+
+    def apply_request(self) -> None:
+        """
+        Метод принятия входящего запроса на подключение.
+
+        :return: None
+        """
+
+        self.post_decision(decision=self.APPLY_DECISION)
+
+    def reject_request(self) -> None:
+        """
+        Метод отклонения входящего запроса на подключение.
+
+        :return: None
+        """
+
+        self.post_decision(decision=self.REJECT_DECISION)
+
+    def stop(self) -> None:
+        """
+        Метод завершения работы обработчика.
+
+        Текущий обмен сообщениями прерывается, поток обработчика выходит из метода run.
+
+        :return: None
+        """
+
+        self.post_command(command=self.STOP_COMMAND, args=None)
+        if self.is_chatting:
+            self.disconnect()
+
+    def cancel_connection(self) -> None:
+        """
+        Метод отмены исходящего подключения.
+
+        Поток обработчика, ожидающий подключения или ответа сервера, сразу получает ошибку сокета.
+
+        :return: None
+        """
+
+        if self.is_connecting and self.socket:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.socket.close()
 
     @QtCore.pyqtSlot()
     def run(self) -> None:
         """
         Метод запуска потока обработчика.
 
-        Ориентирует свою работу по полям-флагам класса.
+        Блокируется на очереди команд и выполняет их по одной:
+        открытие сервера или подключение, согласование и обмен сообщениями.
+        После завершения команды обработчик возвращается в состояние idle.
 
         :return: None
         """
 
         while True:
-            if self.is_end:
+            command, args = self.commands.get()
+            if command == self.STOP_COMMAND:
+                self.set_state(state=self.CLOSING_STATE)
                 break
-            if self.is_waiting:
+            if command == self.LISTEN_COMMAND:
+                self.ip, self.port = args
                 self.server_waiting()
-            if self.is_connecting:
-                self.connect_to(_to=self.companion)
+            elif command == self.CONNECT_COMMAND:
+                self.companion = args
+                self.connect_to(_to=args)
             if self.is_chatting:
                 self.chatting()
+            self.set_state(state=self.IDLE_STATE)
 
     def server_waiting(self) -> None:
         """
         Метод, вызывающийся для открытия серверного сокета.
 
         Ожидает входящий запрос на соединение.
-        Если запрос был подтверждён - начинает процесс обмена сообщениями.
+        Если запрос был подтверждён - переходит в состояние обмена сообщениями.
 
         :return: None
         """
@@ -80,6 +293,7 @@ class ConnectionHandler(QtCore.QObject):
         self.role = self.SERVER
         try:
             self.socket.bind((self.ip, self.port))
+            self.set_state(state=self.LISTENING_STATE)
             self.SERVER_SUCCESS_SIGNAL.emit()
             while True:
                 self.socket.listen(1)
@@ -92,25 +306,26 @@ class ConnectionHandler(QtCore.QObject):
                 else:
                     self.connection = conn
                     self.companion = addr
-                    self.is_chatting = self.request_and_response()
-                    if self.is_chatting:
+                    self.set_state(state=self.HANDSHAKING_STATE)
+                    if self.request_and_response():
+                        self.set_state(state=self.CHATTING_STATE)
                         self.CONN_SUCCESS_SIGNAL.emit()
                         break
                     else:
+                        self.set_state(state=self.LISTENING_STATE)
                         self.connection.close()
                         self.connection = None
                         self.companion = None
         except OSError:
             self.SERVER_ERROR_SIGNAL.emit()
             self.socket.close()
-        self.is_waiting = False
 
     def connect_to(self, _to: Tuple[str, int]) -> None:
         """
         Метод для открытия клиентского сокета.
 
         Осуществляет подключение к серверу.
-        Если Запрос на подключение принят - начинает процесс обмена сообщениями.
+        Если Запрос на подключение принят - переходит в состояние обмена сообщениями.
 
         :param _to: tuple, кортеж (IP-адрес, порт)
         :return: None
@@ -120,164 +335,446 @@ class ConnectionHandler(QtCore.QObject):
         self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.role = self.CLIENT
         try:
+            self.set_state(state=self.CONNECTING_STATE)
             self.WAITING_CONN_SIGNAL.emit()
             self.socket.connect(_to)
-            self.is_chatting = self.request_and_response()
-            if self.is_chatting:
+            self.set_state(state=self.HANDSHAKING_STATE)
+            if self.request_and_response():
+                self.set_state(state=self.CHATTING_STATE)
                 self.CONN_SUCCESS_SIGNAL.emit()
             else:
                 raise ConnectionRefusedError
         except (OSError, ConnectionRefusedError, ConnectionResetError):
             self.socket.close()
             self.CONN_ERROR_SIGNAL.emit()
-        self.is_connecting = False
+
+    def receive_exactly(self, sock: socket.socket, size: int) -> bytes:
+        """
+        Метод чтения из сокета ровно заданного количества байтов.
+
+        :param sock: socket.socket, сокет
+        :param size: int, количество байтов
+        :return: bytes, прочитанные байты (пустая строка байтов, если соединение закрыто раньше)
+        """
+
+        data = b''
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                return b''
+            data += chunk
+        return data
+
+    def receive_response(self) -> bytes:
+        """
+        Метод чтения ответа сервера на запрос подключения (OK, NOK или WAIT).
+
+        Ответы различаются первым байтом, поэтому из сокета читается ровно один ответ
+        и следующие за ним данные (открытый ключ сервера) остаются в сокете.
+
+        :return: bytes, ответ сервера (пустая строка байтов, если соединение закрыто)
+        """
+
+        first = self.receive_exactly(sock=self.socket, size=1)
+        for response in self.RESPONSES:
+            if first == response[:1]:
+                rest = self.receive_exactly(sock=self.socket, size=len(response) - 1)
+                return first + rest if rest else b''
+        return b''
+
+    def wait_for_decision(self) -> Optional[str]:
+        """
+        Метод ожидания решения пользователя по входящему запросу.
+
+        Поток обработчика блокируется на очереди решений. Раз в keepalive_interval секунд
+        клиенту отправляется сообщение WAIT и проверяется, не закрыл ли он соединение.
+        По истечении request_timeout секунд запрос считается отклонённым.
+
+        :return: str, решение (apply/reject) или None, если клиент отключился
+        """
+
+        deadline = time.monotonic() + self.request_timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return self.REJECT_DECISION
+            timeout = min(remaining, self.keepalive_interval) if self.keepalive_interval else remaining
+            try:
+                return self.decisions.get(timeout=timeout)
+            except queue.Empty:
+                pass
+            readable = select.select([self.connection], [], [], 0)[0]
+            if readable and not self.connection.recv(1024):
+                return None
+            if self.keepalive_interval:
+                self.connection.sendall(self.WAIT_RESPONSE)
 
     def request_and_response(self) -> bool:
         """
         Метод, вызывающийся при входящем/исходящем запросе на подключение.
 
-        Ожидает ответ от сервера (пользователя сервера).
-        Сервер и клиент постоянно обмениваются "системными" сообщениями о том,
-        что ответ всё ещё ожидается.
-        При получении ответа, происходит отправка соответствующего сообщения.
+        Клиент отправляет один запрос и ожидает ответ сервера не дольше request_timeout секунд,
+        пропуская сообщения WAIT, которыми сервер подтверждает, что запрос ещё рассматривается.
+        Сервер, получив запрос, ожидает решения пользователя и отправляет один ответ OK или NOK.
 
         :return: bool, принят ли запрос на подключение
         """
 
-        if self.role == self.CLIENT:
-            while True:
-                self.socket.send('WAITING'.encode(encoding='utf-8'))
-                data = self.socket.recv(1024).decode(encoding='utf-8')
-                if data == 'OK':
-                    return True
-                elif data in ['', 'NOK']:
+        try:
+            if self.role == self.CLIENT:
+                self.socket.settimeout(self.request_timeout)
+                self.socket.sendall(self.REQUEST_MESSAGE)
+                while True:
+                    response = self.receive_response()
+                    if response != self.WAIT_RESPONSE:
+                        self.socket.settimeout(None)
+                        return response == self.OK_RESPONSE
+            else:
+                self.connection.settimeout(self.request_timeout)
+                request = self.receive_exactly(sock=self.connection, size=len(self.REQUEST_MESSAGE))
+                self.connection.settimeout(None)
+                if request != self.REQUEST_MESSAGE:
                     return False
-        else:
-            self.GOT_REQUEST_SIGNAL.emit()
-            while True:
-                try:
-                    data = self.connection.recv(1024).decode(encoding='utf-8')
-                    if not data:
-                        return False
-                    if self.is_applied:
-                        self.is_applied = False
-                        self.connection.send('OK'.encode(encoding='utf-8'))
-                        return True
-                    elif self.is_rejected:
-                        self.is_rejected = False
-                        self.connection.send('NOK'.encode(encoding='utf-8'))
-                        return False
-                    else:
-                        self.connection.send('WAIT'.encode(encoding='utf-8'))
-                except (ConnectionRefusedError, ConnectionResetError):
+                while not self.decisions.empty():
+                    self.decisions.get_nowait()
+                self.GOT_REQUEST_SIGNAL.emit()
+                decision = self.wait_for_decision()
+                if decision is None:
+                    self.REQUEST_CANCELLED_SIGNAL.emit()
                     return False
+                if decision == self.APPLY_DECISION:
+                    self.connection.sendall(self.OK_RESPONSE)
+                    return True
+                self.REQUEST_CANCELLED_SIGNAL.emit()
+                self.connection.sendall(self.NOK_RESPONSE)
+                return False
+        except OSError:
+            if self.role == self.SERVER:
+                self.REQUEST_CANCELLED_SIGNAL.emit()
+            return False
 
     def chatting(self) -> None:
         """
         Метод, обрабатывающий процесс обмена сообщениями.
 
         В начале процесса обмена сообщениями, формирует мастер-ключ
-        при помощи алгоритма Диффи-Хеллмана.
-        Постоянно проверяет сокет на наличие новых сообщений от собеседника.
+        при помощи алгоритма Диффи-Хеллмана и согласовывает режим шифрования.
+        Блокируется на чтении сокета до получения данных от собеседника или закрытия соединения.
+        Полученные данные разбираются декодером кадров, каждый кадр с сообщением дешифруется отдельно.
 
         :return: None
         """
 
         if self.role == self.CLIENT:
             self.connection = self.socket
-        master = list(binascii.unhexlify(self.masterkey_exchange()))
-        self.gost = GOST34122018(master_key=master)
-        while True:
-            if self.is_chatting:
-                try:
-                    data = self.connection.recv(8192)
-                    if data:
-                        self.received_message = self.get(cipher=data)
-                        self.GET_MESSAGE_SIGNAL.emit()
-                    else:
-                        raise ConnectionRefusedError
-                except Exception:
+        self.decoder = framing.FrameDecoder()
+        self.frames.clear()
+        self.session = self.create_session()
+        try:
+            hex_master, companion_modes = self.masterkey_exchange()
+            self.session.start(hex_master=hex_master, companion_modes=companion_modes)
+        except (OSError, ValueError, IndexError):
+            self.disconnect()
+            self.DISCONNECTED_COMPANION_SIGNAL.emit()
+            return
+        self.start_sender()
+        while self.is_chatting:
+            try:
+                if not self.frames:
+                    self.receive_frames()
+                    continue
+                self.handle_frame(frame=self.frames.popleft())
+            except Exception:
+                if self.is_chatting:
                     self.disconnect()
                     self.DISCONNECTED_COMPANION_SIGNAL.emit()
-            else:
-                break
 
-    def masterkey_exchange(self) -> str:
+    def create_session(self) -> ChatSession:
+        """
+        Метод создания криптографической сессии для нового собеседника.
+
+        :return: ChatSession, сессия с параметрами режимов шифрования обработчика
+        """
+
+        return ChatSession(role=self.role, ctr_parallel_threshold=self.ctr_parallel_threshold,
+                           reservoir_low_watermark=self.reservoir_low_watermark,
+                           reservoir_high_watermark=self.reservoir_high_watermark)
+
+    def handle_frame(self, frame: framing.Frame) -> None:
+        """
+        Метод обработки кадра, полученного в процессе обмена сообщениями.
+
+        Кадр с сообщением дешифруется и вместе со временем получения ставится в очередь входящих сообщений,
+        кадры неизвестных типов пропускаются. GET_MESSAGE_SIGNAL испускается только для первого сообщения,
+        поступившего после последнего вызова take_messages, поэтому при потоке сообщений
+        интерфейс получает один сигнал на пачку сообщений, а не на каждое.
+
+        :param frame: Frame, полученный кадр
+        :return: None
+        """
+
+        if frame.type == framing.MESSAGE_FRAME:
+            message = ReceivedMessage(text=self.session.decode_message(frame=frame), timestamp=time.time())
+            with self.inbound_lock:
+                self.inbound.append(message)
+                notify = not self.delivery_pending
+                self.delivery_pending = True
+            if notify:
+                self.GET_MESSAGE_SIGNAL.emit()
+
+    def take_messages(self) -> List[ReceivedMessage]:
+        """
+        Метод получения всех сообщений, накопившихся в очереди входящих сообщений (вызывается из потока интерфейса).
+
+        :return: list, полученные сообщения в порядке поступления
+        """
+
+        with self.inbound_lock:
+            messages = list(self.inbound)
+            self.inbound.clear()
+            self.delivery_pending = False
+        return messages
+
+    def receive_frames(self) -> None:
+        """
+        Метод чтения очередной порции данных из сокета и разбора её на кадры.
+
+        Полностью полученные кадры добавляются в очередь frames.
+
+        :return: None
+        """
+
+        data = self.connection.recv(self.RECV_BUFFER_SIZE)
+        if not data:
+            raise ConnectionResetError
+        self.frames.extend(self.decoder.feed(data))
+
+    def receive_frame(self, frame_type: int) -> framing.Frame:
+        """
+        Метод ожидания кадра заданного типа.
+
+        Кадры других типов, полученные раньше, пропускаются.
+
+        :param frame_type: int, тип кадра
+        :return: Frame, полученный кадр
+        """
+
+        while True:
+            while self.frames:
+                frame = self.frames.popleft()
+                if frame.type == frame_type:
+                    return frame
+            self.receive_frames()
+
+    def masterkey_exchange(self) -> Tuple[str, List[str]]:
         """
         Метод формирование мастер-ключа.
 
         Формирует открытый и закрытые ключи.
-        Получает закрытый ключ собеседника и вычисляет мастер-ключ.
+        Вместе с открытым ключом отправляет список поддерживаемых режимов шифрования.
+        Получает открытый ключ и режимы собеседника и вычисляет мастер-ключ.
+        Открытые ключи передаются кадрами типа KEY_FRAME.
 
-        :return: str, мастер-ключ длиной 256 бит
+        :return: tuple, (мастер-ключ длиной 256 бит, список режимов шифрования собеседника)
         """
 
-        my_secret = f'{self.socket.getsockname()[0].replace(".", "")}' \
-                    f'{self.socket.getsockname()[1]}' \
-                    f'{int(time.time())}'
-        k = 64 - len(my_secret)
-        my_secret += ''.join(random.choices('0123456789abcdef', k=k))
-        p1, p2 = PRIMES
-        my_open = f'{pow(p1, int(my_secret, 16), p2)}'.encode(encoding='utf-8')
+        my_secret, my_open = self.session.create_open_key(address=self.socket.getsockname())
         try:
-            self.connection.send(bytes(my_open))
-            data = self.connection.recvfrom(1024)[0].decode(encoding='utf-8')
-            int_master = pow(int(data), int(my_secret, 16), p2)
-            hex_master = hex(int_master)
-            return hex_master[2:66]
+            self.connection.sendall(framing.encode_frame(frame_type=framing.KEY_FRAME, payload=my_open))
+            companion_open = self.receive_frame(frame_type=framing.KEY_FRAME).payload
+            return self.session.compute_master(secret=my_secret, companion_open=companion_open)
         except (ConnectionRefusedError, ConnectionResetError, AttributeError) as exc:
             raise exc
 
+    def start_sender(self) -> None:
+        """
+        Метод запуска потока отправки сообщений текущей сессии.
+
+        Каждая сессия получает собственную ограниченную очередь отправки,
+        поэтому сообщения, не отправленные в прошлой сессии, не попадут в новую.
+
+        :return: None
+        """
+
+        with self.send_lock:
+            self.outgoing = queue.Queue(maxsize=self.send_queue_size)
+            self.send_blocked = False
+        self.sender = threading.Thread(target=self.sending, args=(self.outgoing,), daemon=True)
+        self.sender.start()
+
+    def stop_sender(self) -> None:
+        """
+        Метод остановки потока отправки сообщений.
+
+        Если очередь заполнена, поток отправки завершится сам: после закрытия сокета запись в него невозможна.
+
+        :return: None
+        """
+
+        with self.send_lock:
+            outgoing, self.outgoing = self.outgoing, None
+        if outgoing is not None:
+            try:
+                outgoing.put_nowait(None)
+            except queue.Full:
+                pass
+
+    def post_message(self, msg: str) -> bool:
+        """
+        Метод постановки сообщения в очередь отправки (вызывается из потока интерфейса).
+
+        Не блокирует вызывающий поток. Если собеседник не успевает принимать сообщения
+        и очередь заполнена, сообщение не принимается и испускается SEND_BACKPRESSURE_SIGNAL(True);
+        после освобождения половины очереди испускается SEND_BACKPRESSURE_SIGNAL(False).
+        Результат отправки сообщается сигналами SENT_MESSAGE_SIGNAL и SEND_ERROR_SIGNAL.
+        После ошибки записи поток отправки завершается, и сообщения больше не принимаются.
+
+        :param msg: str, текст отправляемого сообщения
+        :return: bool, принято ли сообщение в очередь
+        """
+
+        sender = self.sender
+        if not self.is_chatting or sender is None or not sender.is_alive():
+            return False
+        with self.send_lock:
+            if self.outgoing is None:
+                return False
+            try:
+                self.outgoing.put_nowait(msg)
+                return True
+            except queue.Full:
+                was_blocked, self.send_blocked = self.send_blocked, True
+        if not was_blocked:
+            self.SEND_BACKPRESSURE_SIGNAL.emit(True)
+        return False
+
+    def sending(self, outgoing: queue.Queue) -> None:
+        """
+        Метод потока отправки сообщений.
+
+        Забирает из очереди сообщения, накопившиеся к этому моменту (не более SEND_BATCH_SIZE),
+        шифрует их и записывает одной записью в соединение. Запись блокируется, пока собеседник
+        не примет данные, поэтому при медленном собеседнике очередь заполняется.
+        Сообщения, превышающие максимальную длину кадра, сообщаются сигналом SEND_ERROR_SIGNAL, а поток продолжает работу.
+        После ошибки записи очередь сессии закрывается, неотправленные сообщения сообщаются
+        сигналом SEND_ERROR_SIGNAL, а заблокированная отправка разблокируется.
+
+        :param outgoing: queue.Queue, очередь отправки сессии
+        :return: None
+        """
+
+        while True:
+            batch = [outgoing.get()]
+            while batch[-1] is not None and len(batch) < self.SEND_BATCH_SIZE and not outgoing.empty():
+                batch.append(outgoing.get_nowait())
+            stop = batch[-1] is None
+            messages = [msg for msg in batch if msg is not None]
+            try:
+                rejected = self.send_many(messages=messages) if messages else []
+            except Exception:
+                with self.send_lock:
+                    if self.outgoing is outgoing:
+                        self.outgoing = None
+                    was_blocked, self.send_blocked = self.send_blocked, False
+                while not outgoing.empty():
+                    msg = outgoing.get_nowait()
+                    if msg is not None:
+                        messages.append(msg)
+                for msg in messages:
+                    self.SEND_ERROR_SIGNAL.emit(msg)
+                if was_blocked:
+                    self.SEND_BACKPRESSURE_SIGNAL.emit(False)
+                return
+            for msg in rejected:
+                self.SEND_ERROR_SIGNAL.emit(msg)
+            for msg in messages:
+                if msg not in rejected:
+                    self.SENT_MESSAGE_SIGNAL.emit(msg)
+            with self.send_lock:
+                unblocked = self.send_blocked and outgoing.qsize() <= outgoing.maxsize // 2
+                if unblocked:
+                    self.send_blocked = False
+            if unblocked:
+                self.SEND_BACKPRESSURE_SIGNAL.emit(False)
+            if stop:
+                return
+
     def send(self, msg: str) -> None:
         """
         Метод обработки отправляемого сообщения.
 
-        Шифрует сообщение и отправляет его собеседнику.
+        Шифрует сообщение и отправляет его собеседнику кадром типа MESSAGE_FRAME.
+        Блокирует вызывающий поток до окончания записи, поэтому интерфейс использует post_message.
+        Сообщение, которое нельзя передать одним кадром, вызывает исключение FrameError.
 
         :param msg: str, текст отправляемого сообщения (открытый текст)
         :return: None
         """
 
-        open_message_blocks = data_splitting(data=msg)
-        cipher_text_blocks = []
-        for block in open_message_blocks:
-            cipher_text = self.gost.message_prehandling(msg=block, flag='encrypt')
-            cipher_text_blocks.extend(cipher_text)
+        if self.send_many(messages=[msg]):
+            raise framing.FrameError
+
+    def send_many(self, messages: List[str]) -> List[str]:
+        """
+        Метод отправки нескольких сообщений одной записью в сокет.
+
+        Каждое сообщение шифруется и передаётся отдельным кадром,
+        поэтому получатель восстанавливает их по отдельности.
+        Короткие кадры накапливаются и записываются вместе, а длинное сообщение записывается
+        по мере шифрования порциями около STREAM_CHUNK байт (см. ChatSession.encode_message_stream).
+        Сообщения, которые нельзя передать одним кадром, не отправляются, остальные отправляются.
+
+        :param messages: list, тексты отправляемых сообщений
+        :return: list, неотправленные сообщения, превышающие максимальную длину кадра
+        """
+
+        rejected = []
         try:
-            self.connection.sendall(bytes(cipher_text_blocks))
+            for data in self.session.iterate_writes(messages=messages, rejected=rejected):
+                self.connection.sendall(data)
         except (ConnectionRefusedError, ConnectionResetError, AttributeError) as exc:
             raise exc
+        return rejected
 
-    def get(self, cipher: bytes) -> str:
+    def get_reservoir_stats(self) -> dict:
         """
-        Метод обработки полученного сообщения.
-
-        Дешифрует полученное сообщение.
+        Метод получения статистики резервуара гаммы текущей сессии.
 
-        :param cipher: bytes, зашифрованное сообщение собеседника
-        :return: str, текст дешифрованного сообщения собеседника
+        :return: dict, количество попаданий, промахов и текущий объём гаммы (пустой словарь вне режима гаммирования)
         """
 
-        _cipher = list(cipher)
-        decrypted_message_blocks = []
-        for i in range(0, len(_cipher), 16):
-            decrypted_message = self.gost.message_prehandling(msg=_cipher[i:i + 16], flag='decrypt')
-            decrypted_message_blocks.extend(decrypted_message)
-        while decrypted_message_blocks[0] == 0:
-            decrypted_message_blocks.pop(0)
-        hex_decrypted = ''.join([f'{x:02x}' for x in decrypted_message_blocks])
-        recovered = bytes.fromhex(hex_decrypted).decode(encoding='utf-8')
-        return recovered
+        return self.session.get_reservoir_stats() if self.session else {}
 
     def disconnect(self) -> None:
         """
         Метод закрытия подключения.
 
+        Перед закрытием сокет переводится в состояние shutdown, чтобы поток обработчика,
+        заблокированный на чтении, сразу получил управление.
+
         :return: None
         """
 
-        self.is_chatting = False
+        self.set_state(state=self.CLOSING_STATE, expected=[self.CHATTING_STATE])
+        self.stop_sender()
+        if self.session:
+            self.session.stop()
         if self.connection:
+            try:
+                self.connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
             self.connection.close()
         self.socket.close()
         self.connection = None
+
+    def close_connection(self) -> None:
+        """
+        Метод закрытия соединения с собеседником до начала обмена сообщениями.
+
+        :return: None
+        """
+
+        if self.connection:
+            self.connection.close()
+        self.connection = None
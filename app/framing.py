@@ -0,0 +1,104 @@
+import struct
+from typing import Iterable, List, NamedTuple
+
+
+# Заголовок кадра: тип (1 байт), флаги (1 байт), длина полезной нагрузки (4 байта, big-endian)
+FRAME_HEADER = struct.Struct('>BBI')
+HEADER_SIZE = FRAME_HEADER.size
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+KEY_FRAME = 1
+MESSAGE_FRAME = 2
+# Флаг кадра с сообщением: полезная нагрузка сжата zlib перед шифрованием
+COMPRESSED_FLAG = 0x01
+
+
+class FrameError(ValueError):
+    """
+    Исключение, возникающее при получении некорректного кадра.
+
+    """
+
+
+class Frame(NamedTuple):
+    """
+    Класс кадра протокола обмена сообщениями.
+
+    """
+
+    type: int
+    flags: int
+    payload: bytes
+
+
+def encode_frame(frame_type: int, payload, flags: int = 0) -> bytes:
+    """
+    Функция формирования кадра.
+
+    :param frame_type: int, тип кадра
+    :param payload: bytes-like объект, полезная нагрузка
+    :param flags: int, флаги кадра
+    :return: bytes, заголовок и полезная нагрузка
+    """
+
+    payload = memoryview(payload).cast('B')
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError
+    return b''.join([FRAME_HEADER.pack(frame_type, flags, len(payload)), payload])
+
+
+def encode_frames(frames: Iterable[Frame]) -> bytes:
+    """
+    Функция формирования нескольких кадров для отправки одной записью в сокет.
+
+    :param frames: iterable, кадры
+    :return: bytes, последовательность кадров
+    """
+
+    return b''.join(encode_frame(frame_type=frame.type, payload=frame.payload, flags=frame.flags)
+                    for frame in frames)
+
+
+class FrameDecoder:
+    """
+    Класс потокового декодера кадров.
+
+    Принимает данные из сокета порциями произвольной длины: неполный кадр сохраняется
+    до следующей порции, а несколько кадров, пришедших одной порцией, разделяются.
+
+    """
+
+    def __init__(self, max_size: int = MAX_FRAME_SIZE):
+        self.max_size = max_size
+        self.buffer = bytearray()
+
+    def feed(self, data) -> List[Frame]:
+        """
+        Метод обработки очередной порции данных.
+
+        :param data: bytes-like объект, данные, прочитанные из сокета
+        :return: list, кадры, полностью полученные к этому моменту
+        """
+
+        self.buffer += data
+        frames = []
+        offset = 0
+        while len(self.buffer) - offset >= HEADER_SIZE:
+            frame_type, flags, length = FRAME_HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_size:
+                raise FrameError
+            end = offset + HEADER_SIZE + length
+            if len(self.buffer) < end:
+                break
+            frames.append(Frame(type=frame_type, flags=flags, payload=bytes(self.buffer[offset + HEADER_SIZE:end])))
+            offset = end
+        del self.buffer[:offset]
+        return frames
+
+    def pending(self) -> int:
+        """
+        Метод получения количества байтов неполного кадра, ожидающего продолжения.
+
+        :return: int, количество байтов в буфере
+        """
+
+        return len(self.buffer)
@@ -0,0 +1,351 @@
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from typing import List
+from app.message_store import StoredMessage
+from gost.crypto import GOST34122018
+from gost.mgm import MGMMode
+
+
+HISTORY_DIR = os.path.join(os.path.expanduser('~'), '.kuznechikchat', 'history')
+KEY_FILE = 'history.key'
+KEY_SIZE = 32
+# Запись индекса: смещение записи в журнале, время сообщения, длина записи, отправитель
+INDEX_ENTRY = struct.Struct('>QdIB3x')
+INDEX_ENTRY_SIZE = INDEX_ENTRY.size
+FLUSH_BATCH = 256
+FSYNC_INTERVAL = 1.0
+OPEN_FLAGS = os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+
+
+def load_local_key(directory: str = HISTORY_DIR) -> bytes:
+    """
+    Функция получения локального ключа шифрования истории.
+
+    При первом вызове ключ создаётся случайным образом и сохраняется в файл,
+    доступный только владельцу.
+
+    :param directory: str, каталог истории
+    :return: bytes, ключ длиной 256 бит
+    """
+
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, KEY_FILE)
+    try:
+        with open(path, 'rb') as file:
+            key = file.read()
+        if len(key) != KEY_SIZE:
+            raise ValueError
+        return key
+    except FileNotFoundError:
+        pass
+    key = os.urandom(KEY_SIZE)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as file:
+        file.write(key)
+    return key
+
+
+def peer_name(companion: str) -> str:
+    """
+    Функция получения имени файлов истории для собеседника.
+
+    :param companion: str, адрес собеседника
+    :return: str, имя файлов без расширения
+    """
+
+    return re.sub(r'[^0-9A-Za-z.-]', '_', companion)
+
+
+class HistoryLog:
+    """
+    Класс зашифрованной истории переписки с одним собеседником.
+
+    История хранится в двух файлах: журнал (.log), в который записи только дописываются,
+    и индекс (.idx) из записей фиксированной длины, отображённый в память через mmap.
+    Поэтому сообщение с порядковым номером seq читается одним обращением к индексу и одним
+    чтением журнала, а поиск по времени выполняется двоичным поиском по индексу без чтения журнала.
+
+    Каждая запись журнала шифруется в режиме MGM локальным ключом; номер, время и отправитель сообщения
+    передаются как ассоциированные данные, поэтому подмена или перестановка записей обнаруживается.
+    Метод append не блокирует вызывающий поток: шифрование и запись выполняет отдельный поток,
+    данные сбрасываются на диск (fsync) не чаще раза в FSYNC_INTERVAL секунд.
+    После ошибки записи (например, при нехватке места на диске) история перестаёт записываться:
+    методы append и flush вызывают исключение OSError, а не ожидают поток записи.
+
+    """
+
+    def __init__(self, path: str, key: bytes, fsync_interval: float = FSYNC_INTERVAL):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.mgm = MGMMode(cipher=GOST34122018(master_key=list(key)))
+        self.log_fd = os.open(f'{path}.log', OPEN_FLAGS, 0o600)
+        self.index_fd = os.open(f'{path}.idx', OPEN_FLAGS, 0o600)
+        self.file_lock = threading.Lock()
+        self.index_map = None
+        self.written = self.recover()
+        self.appended = self.written
+        self.error = None
+        self.pending = queue.Queue()
+        self.writer = threading.Thread(target=self.writing, daemon=True)
+        self.writer.start()
+
+    def recover(self) -> int:
+        """
+        Метод восстановления файлов после аварийного завершения.
+
+        Отбрасывает неполную запись индекса, записи индекса, указывающие за конец журнала,
+        и хвост журнала, не попавший в индекс.
+
+        :return: int, количество записей в истории
+        """
+
+        index_size = os.fstat(self.index_fd).st_size
+        count = index_size // INDEX_ENTRY_SIZE
+        log_size = os.fstat(self.log_fd).st_size
+        while count:
+            offset, _, length, _ = INDEX_ENTRY.unpack(self.read_at(fd=self.index_fd, size=INDEX_ENTRY_SIZE,
+                                                                   offset=(count - 1) * INDEX_ENTRY_SIZE))
+            if offset + length <= log_size:
+                log_size = offset + length
+                break
+            count -= 1
+        if count == 0:
+            log_size = 0
+        os.ftruncate(self.index_fd, count * INDEX_ENTRY_SIZE)
+        os.ftruncate(self.log_fd, log_size)
+        self.log_size = log_size
+        return count
+
+    def read_at(self, fd: int, size: int, offset: int) -> bytes:
+        """
+        Метод чтения данных файла по смещению.
+
+        Позиция файла общая для потоков (а os.pread есть не во всех ОС), поэтому чтение выполняется под блокировкой.
+
+        :param fd: int, дескриптор файла
+        :param size: int, количество байтов
+        :param offset: int, смещение
+        :return: bytes, прочитанные данные
+        """
+
+        with self.file_lock:
+            os.lseek(fd, offset, os.SEEK_SET)
+            return os.read(fd, size)
+
+    def append(self, message: StoredMessage) -> int:
+        """
+        Метод добавления сообщения в историю (не блокирует вызывающий поток).
+
+        Вызывается из одного потока, поэтому номер сообщения известен до его записи.
+
+        :param message: StoredMessage, сообщение
+        :return: int, порядковый номер сообщения в истории
+        """
+
+        if self.error is not None:
+            raise OSError from self.error
+        self.pending.put(message)
+        self.appended += 1
+        return self.appended - 1
+
+    def writing(self) -> None:
+        """
+        Метод потока записи истории.
+
+        Забирает накопившиеся сообщения (не более FLUSH_BATCH), шифрует их и дописывает
+        в журнал и индекс двумя операциями записи. Журнал записывается раньше индекса,
+        поэтому индекс не ссылается на отсутствующие данные.
+        Ошибка записи сохраняется в атрибуте error, после чего сообщения только забираются из очереди,
+        поэтому ожидающие их записи потоки не блокируются.
+
+        :return: None
+        """
+
+        last_sync = time.monotonic()
+        dirty = False
+        while True:
+            timeout = max(0.0, last_sync + self.fsync_interval - time.monotonic()) if dirty else None
+            try:
+                batch = [self.pending.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while batch and batch[-1] is not None and len(batch) < FLUSH_BATCH and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            stop = bool(batch) and batch[-1] is None
+            messages = [message for message in batch if message is not None]
+            try:
+                if messages and self.error is None:
+                    self.write_records(messages=messages)
+                    dirty = True
+                if dirty and (stop or time.monotonic() - last_sync >= self.fsync_interval):
+                    dirty = False
+                    os.fsync(self.log_fd)
+                    os.fsync(self.index_fd)
+                    last_sync = time.monotonic()
+            except Exception as exc:
+                self.error = exc
+            finally:
+                for _ in batch:
+                    self.pending.task_done()
+            if stop:
+                return
+
+    def write_records(self, messages: List[StoredMessage]) -> None:
+        """
+        Метод шифрования и записи сообщений в журнал и индекс.
+
+        :param messages: list, сообщения
+        :return: None
+        """
+
+        records, entries = [], []
+        offset = self.log_size
+        for seq, message in enumerate(messages, start=self.written):
+            record = self.mgm.seal(data=message.text.encode(encoding='utf-8'),
+                                   associated_data=self.associated_data(seq=seq, message=message))
+            entries.append(INDEX_ENTRY.pack(offset, message.timestamp, len(record), message.sender))
+            records.append(record)
+            offset += len(record)
+        with self.file_lock:
+            os.write(self.log_fd, b''.join(records))
+            os.write(self.index_fd, b''.join(entries))
+        self.log_size = offset
+        self.written += len(messages)
+
+    @staticmethod
+    def associated_data(seq: int, message: StoredMessage) -> bytes:
+        """
+        Метод формирования ассоциированных данных записи.
+
+        :param seq: int, порядковый номер сообщения
+        :param message: StoredMessage, сообщение
+        :return: bytes, ассоциированные данные
+        """
+
+        return struct.pack('>QdB', seq, message.timestamp, message.sender)
+
+    def get_index(self) -> mmap.mmap:
+        """
+        Метод получения отображения индекса в память.
+
+        Отображение пересоздаётся, только если индекс вырос с момента прошлого отображения. Прежнее отображение
+        не закрывается явно, так как его может читать другой поток (например, фоновая индексация для поиска).
+
+        :return: mmap.mmap, отображение индекса
+        """
+
+        size = self.written * INDEX_ENTRY_SIZE
+        if self.index_map is None or len(self.index_map) < size:
+            self.index_map = mmap.mmap(self.index_fd, size, access=mmap.ACCESS_READ)
+        return self.index_map
+
+    def __len__(self) -> int:
+        """
+        Метод получения количества сообщений, записанных в историю.
+
+        :return: int, количество сообщений
+        """
+
+        return self.written
+
+    def get(self, seq: int) -> StoredMessage:
+        """
+        Метод чтения сообщения по порядковому номеру.
+
+        При повреждении записи возникает исключение MGMAuthenticationError.
+
+        :param seq: int, порядковый номер сообщения
+        :return: StoredMessage, сообщение
+        """
+
+        if not 0 <= seq < self.written:
+            raise IndexError
+        offset, timestamp, length, sender = INDEX_ENTRY.unpack_from(self.get_index(), seq * INDEX_ENTRY_SIZE)
+        message = StoredMessage(sender=sender, text='', timestamp=timestamp)
+        text = self.mgm.open(data=self.read_at(fd=self.log_fd, size=length, offset=offset),
+                             associated_data=self.associated_data(seq=seq, message=message))
+        return message._replace(text=text.decode(encoding='utf-8'))
+
+    def get_range(self, start: int, stop: int) -> List[StoredMessage]:
+        """
+        Метод чтения сообщений с порядковыми номерами из диапазона [start, stop).
+
+        :param start: int, первый порядковый номер
+        :param stop: int, порядковый номер после последнего
+        :return: list, сообщения
+        """
+
+        return [self.get(seq=seq) for seq in range(max(start, 0), min(stop, self.written))]
+
+    def get_timestamp(self, seq: int) -> float:
+        """
+        Метод получения времени сообщения без чтения журнала.
+
+        :param seq: int, порядковый номер сообщения
+        :return: float, время сообщения
+        """
+
+        return INDEX_ENTRY.unpack_from(self.get_index(), seq * INDEX_ENTRY_SIZE)[1]
+
+    def find_time(self, timestamp: float) -> int:
+        """
+        Метод поиска первого сообщения, отправленного не раньше указанного времени.
+
+        :param timestamp: float, время
+        :return: int, порядковый номер сообщения (len(self), если таких сообщений нет)
+        """
+
+        low, high = 0, self.written
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_timestamp(seq=middle) < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def flush(self) -> None:
+        """
+        Метод ожидания записи всех добавленных сообщений.
+
+        Если запись завершилась ошибкой, возникает исключение OSError.
+
+        :return: None
+        """
+
+        self.pending.join()
+        if self.error is not None:
+            raise OSError from self.error
+
+    def close(self) -> None:
+        """
+        Метод закрытия истории: дописывает оставшиеся сообщения, сбрасывает их на диск и закрывает файлы.
+
+        :return: None
+        """
+
+        self.pending.put(None)
+        self.writer.join()
+        if self.index_map is not None:
+            self.index_map.close()
+            self.index_map = None
+        os.close(self.log_fd)
+        os.close(self.index_fd)
+
+
+def open_history(companion: str, directory: str = HISTORY_DIR) -> HistoryLog:
+    """
+    Функция открытия истории переписки с собеседником, зашифрованной локальным ключом.
+
+    :param companion: str, адрес собеседника
+    :param directory: str, каталог истории
+    :return: HistoryLog, история
+    """
+
+    key = load_local_key(directory=directory)
+    return HistoryLog(path=os.path.join(directory, peer_name(companion=companion)), key=key)
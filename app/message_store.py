@@ -0,0 +1,153 @@
+import array
+import time
+from typing import Iterable, List, NamedTuple, Optional
+
+
+class StoredMessage(NamedTuple):
+    """
+    Класс сообщения чата.
+
+    """
+
+    sender: int
+    text: str
+    timestamp: float
+
+
+class MessageStore:
+    """
+    Класс компактного хранилища сообщений чата.
+
+    Отправители и время сообщений хранятся в массивах array, тексты – в списке строк.
+    Каждое сообщение получает порядковый номер (seq), который не меняется при удалении старых сообщений.
+    Если количество сообщений превышает max_messages, самые старые сообщения удаляются
+    порциями по TRIM_FRACTION от max_messages, чтобы удаление выполнялось редко.
+
+    """
+
+    OWN = 0
+    COMPANION = 1
+    SYSTEM = 2
+    MAX_MESSAGES = 10000
+    TRIM_FRACTION = 0.1
+
+    def __init__(self, max_messages: int = MAX_MESSAGES):
+        if max_messages < 1:
+            raise ValueError
+        self.max_messages = max_messages
+        self.senders = array.array('B')
+        self.timestamps = array.array('d')
+        self.texts = []
+        self.start_seq = 0
+
+    def __len__(self) -> int:
+        """
+        Метод получения количества сообщений, находящихся в памяти.
+
+        :return: int, количество сообщений
+        """
+
+        return len(self.texts)
+
+    @property
+    def end_seq(self) -> int:
+        """
+        Свойство, возвращающее порядковый номер, который получит следующее сообщение.
+
+        :return: int, порядковый номер
+        """
+
+        return self.start_seq + len(self.texts)
+
+    def extend(self, messages: Iterable[StoredMessage]) -> None:
+        """
+        Метод добавления нескольких сообщений.
+
+        Удаление старых сообщений выполняется отдельно методом trim.
+
+        :param messages: iterable, добавляемые сообщения
+        :return: None
+        """
+
+        for message in messages:
+            self.senders.append(message.sender)
+            self.timestamps.append(message.timestamp)
+            self.texts.append(message.text)
+
+    def append(self, sender: int, text: str, timestamp: Optional[float] = None) -> None:
+        """
+        Метод добавления одного сообщения.
+
+        :param sender: int, отправитель (OWN, COMPANION или SYSTEM)
+        :param text: str, текст сообщения
+        :param timestamp: float, время сообщения (по умолчанию текущее)
+        :return: None
+        """
+
+        self.extend(messages=[StoredMessage(sender=sender, text=text,
+                                            timestamp=time.time() if timestamp is None else timestamp)])
+
+    def excess(self) -> int:
+        """
+        Метод вычисления количества старых сообщений, которые удалит метод trim.
+
+        :return: int, количество сообщений (0, если ограничение не превышено)
+        """
+
+        if len(self.texts) <= self.max_messages:
+            return 0
+        return min(len(self.texts), len(self.texts) - self.max_messages + int(self.max_messages * self.TRIM_FRACTION))
+
+    def trim(self) -> int:
+        """
+        Метод удаления самых старых сообщений при превышении ограничения.
+
+        :return: int, количество удалённых сообщений
+        """
+
+        count = self.excess()
+        if count:
+            del self.senders[:count]
+            del self.timestamps[:count]
+            del self.texts[:count]
+            self.start_seq += count
+        return count
+
+    def get(self, seq: int) -> StoredMessage:
+        """
+        Метод получения сообщения по порядковому номеру.
+
+        :param seq: int, порядковый номер сообщения
+        :return: StoredMessage, сообщение
+        """
+
+        index = seq - self.start_seq
+        if not 0 <= index < len(self.texts):
+            raise IndexError
+        return StoredMessage(sender=self.senders[index], text=self.texts[index], timestamp=self.timestamps[index])
+
+    def get_range(self, start: int, stop: int) -> List[StoredMessage]:
+        """
+        Метод получения сообщений с порядковыми номерами из диапазона [start, stop).
+
+        :param start: int, первый порядковый номер
+        :param stop: int, порядковый номер после последнего
+        :return: list, сообщения, находящиеся в памяти
+        """
+
+        start, stop = max(start, self.start_seq), min(stop, self.end_seq)
+        return [self.get(seq=seq) for seq in range(start, stop)]
+
+    def clear(self) -> None:
+        """
+        Метод удаления всех сообщений.
+
+        Нумерация продолжается, чтобы порядковые номера не повторялись.
+
+        :return: None
+        """
+
+        self.start_seq = self.end_seq
+        self.senders = array.array('B')
+        self.timestamps = array.array('d')
+        self.texts = []
@@ -0,0 +1,698 @@
+import array
+import bisect
+import heapq
+import itertools
+import json
+import mmap
+import operator
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+from app.history import HistoryLog
+from gost.crypto import GOST34122018
+from gost.mgm import MGMMode
+
+
+SEGMENT_MAGIC = b'KCSEG002'
+MANIFEST_MAGIC = b'KCIDX002'
+# Заголовок сегмента: сигнатура, длина зашифрованного словаря
+SEGMENT_HEADER = struct.Struct('>8sI')
+# Заголовок словаря: количество терминов, количество страниц списков номеров
+DICTIONARY_HEADER = struct.Struct('>II')
+# Страница списков номеров: смещение от конца словаря, длина зашифрованной страницы
+PAGE_ENTRY = struct.Struct('>QI')
+# Термин словаря: длина термина в байтах; после термина – номер страницы, смещение в странице и длина списка номеров
+TERM_HEADER = struct.Struct('>H')
+TERM_POSTINGS = struct.Struct('>III')
+PAGE_SIZE = 64 * 1024
+PAGE_CACHE_SIZE = 16
+SEGMENT_MESSAGES = 2000
+MERGE_FACTOR = 4
+SEARCH_LIMIT = 50
+TOKEN_PATTERN = re.compile(r'\w+')
+FILE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+
+
+def fold(text: str) -> str:
+    """
+    Функция приведения текста к виду, используемому при поиске.
+
+    Регистр приводится методом casefold (в том числе для кириллицы), буква «ё» заменяется на «е».
+
+    :param text: str, исходный текст
+    :return: str, приведённый текст
+    """
+
+    return text.casefold().replace('ё', 'е')
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Функция разбиения текста на слова для поискового индекса.
+
+    :param text: str, текст сообщения или запроса
+    :return: list, приведённые слова в порядке следования
+    """
+
+    return TOKEN_PATTERN.findall(fold(text=text))
+
+
+def encode_postings(postings: array.array) -> bytes:
+    """
+    Функция записи списка номеров сообщений разностями соседних номеров.
+
+    Номера записываются 32-битными числами в порядке байтов little-endian, первый номер – как есть.
+    Разности обычно малы, поэтому страницы списков хорошо сжимаются перед шифрованием.
+
+    :param postings: array.array, номера сообщений по возрастанию (тип 'I')
+    :return: bytes, представление списка в странице сегмента
+    """
+
+    deltas = array.array('I', postings[:1])
+    deltas.extend(map(operator.sub, postings[1:], postings[:-1]))
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return deltas.tobytes()
+
+
+def decode_postings(data: bytes) -> array.array:
+    """
+    Функция чтения списка номеров сообщений, записанного функцией encode_postings.
+
+    :param data: bytes, представление списка в странице сегмента
+    :return: array.array, номера сообщений по возрастанию
+    """
+
+    deltas = array.array('I')
+    deltas.frombytes(data)
+    if sys.byteorder == 'big':
+        deltas.byteswap()
+    return array.array('I', itertools.accumulate(deltas))
+
+
+def write_file(path: str, parts: List[bytes]) -> None:
+    """
+    Функция записи файла индекса, доступного только владельцу.
+
+    Файл записывается под временным именем и переименовывается, поэтому он либо записан полностью, либо отсутствует.
+
+    :param path: str, путь к файлу
+    :param parts: list, части содержимого файла
+    :return: None
+    """
+
+    try:
+        os.remove(f'{path}.tmp')
+    except FileNotFoundError:
+        pass
+    fd = os.open(f'{path}.tmp', FILE_FLAGS, 0o600)
+    with os.fdopen(fd, 'wb') as file:
+        for part in parts:
+            file.write(part)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(f'{path}.tmp', path)
+
+
+def page_associated_data(name: bytes, page: int) -> bytes:
+    """
+    Функция формирования ассоциированных данных страницы списков номеров.
+
+    :param name: bytes, имя файла сегмента
+    :param page: int, номер страницы
+    :return: bytes, ассоциированные данные
+    """
+
+    return SEGMENT_MAGIC + name + struct.pack('>I', page)
+
+
+def write_segment(path: str, postings: Dict[str, array.array], mgm: MGMMode) -> bytes:
+    """
+    Функция записи сегмента индекса.
+
+    Сегмент состоит из заголовка, словаря терминов и страниц списков номеров сообщений.
+    Списки номеров терминов, идущих подряд в отсортированном словаре, объединяются в страницы
+    длиной около PAGE_SIZE байтов. Словарь и каждая страница сжимаются и шифруются в режиме MGM
+    локальным ключом истории; имя файла сегмента и номер страницы передаются как ассоциированные данные,
+    поэтому страницы нельзя переставить или перенести в другой сегмент.
+
+    :param path: str, путь к файлу сегмента
+    :param postings: dict, списки номеров сообщений для каждого термина
+    :param mgm: MGMMode, режим шифрования с локальным ключом истории
+    :return: bytes, словарь терминов до сжатия и шифрования (чтобы открыть сегмент, не дешифруя его)
+    """
+
+    name = os.path.basename(path).encode(encoding='utf-8')
+    terms = sorted(postings)
+    entries, pages, page_entries = [], [], []
+    page, page_size, position = [], 0, 0
+    for i, term in enumerate(terms):
+        encoded = term.encode(encoding='utf-8')
+        entries.append(TERM_HEADER.pack(len(encoded)) + encoded +
+                       TERM_POSTINGS.pack(len(pages), page_size, len(postings[term])))
+        page.append(encode_postings(postings=postings[term]))
+        page_size += len(page[-1])
+        if page_size >= PAGE_SIZE or i == len(terms) - 1:
+            sealed = mgm.seal(data=zlib.compress(b''.join(page)),
+                              associated_data=page_associated_data(name=name, page=len(pages)))
+            page_entries.append(PAGE_ENTRY.pack(position, len(sealed)))
+            pages.append(sealed)
+            position += len(sealed)
+            page, page_size = [], 0
+    dictionary = DICTIONARY_HEADER.pack(len(terms), len(pages)) + b''.join(page_entries) + b''.join(entries)
+    sealed = mgm.seal(data=zlib.compress(dictionary), associated_data=SEGMENT_MAGIC + name)
+    write_file(path=path, parts=[SEGMENT_HEADER.pack(SEGMENT_MAGIC, len(sealed)), sealed] + pages)
+    return dictionary
+
+
+class Segment:
+    """
+    Класс сегмента поискового индекса, сохранённого на диске.
+
+    Словарь терминов дешифруется в память при открытии, страницы списков номеров сообщений
+    читаются из отображённого в память файла и дешифруются только при поиске;
+    последние PAGE_CACHE_SIZE дешифрованных страниц хранятся в памяти.
+
+    """
+
+    def __init__(self, path: str, mgm: MGMMode, level: int = 0, dictionary: Optional[bytes] = None):
+        self.path = path
+        self.mgm = mgm
+        self.level = level
+        self.name = os.path.basename(path).encode(encoding='utf-8')
+        self.cache = OrderedDict()
+        self.cache_lock = threading.Lock()
+        with open(path, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, size = SEGMENT_HEADER.unpack_from(self.map, 0)
+            if magic != SEGMENT_MAGIC:
+                raise ValueError
+            if dictionary is None:
+                dictionary = self.map[SEGMENT_HEADER.size:SEGMENT_HEADER.size + size]
+                dictionary = zlib.decompress(mgm.open(data=dictionary, associated_data=SEGMENT_MAGIC + self.name))
+            self.load_dictionary(dictionary=dictionary)
+        except (ValueError, struct.error, zlib.error):
+            self.map.close()
+            raise ValueError
+        self.base = SEGMENT_HEADER.size + size
+
+    def load_dictionary(self, dictionary: bytes) -> None:
+        """
+        Метод разбора дешифрованного словаря терминов.
+
+        :param dictionary: bytes, словарь терминов и таблица страниц
+        :return: None
+        """
+
+        count, pages = DICTIONARY_HEADER.unpack_from(dictionary, 0)
+        position = DICTIONARY_HEADER.size
+        self.page_offsets, self.page_lengths = array.array('Q'), array.array('I')
+        for _ in range(pages):
+            offset, length = PAGE_ENTRY.unpack_from(dictionary, position)
+            self.page_offsets.append(offset)
+            self.page_lengths.append(length)
+            position += PAGE_ENTRY.size
+        self.terms, self.pages = [], array.array('I')
+        self.offsets, self.counts = array.array('I'), array.array('I')
+        for _ in range(count):
+            length, = TERM_HEADER.unpack_from(dictionary, position)
+            position += TERM_HEADER.size
+            self.terms.append(str(dictionary[position:position + length], encoding='utf-8'))
+            page, offset, number = TERM_POSTINGS.unpack_from(dictionary, position + length)
+            self.pages.append(page)
+            self.offsets.append(offset)
+            self.counts.append(number)
+            position += length + TERM_POSTINGS.size
+
+    def read_page(self, page: int) -> bytes:
+        """
+        Метод чтения и дешифрования страницы списков номеров.
+
+        :param page: int, номер страницы
+        :return: bytes, списки номеров страницы
+        """
+
+        with self.cache_lock:
+            data = self.cache.get(page)
+            if data is not None:
+                self.cache.move_to_end(page)
+                return data
+        start = self.base + self.page_offsets[page]
+        try:
+            data = zlib.decompress(self.mgm.open(data=self.map[start:start + self.page_lengths[page]],
+                                                 associated_data=page_associated_data(name=self.name, page=page)))
+        except zlib.error:
+            raise ValueError
+        with self.cache_lock:
+            self.cache[page] = data
+            if len(self.cache) > PAGE_CACHE_SIZE:
+                self.cache.popitem(last=False)
+        return data
+
+    def postings(self, i: int) -> array.array:
+        """
+        Метод чтения списка номеров сообщений термина.
+
+        При повреждении сегмента возникает исключение ValueError (MGMAuthenticationError).
+
+        :param i: int, номер термина в словаре
+        :return: array.array, номера сообщений по возрастанию
+        """
+
+        start = self.offsets[i]
+        return decode_postings(data=self.read_page(page=self.pages[i])[start:start + 4 * self.counts[i]])
+
+    def find(self, term: str, prefix: bool = False) -> List[int]:
+        """
+        Метод поиска терминов словаря.
+
+        :param term: str, приведённое слово
+        :param prefix: bool, искать все термины, начинающиеся с term
+        :return: list, номера найденных терминов в словаре
+        """
+
+        start = bisect.bisect_left(self.terms, term)
+        if not prefix:
+            return [start] if start < len(self.terms) and self.terms[start] == term else []
+        stop = start
+        while stop < len(self.terms) and self.terms[stop].startswith(term):
+            stop += 1
+        return list(range(start, stop))
+
+    def close(self) -> None:
+        """
+        Метод закрытия сегмента.
+
+        :return: None
+        """
+
+        self.map.close()
+        self.cache.clear()
+
+
+class SearchIndex:
+    """
+    Класс инкрементального полнотекстового индекса истории переписки.
+
+    Новые сообщения попадают в дельту в памяти; когда в дельте накапливается segment_messages сообщений,
+    фоновый поток записывает её на диск отдельным сегментом. Когда в конце списка оказывается merge_factor
+    сегментов одного уровня, фоновый поток объединяет их в один сегмент следующего уровня, поэтому каждый номер
+    сообщения перезаписывается логарифмическое число раз. Список сегментов и номер следующего
+    неиндексированного сообщения хранятся в файле-манифесте, поэтому при запуске повторно индексируются
+    только сообщения, не попавшие в сегменты.
+
+    Сегменты и манифест шифруются в режиме MGM локальным ключом истории и доступны только владельцу,
+    поэтому индекс не раскрывает слов переписки.
+
+    """
+
+    def __init__(self, path: str, key: bytes, segment_messages: int = SEGMENT_MESSAGES,
+                 merge_factor: int = MERGE_FACTOR):
+        if merge_factor < 2:
+            raise ValueError
+        self.path = path
+        self.segment_messages = segment_messages
+        self.merge_factor = merge_factor
+        self.mgm = MGMMode(cipher=GOST34122018(master_key=list(key)))
+        self.lock = threading.Lock()
+        self.merger = None
+        self.closing = False
+        self.backlog = None
+        self.sealed = []
+        self.delta = defaultdict(lambda: array.array('I'))
+        self.delta_messages = 0
+        self.segments, self.saved, self.next_id = self.load_manifest()
+        self.indexed = self.saved
+
+    def load_manifest(self) -> tuple:
+        """
+        Метод чтения манифеста и открытия сегментов.
+
+        Повреждённый, подменённый или отсутствующий манифест означает пустой индекс. Файлы сегментов,
+        не указанные в манифесте (например, оставшиеся после прерванного объединения), удаляются.
+
+        :return: tuple, (сегменты, количество проиндексированных в сегментах сообщений, номер следующего сегмента)
+        """
+
+        try:
+            with open(f'{self.path}.manifest', 'rb') as file:
+                manifest = json.loads(self.mgm.open(data=file.read(), associated_data=MANIFEST_MAGIC))
+            names, indexed, next_id = manifest['segments'], manifest['indexed'], manifest['next_id']
+            segments = [Segment(path=f'{self.path}.{name}', mgm=self.mgm, level=level) for name, level in names]
+            names = [name for name, _ in names]
+        except (OSError, ValueError, KeyError, TypeError):
+            names, segments, indexed, next_id = [], [], 0, 0
+        directory, base = os.path.split(self.path)
+        for name in os.listdir(directory or '.'):
+            if name.startswith(f'{base}.seg') and name[len(base) + 1:] not in names:
+                os.remove(os.path.join(directory, name))
+        return segments, indexed, next_id
+
+    def save_manifest(self) -> None:
+        """
+        Метод записи манифеста (выполняется под блокировкой индекса).
+
+        :return: None
+        """
+
+        manifest = {
+            'segments': [[os.path.basename(segment.path)[len(os.path.basename(self.path)) + 1:], segment.level]
+                         for segment in self.segments],
+            'indexed': self.saved,
+            'next_id': self.next_id,
+        }
+        sealed = self.mgm.seal(data=json.dumps(manifest).encode(encoding='utf-8'), associated_data=MANIFEST_MAGIC)
+        write_file(path=f'{self.path}.manifest', parts=[sealed])
+
+    def insert(self, seq: int, text: str) -> None:
+        """
+        Метод добавления сообщения в дельту (выполняется под блокировкой индекса).
+
+        :param seq: int, порядковый номер сообщения в истории
+        :param text: str, текст сообщения
+        :return: None
+        """
+
+        for term in set(tokenize(text=text)):
+            self.delta[term].append(seq)
+        self.delta_messages += 1
+        self.indexed = seq + 1
+
+    def seal(self) -> None:
+        """
+        Метод передачи дельты фоновому потоку для записи сегментом (выполняется под блокировкой индекса).
+
+        До записи сегмента поиск использует переданную дельту.
+
+        :return: None
+        """
+
+        if self.delta_messages:
+            self.sealed.append((self.delta, self.indexed))
+            self.delta = defaultdict(lambda: array.array('I'))
+            self.delta_messages = 0
+
+    def add(self, seq: int, text: str) -> None:
+        """
+        Метод добавления сообщения в индекс.
+
+        Сообщения добавляются подряд в порядке возрастания номеров; уже проиндексированные номера и номера
+        после пропуска (их проиндексирует следующее открытие индекса) пропускаются.
+        Пока фоновый поток индексирует историю, сообщения откладываются и добавляются после неё.
+
+        :param seq: int, порядковый номер сообщения в истории
+        :param text: str, текст сообщения
+        :return: None
+        """
+
+        with self.lock:
+            if self.backlog is not None:
+                self.backlog.append((seq, text))
+                return
+            if seq != self.indexed:
+                return
+            self.insert(seq=seq, text=text)
+            full = self.delta_messages >= self.segment_messages
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Метод передачи дельты фоновому потоку для записи на диск новым сегментом.
+
+        :return: None
+        """
+
+        with self.lock:
+            self.seal()
+            if self.sealed and self.merger is None:
+                self.merger = threading.Thread(target=self.merging, daemon=True)
+                self.merger.start()
+
+    def index_history(self, history: HistoryLog) -> None:
+        """
+        Метод запуска фоновой индексации сообщений истории, не попавших в индекс.
+
+        :param history: HistoryLog, история переписки
+        :return: None
+        """
+
+        with self.lock:
+            if self.indexed >= len(history) or self.merger is not None:
+                return
+            self.backlog = []
+            self.merger = threading.Thread(target=self.merging, args=(history,), daemon=True)
+            self.merger.start()
+
+    def reindex(self, history: HistoryLog) -> None:
+        """
+        Метод индексации сообщений истории (выполняется фоновым потоком).
+
+        Повреждённые записи истории индексируются как пустые сообщения. При закрытии индекса
+        индексация прерывается, оставшиеся сообщения индексируются при следующем открытии.
+        Отложенные за время индексации сообщения добавляются в конце.
+
+        :param history: HistoryLog, история переписки
+        :return: None
+        """
+
+        seq = self.indexed
+        while seq < len(history) and not self.closing:
+            try:
+                text = history.get(seq=seq).text
+            except ValueError:
+                text = ''
+            with self.lock:
+                self.insert(seq=seq, text=text)
+                if self.delta_messages >= self.segment_messages:
+                    self.seal()
+            self.write_sealed()
+            seq += 1
+        with self.lock:
+            self.add_backlog()
+
+    def add_backlog(self) -> None:
+        """
+        Метод добавления сообщений, отложенных на время индексации истории (выполняется под блокировкой индекса).
+
+        Если индексация прервана, отложенные сообщения отбрасываются: их проиндексирует следующее открытие индекса.
+
+        :return: None
+        """
+
+        for seq, text in self.backlog:
+            if seq == self.indexed:
+                self.insert(seq=seq, text=text)
+        self.backlog = None
+        if self.delta_messages >= self.segment_messages:
+            self.seal()
+
+    def write_sealed(self) -> None:
+        """
+        Метод записи переданных фоновому потоку дельт сегментами (выполняется фоновым потоком).
+
+        :return: None
+        """
+
+        while True:
+            with self.lock:
+                if not self.sealed:
+                    return
+                postings, indexed = self.sealed[0]
+                path = f'{self.path}.seg{self.next_id}'
+                self.next_id += 1
+            dictionary = write_segment(path=path, postings=postings, mgm=self.mgm)
+            with self.lock:
+                self.segments.append(Segment(path=path, mgm=self.mgm, dictionary=dictionary))
+                del self.sealed[0]
+                self.saved = indexed
+                self.save_manifest()
+
+    def merging(self, history: Optional[HistoryLog] = None) -> None:
+        """
+        Метод фонового потока индекса.
+
+        Индексирует историю (если она передана), записывает переданные дельты сегментами и объединяет сегменты,
+        пока есть работа. Поток завершается и при ошибке, следующая дельта запускает новый поток.
+
+        :param history: HistoryLog, история переписки или None
+        :return: None
+        """
+
+        try:
+            if history is not None:
+                self.reindex(history=history)
+            while True:
+                self.write_sealed()
+                with self.lock:
+                    segments = None if self.sealed else self.find_merge()
+                    if not segments and not self.sealed:
+                        self.merger = None
+                        return
+                if segments:
+                    self.merge(segments=segments)
+        finally:
+            with self.lock:
+                if self.backlog is not None:
+                    self.add_backlog()
+                if self.merger is threading.current_thread():
+                    self.merger = None
+
+    def find_merge(self) -> Optional[List[Segment]]:
+        """
+        Метод выбора сегментов для объединения (выполняется под блокировкой индекса).
+
+        Выбираются первые с начала списка сегменты, поэтому уровни сегментов не возрастают к концу списка.
+
+        :return: list, merge_factor идущих подряд сегментов одного уровня или None
+        """
+
+        for start in range(len(self.segments) - self.merge_factor + 1):
+            run = self.segments[start:start + self.merge_factor]
+            if all(segment.level == run[0].level for segment in run):
+                return run
+        return None
+
+    def merge(self, segments: List[Segment]) -> None:
+        """
+        Метод объединения сегментов (выполняется фоновым потоком).
+
+        Сегменты упорядочены по номерам сообщений, поэтому списки номеров термина объединяются конкатенацией,
+        а объединённый сегмент занимает место исходных в списке.
+        Поиск во время объединения продолжает использовать исходные сегменты.
+
+        :param segments: list, объединяемые сегменты
+        :return: None
+        """
+
+        with self.lock:
+            path = f'{self.path}.seg{self.next_id}'
+            self.next_id += 1
+        postings = defaultdict(lambda: array.array('I'))
+        for segment in segments:
+            for i, term in enumerate(segment.terms):
+                postings[term].extend(segment.postings(i=i))
+        dictionary = write_segment(path=path, postings=postings, mgm=self.mgm)
+        merged = Segment(path=path, mgm=self.mgm, level=segments[0].level + 1, dictionary=dictionary)
+        with self.lock:
+            start = self.segments.index(segments[0])
+            self.segments[start:start + len(segments)] = [merged]
+            self.save_manifest()
+        for segment in segments:
+            segment.close()
+            os.remove(segment.path)
+
+    def clear(self) -> None:
+        """
+        Метод удаления всех сегментов индекса.
+
+        :return: None
+        """
+
+        merger = self.merger
+        if merger is not None:
+            merger.join()
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+                os.remove(segment.path)
+            self.segments = []
+            self.sealed = []
+            self.delta = defaultdict(lambda: array.array('I'))
+            self.delta_messages = 0
+            self.saved = self.indexed = 0
+            self.save_manifest()
+
+    def lookup(self, term: str, prefix: bool) -> set:
+        """
+        Метод получения номеров сообщений, содержащих слово (выполняется под блокировкой индекса).
+
+        :param term: str, приведённое слово
+        :param prefix: bool, искать слова, начинающиеся с term
+        :return: set, номера сообщений
+        """
+
+        result = set()
+        for segment in self.segments:
+            for i in segment.find(term=term, prefix=prefix):
+                result.update(segment.postings(i=i))
+        for delta, _ in self.sealed + [(self.delta, self.indexed)]:
+            if prefix:
+                for delta_term, postings in delta.items():
+                    if delta_term.startswith(term):
+                        result.update(postings)
+            elif term in delta:
+                result.update(delta[term])
+        return result
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT, prefix: bool = True) -> List[int]:
+        """
+        Метод поиска сообщений, содержащих все слова запроса.
+
+        :param query: str, запрос
+        :param limit: int, максимальное количество результатов
+        :param prefix: bool, считать слова запроса началами слов сообщения
+        :return: list, номера найденных сообщений, начиная с самых новых
+        """
+
+        terms = sorted(set(tokenize(text=query)), key=len, reverse=True)
+        if not terms:
+            return []
+        with self.lock:
+            result = self.lookup(term=terms[0], prefix=prefix)
+            for term in terms[1:]:
+                if not result:
+                    break
+                result &= self.lookup(term=term, prefix=prefix)
+        return heapq.nlargest(limit, result)
+
+    def close(self) -> None:
+        """
+        Метод закрытия индекса: прерывает индексацию истории, записывает дельту,
+        дожидается фонового потока и закрывает сегменты.
+
+        :return: None
+        """
+
+        self.closing = True
+        merger = self.merger
+        if merger is not None:
+            merger.join()
+        self.flush()
+        merger = self.merger
+        if merger is not None:
+            merger.join()
+        with self.lock:
+            for segment in self.segments:
+                segment.close()
+            self.segments = []
+
+
+def open_index(path: str, key: bytes, history: Optional[HistoryLog] = None) -> SearchIndex:
+    """
+    Функция открытия поискового индекса истории переписки.
+
+    Сообщения истории, не попавшие в сохранённые сегменты, индексируются фоновым потоком индекса,
+    до её окончания поиск находит только часть сообщений.
+    Если индекс охватывает больше сообщений, чем есть в истории (при восстановлении после
+    аварийного завершения история потеряла записи, не сброшенные на диск), номера в индексе
+    могут указывать на другие сообщения, поэтому индекс строится заново.
+
+    :param path: str, путь к файлам истории без расширения
+    :param key: bytes, локальный ключ шифрования истории
+    :param history: HistoryLog, история переписки
+    :return: SearchIndex, индекс
+    """
+
+    index = SearchIndex(path=path, key=key)
+    if history is not None:
+        if index.indexed > len(history):
+            index.clear()
+        index.index_history(history=history)
+    return index
@@ -0,0 +1,449 @@
+import binascii
+import itertools
+import os
+import random
+import struct
+import time
+import zlib
+from typing import Iterator, List, Optional, Tuple
+from app import framing
+from gost.crypto import GOST34122018
+from gost.mgm import MGM_NONCE_SIZE, MGMMode
+from gost import padding, streaming
+from gost.modes import CTR_HEADER_SIZE, CTR_IV_SIZE, CTR_PARALLEL_THRESHOLD, RESERVOIR_HIGH_WATERMARK, \
+    RESERVOIR_LOW_WATERMARK, CTRMode
+from gost.consts import PRIMES
+
+
+class ChatSession:
+    """
+    Класс криптографической сессии обмена сообщениями с одним собеседником.
+
+    Хранит согласованный режим шифрования, объект шифра ГОСТ 34.12-2018 и объект режима,
+    формирует ключи для обмена по протоколу Диффи-Хеллмана и шифрует/дешифрует сообщения.
+    Не зависит от способа передачи данных, поэтому используется всеми обработчиками соединений
+    и многосессионным сервером, вместе с сообщениями запроса на подключение и ответов на него.
+
+    Если обе стороны поддерживают сжатие, длинные сообщения сжимаются zlib перед шифрованием,
+    поэтому шифруется и передаётся меньше блоков. Сжатые кадры помечаются флагом COMPRESSED_FLAG.
+
+    """
+
+    CLIENT = 'client'
+    SERVER = 'server'
+    ECB_MODE = 'ecb'
+    CTR_MODE = 'ctr'
+    MGM_MODE = 'mgm'
+    SUPPORTED_MODES = [MGM_MODE, CTR_MODE, ECB_MODE]
+    ZLIB_FEATURE = 'zlib'
+    SUPPORTED_FEATURES = [ZLIB_FEATURE]
+    # Сообщения короче COMPRESSION_MIN_SIZE байтов не сжимаются
+    COMPRESSION_MIN_SIZE = 128
+    COMPRESSION_LEVEL = 6
+    # Длинные сообщения сначала проверяются сжатием образца длиной COMPRESSION_SAMPLE_SIZE байтов:
+    # если образец сжимается хуже, чем до COMPRESSION_MAX_RATIO, сообщение считается несжимаемым
+    COMPRESSION_SAMPLE_SIZE = 4096
+    COMPRESSION_MAX_RATIO = 0.9
+    BLOCK_SIZE = 16
+    # Несжимаемые сообщения не короче STREAM_THRESHOLD байтов в режимах гаммирования и простой замены
+    # шифруются и отправляются порциями
+    STREAM_THRESHOLD = 256 * 1024
+    REQUEST_MESSAGE = b'REQUEST'
+    OK_RESPONSE = b'OK'
+    NOK_RESPONSE = b'NOK'
+    WAIT_RESPONSE = b'WAIT'
+    RESPONSES = [OK_RESPONSE, NOK_RESPONSE, WAIT_RESPONSE]
+
+    def __init__(self, role: str, ctr_parallel_threshold: int = CTR_PARALLEL_THRESHOLD,
+                 reservoir_low_watermark: Optional[int] = RESERVOIR_LOW_WATERMARK,
+                 reservoir_high_watermark: int = RESERVOIR_HIGH_WATERMARK, compression: bool = True):
+        self.role = role
+        self.compression = compression
+        self.ctr_parallel_threshold = ctr_parallel_threshold
+        self.reservoir_low_watermark = reservoir_low_watermark
+        self.reservoir_high_watermark = reservoir_high_watermark
+        self.gost = None
+        self.mode = None
+        self.ctr = None
+        self.mgm = None
+        self.companion_features = []
+        self.compress = False
+        self.send_counter = 0
+        self.receive_counter = 0
+
+    def create_open_key(self, address: Tuple[str, int]) -> Tuple[str, bytes]:
+        """
+        Метод формирования закрытого и открытого ключей.
+
+        :param address: tuple, локальный адрес сокета (IP-адрес, порт)
+        :return: tuple, (закрытый ключ, открытый ключ со списками поддерживаемых режимов шифрования и возможностей)
+        """
+
+        my_secret = f'{address[0].replace(".", "")}' \
+                    f'{address[1]}' \
+                    f'{int(time.time())}'
+        k = 64 - len(my_secret)
+        my_secret += ''.join(random.choices('0123456789abcdef', k=k))
+        p1, p2 = PRIMES
+        features = ",".join(self.SUPPORTED_FEATURES if self.compression else [])
+        my_open = f'{pow(p1, int(my_secret, 16), p2)} {",".join(self.SUPPORTED_MODES)} {features}'.strip()
+        return my_secret, my_open.encode(encoding='utf-8')
+
+    def compute_master(self, secret: str, companion_open: bytes) -> Tuple[str, List[str]]:
+        """
+        Метод вычисления мастер-ключа по открытому ключу собеседника.
+
+        Список возможностей собеседника (третье поле открытого ключа, пустое, если собеседник
+        не поддерживает сжатие) сохраняется в атрибуте companion_features.
+
+        :param secret: str, закрытый ключ
+        :param companion_open: bytes, открытый ключ, списки режимов шифрования и возможностей собеседника
+        :return: tuple, (мастер-ключ длиной 256 бит, список режимов шифрования собеседника)
+        """
+
+        data = companion_open.decode(encoding='utf-8').split(' ')
+        companion_modes = data[1].split(',') if len(data) > 1 else []
+        self.companion_features = data[2].split(',') if len(data) > 2 else []
+        int_master = pow(int(data[0]), int(secret, 16), PRIMES[1])
+        hex_master = hex(int_master)
+        return hex_master[2:66], companion_modes
+
+    def mode_negotiation(self, companion_modes: List[str]) -> str:
+        """
+        Метод согласования режима шифрования.
+
+        Выбирается первый режим из списка клиента, поддерживаемый сервером,
+        поэтому обе стороны независимо приходят к одному и тому же режиму.
+        Если общего режима нет (в том числе если собеседник не передал список режимов),
+        возникает исключение ValueError.
+
+        :param companion_modes: list, режимы шифрования, поддерживаемые собеседником
+        :return: str, согласованный режим шифрования
+        """
+
+        if self.role == self.CLIENT:
+            client_modes, server_modes = self.SUPPORTED_MODES, companion_modes
+        else:
+            client_modes, server_modes = companion_modes, self.SUPPORTED_MODES
+        for mode in client_modes:
+            if mode in server_modes:
+                return mode
+        raise ValueError
+
+    def start(self, hex_master: str, companion_modes: List[str]) -> None:
+        """
+        Метод запуска сессии после обмена ключами.
+
+        Согласует режим шифрования и сжатие и создаёт объекты шифра и режима для мастер-ключа.
+        Резервуар гаммы режима гаммирования заполняется заранее, если задан reservoir_low_watermark.
+        Сжатие включается, только если его поддерживают обе стороны.
+
+        :param hex_master: str, мастер-ключ длиной 256 бит
+        :param companion_modes: list, режимы шифрования, поддерживаемые собеседником
+        :return: None
+        """
+
+        self.mode = self.mode_negotiation(companion_modes=companion_modes)
+        self.compress = self.compression and self.ZLIB_FEATURE in self.companion_features
+        self.send_counter = 0
+        self.receive_counter = 0
+        master = list(binascii.unhexlify(hex_master))
+        self.gost = GOST34122018(master_key=master)
+        if self.mode == self.CTR_MODE:
+            self.ctr = CTRMode(cipher=self.gost, parallel_threshold=self.ctr_parallel_threshold)
+            if self.reservoir_low_watermark is not None:
+                self.ctr.enable_prefetch(low_watermark=self.reservoir_low_watermark,
+                                         high_watermark=self.reservoir_high_watermark)
+        elif self.mode == self.MGM_MODE:
+            self.mgm = MGMMode(cipher=self.gost, parallel_threshold=self.ctr_parallel_threshold)
+
+    def stop(self) -> None:
+        """
+        Метод освобождения ресурсов шифра сессии.
+
+        :return: None
+        """
+
+        if self.ctr:
+            self.ctr.disable_prefetch()
+            self.ctr = None
+        self.mgm = None
+
+    def compress_data(self, data: bytes) -> Optional[bytes]:
+        """
+        Метод сжатия открытого текста сообщения.
+
+        Короткие сообщения не сжимаются. У длинных сообщений сначала сжимается образец из начала:
+        если он почти не сжимается (высокая энтропия – архивы, уже зашифрованные данные), сообщение
+        отправляется как есть, не тратя время на сжатие целиком. Сжатый вариант используется,
+        только если он экономит хотя бы один блок шифра.
+
+        :param data: bytes, открытый текст сообщения
+        :return: bytes, сжатые данные или None, если сжимать сообщение невыгодно
+        """
+
+        if not self.compress or len(data) < self.COMPRESSION_MIN_SIZE:
+            return None
+        if len(data) > self.COMPRESSION_SAMPLE_SIZE:
+            sample = data[:self.COMPRESSION_SAMPLE_SIZE]
+            if len(zlib.compress(sample, 1)) > self.COMPRESSION_MAX_RATIO * len(sample):
+                return None
+        compressed = zlib.compress(data, self.COMPRESSION_LEVEL)
+        if len(compressed) + self.BLOCK_SIZE > len(data):
+            return None
+        return compressed
+
+    @staticmethod
+    def decompress_data(data: bytes) -> bytes:
+        """
+        Метод распаковки сжатого сообщения.
+
+        Размер распакованных данных ограничен размером кадра, поэтому сжатое сообщение
+        не может занять больше памяти, чем несжатое.
+
+        :param data: bytes, сжатые данные
+        :return: bytes, открытый текст сообщения
+        """
+
+        decompressor = zlib.decompressobj()
+        try:
+            recovered = decompressor.decompress(data, framing.MAX_FRAME_SIZE)
+        except zlib.error:
+            raise ValueError
+        if not decompressor.eof or decompressor.unconsumed_tail:
+            raise ValueError
+        return recovered
+
+    def encrypt_data(self, data: bytes, flags: int = 0) -> bytes:
+        """
+        Метод шифрования данных сообщения.
+
+        Шифрует данные в согласованном режиме.
+        В режиме MGM роль отправителя и номер сообщения в этом направлении передаются
+        как ассоциированные данные, поэтому сообщение, возвращённое отправителю, повторённое,
+        переставленное или следующее за пропущенным, не пройдёт проверку имитовставки;
+        если согласовано сжатие, к ним добавляются флаги кадра, чтобы их нельзя было подменить.
+        Сообщения шифруются в порядке отправки (из одного потока).
+        В режиме гаммирования гамма берётся из заранее заполненного резервуара сессии,
+        в режиме простой замены данные дополняются по процедуре 2 ГОСТ 34.13-2018
+        и все блоки шифруются пакетно.
+
+        :param data: bytes, данные сообщения (открытый текст или сжатый открытый текст)
+        :param flags: int, флаги кадра
+        :return: bytes, зашифрованные данные
+        """
+
+        if self.mode == self.MGM_MODE:
+            associated_data = self.associated_data(role=self.role, counter=self.send_counter, flags=flags)
+            self.send_counter += 1
+            return self.mgm.seal(data=data, associated_data=associated_data)
+        if self.mode == self.CTR_MODE:
+            return self.ctr.encrypt(data=data)
+        return self.gost.encrypt_bytes(data=padding.pad(data=data))
+
+    def decrypt_data(self, cipher: bytes, flags: int = 0) -> bytes:
+        """
+        Метод дешифрования данных сообщения.
+
+        Дешифрует данные в согласованном режиме.
+        В режиме MGM перед дешифрованием проверяется имитовставка с ожидаемым номером сообщения,
+        при её несовпадении (в том числе при повторе, перестановке или пропуске сообщения)
+        возникает исключение MGMAuthenticationError.
+        В режиме простой замены все блоки сообщения дешифруются пакетно,
+        после чего за постоянное время удаляется дополнение по процедуре 2 ГОСТ 34.13-2018.
+
+        :param cipher: bytes, зашифрованные данные собеседника
+        :param flags: int, флаги кадра
+        :return: bytes, дешифрованные данные
+        """
+
+        if self.mode == self.MGM_MODE:
+            companion_role = self.SERVER if self.role == self.CLIENT else self.CLIENT
+            recovered = self.mgm.open(data=cipher, associated_data=self.associated_data(
+                role=companion_role, counter=self.receive_counter, flags=flags))
+            self.receive_counter += 1
+            return recovered
+        if self.mode == self.CTR_MODE:
+            return self.ctr.decrypt(data=cipher)
+        return padding.unpad(data=self.gost.decrypt_bytes(data=cipher))
+
+    def associated_data(self, role: str, counter: int, flags: int) -> bytes:
+        """
+        Метод формирования ассоциированных данных режима MGM.
+
+        :param role: str, роль отправителя
+        :param counter: int, номер сообщения в направлении от отправителя
+        :param flags: int, флаги кадра
+        :return: bytes, ассоциированные данные
+        """
+
+        prefix = role.encode(encoding='utf-8') + struct.pack('>Q', counter)
+        if self.compress:
+            return prefix + bytes([flags])
+        return prefix
+
+    def encode_message(self, msg: str) -> framing.Frame:
+        """
+        Метод формирования кадра с отправляемым сообщением.
+
+        Сообщение сжимается, если сжатие согласовано и выгодно, и шифруется.
+
+        :param msg: str, текст отправляемого сообщения (открытый текст)
+        :return: Frame, кадр с зашифрованным сообщением
+        """
+
+        return self.encode_data(data=msg.encode(encoding='utf-8'))
+
+    def payload_size(self, length: int) -> int:
+        """
+        Метод вычисления длины зашифрованных данных сообщения в согласованном режиме.
+
+        :param length: int, длина данных сообщения (открытого текста или сжатого открытого текста)
+        :return: int, длина полезной нагрузки кадра
+        """
+
+        if self.mode == self.MGM_MODE:
+            return MGM_NONCE_SIZE + length + self.mgm.tag_size
+        if self.mode == self.CTR_MODE:
+            return CTR_HEADER_SIZE + length
+        return padding.padded_size(length=length)
+
+    def encode_data(self, data: bytes, compressed: Optional[bytes] = None) -> framing.Frame:
+        """
+        Метод формирования кадра с данными сообщения.
+
+        Длина кадра проверяется до шифрования, поэтому отклонённое сообщение (исключение FrameError)
+        не расходует номер сообщения режима MGM и не нарушает порядок сообщений у собеседника.
+
+        :param data: bytes, открытый текст сообщения
+        :param compressed: bytes, уже сжатые данные сообщения (если сжатие уже выполнено)
+        :return: Frame, кадр с зашифрованным сообщением
+        """
+
+        if compressed is None:
+            compressed = self.compress_data(data=data)
+        flags = 0
+        if compressed is not None:
+            data, flags = compressed, framing.COMPRESSED_FLAG
+        if self.payload_size(length=len(data)) > framing.MAX_FRAME_SIZE:
+            raise framing.FrameError
+        return framing.Frame(type=framing.MESSAGE_FRAME, flags=flags, payload=self.encrypt_data(data=data, flags=flags))
+
+    def encode_message_stream(self, msg: str) -> Iterator[bytes]:
+        """
+        Метод формирования кадра с отправляемым сообщением по частям.
+
+        В режимах гаммирования и простой замены длина шифротекста известна заранее, поэтому
+        для длинного несжимаемого сообщения сразу выдаётся заголовок кадра, а сообщение шифруется
+        потоковым контекстом (см. gost.streaming) порциями: вызывающая сторона записывает в сокет
+        каждую порцию, пока шифруется следующая, и шифротекст сообщения целиком в памяти не хранится.
+        Остальные сообщения (в том числе в режиме MGM, где имитовставка вычисляется по всему сообщению)
+        выдаются одним кадром.
+
+        :param msg: str, текст отправляемого сообщения (открытый текст)
+        :return: iterator, части кадра (bytes)
+        """
+
+        data = msg.encode(encoding='utf-8')
+        compressed = None
+        if len(data) >= self.STREAM_THRESHOLD and self.mode in [self.CTR_MODE, self.ECB_MODE]:
+            compressed = self.compress_data(data=data)
+            if compressed is None:
+                yield from self.stream_data(data=data)
+                return
+        yield framing.encode_frames(frames=[self.encode_data(data=data, compressed=compressed)])
+
+    def iterate_writes(self, messages: List[str], rejected: Optional[List[str]] = None) -> Iterator[bytes]:
+        """
+        Метод разбиения потока кадров нескольких сообщений на записи в сокет.
+
+        Части кадров накапливаются, пока их суммарная длина меньше STREAM_CHUNK,
+        поэтому короткие сообщения уходят одной записью, а длинное — по мере шифрования.
+        Сообщение, которое нельзя передать одним кадром, отклоняется до выдачи первой части кадра:
+        при переданном списке rejected оно добавляется в него, и обработка продолжается.
+
+        :param messages: list, тексты отправляемых сообщений
+        :param rejected: list, список для отклонённых сообщений (без него исключение FrameError не перехватывается)
+        :return: iterator, данные очередной записи (bytes)
+        """
+
+        pending, size = [], 0
+        for msg in messages:
+            parts = self.encode_message_stream(msg=msg)
+            try:
+                first = next(parts)
+            except framing.FrameError:
+                if rejected is None:
+                    raise
+                rejected.append(msg)
+                continue
+            for part in itertools.chain([first], parts):
+                pending.append(part)
+                size += len(part)
+                if size >= streaming.STREAM_CHUNK:
+                    yield b''.join(pending)
+                    pending, size = [], 0
+        if pending:
+            yield b''.join(pending)
+
+    def stream_data(self, data: bytes) -> Iterator[bytes]:
+        """
+        Метод потокового шифрования несжатого сообщения в режиме гаммирования или простой замены.
+
+        В режиме гаммирования порции имеют длину не меньше порога распараллеливания,
+        поэтому гамма длинного сообщения по-прежнему вырабатывается в пуле процессов.
+
+        Кадр длиннее MAX_FRAME_SIZE не формируется (исключение FrameError до выдачи заголовка),
+        как и при кадрировании сообщения целиком.
+
+        :param data: bytes, открытый текст сообщения
+        :return: iterator, заголовок кадра и порции шифротекста
+        """
+
+        data = memoryview(data)
+        size = self.payload_size(length=len(data))
+        if size > framing.MAX_FRAME_SIZE:
+            raise framing.FrameError
+        if self.mode == self.CTR_MODE:
+            iv = os.urandom(CTR_IV_SIZE)
+            context = self.ctr.encryptor(iv=iv)
+            yield framing.FRAME_HEADER.pack(framing.MESSAGE_FRAME, 0, size) + iv + bytes(CTR_HEADER_SIZE - CTR_IV_SIZE)
+            body, chunk = len(data), max(streaming.STREAM_CHUNK, self.ctr.parallel_threshold)
+        else:
+            context = self.gost.encryptor()
+            yield framing.FRAME_HEADER.pack(framing.MESSAGE_FRAME, 0, size)
+            body, chunk = len(data) - len(data) % self.BLOCK_SIZE, streaming.STREAM_CHUNK
+        for start in range(0, body, chunk):
+            yield context.update(data=data[start:min(start + chunk, body)])
+        if self.mode == self.ECB_MODE:
+            yield context.update(data=padding.pad(data=data[body:]))
+        context.finalize()
+
+    def decode_message(self, frame: framing.Frame) -> str:
+        """
+        Метод получения текста сообщения из кадра.
+
+        Кадр дешифруется и, если установлен флаг COMPRESSED_FLAG, распаковывается.
+        Сжатый кадр в сессии без согласованного сжатия считается некорректным (исключение ValueError).
+
+        :param frame: Frame, кадр с зашифрованным сообщением собеседника
+        :return: str, текст дешифрованного сообщения собеседника
+        """
+
+        if frame.flags & ~framing.COMPRESSED_FLAG or (frame.flags and not self.compress):
+            raise ValueError
+        data = self.decrypt_data(cipher=frame.payload, flags=frame.flags)
+        if frame.flags & framing.COMPRESSED_FLAG:
+            data = self.decompress_data(data=data)
+        return str(data, encoding='utf-8')
+
+    def get_reservoir_stats(self) -> dict:
+        """
+        Метод получения статистики резервуара гаммы сессии.
+
+        :return: dict, количество попаданий, промахов и текущий объём гаммы (пустой словарь вне режима гаммирования)
+        """
+
+        if self.ctr and self.ctr.reservoir:
+            return self.ctr.reservoir.get_stats()
+        return {}
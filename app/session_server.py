@@ -0,0 +1,578 @@
+import queue
+import selectors
+import socket
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set
+from app import framing
+from app.session import ChatSession
+from gost.modes import CTR_PARALLEL_THRESHOLD
+
+
+class ServerSession:
+    """
+    Класс состояния одного подключения к многосессионному серверу.
+
+    Подключение проходит стадии request (ожидание запроса REQUEST), pending (ожидание решения),
+    key (обмен открытыми ключами) и chatting (обмен сообщениями).
+
+    """
+
+    REQUEST_STAGE = 'request'
+    PENDING_STAGE = 'pending'
+    KEY_STAGE = 'key'
+    CHATTING_STAGE = 'chatting'
+    CLOSED_STAGE = 'closed'
+
+    def __init__(self, session_id: int, sock: socket.socket, address, deadline: float):
+        self.id = session_id
+        self.socket = sock
+        self.address = address
+        self.stage = self.REQUEST_STAGE
+        self.deadline = deadline
+        self.keepalive = None
+        self.deferred = False
+        self.request = b''
+        self.decoder = framing.FrameDecoder()
+        self.outbound = bytearray()
+        self.writing = False
+        self.secret = None
+        self.chat = None
+
+
+class SessionServer:
+    """
+    Класс многосессионного сервера.
+
+    Обслуживает в одном потоке множество одновременных подключений с помощью модуля selectors
+    (epoll/kqueue, если они доступны). Протокол подключения совпадает с ConnectionHandler:
+    запрос REQUEST, ответ OK/NOK (с сообщениями WAIT, пока запрос рассматривается),
+    обмен открытыми ключами кадрами KEY_FRAME и сообщения кадрами MESSAGE_FRAME.
+    Для каждого подключения выполняется собственный обмен ключами и создаётся собственная ChatSession.
+
+    Сокеты неблокирующие, неотправленные данные накапливаются в буфере сессии;
+    сессия, буфер которой превысил max_send_buffer, закрывается как не успевающая принимать данные.
+    Методы send, decide, close_session и stop можно вызывать из любого потока.
+
+    """
+
+    BACKLOG = 128
+    MAX_SESSIONS = 1024
+    RECV_BUFFER_SIZE = 64 * 1024
+    MAX_SEND_BUFFER = 1024 * 1024
+    REQUEST_TIMEOUT = 60.0
+    KEEPALIVE_INTERVAL = 15.0
+    SEND_COMMAND = 'send'
+    DECIDE_COMMAND = 'decide'
+    CLOSE_COMMAND = 'close'
+    STOP_COMMAND = 'stop'
+
+    def __init__(self, ip: str, port: int, backlog: int = BACKLOG, max_sessions: int = MAX_SESSIONS,
+                 recv_buffer_size: int = RECV_BUFFER_SIZE, max_send_buffer: int = MAX_SEND_BUFFER,
+                 request_timeout: float = REQUEST_TIMEOUT, keepalive_interval: float = KEEPALIVE_INTERVAL,
+                 ctr_parallel_threshold: int = CTR_PARALLEL_THRESHOLD,
+                 on_request: Optional[Callable[[ServerSession], Optional[bool]]] = None,
+                 on_open: Optional[Callable[[ServerSession], None]] = None,
+                 on_message: Optional[Callable[[ServerSession, str], None]] = None,
+                 on_closed: Optional[Callable[[ServerSession], None]] = None,
+                 on_cancelled: Optional[Callable[[ServerSession], None]] = None,
+                 on_send_error: Optional[Callable[[ServerSession, str], None]] = None):
+        self.ip = ip
+        self.port = port
+        self.backlog = backlog
+        self.max_sessions = max_sessions
+        self.recv_buffer_size = recv_buffer_size
+        self.max_send_buffer = max_send_buffer
+        self.request_timeout = request_timeout
+        self.keepalive_interval = keepalive_interval
+        self.ctr_parallel_threshold = ctr_parallel_threshold
+        self.on_request = on_request
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_closed = on_closed
+        self.on_cancelled = on_cancelled
+        self.on_send_error = on_send_error
+        self.selector = None
+        self.listener = None
+        self.wakeup_reader, self.wakeup_writer = socket.socketpair()
+        self.wakeup_writer.setblocking(False)
+        self.wakeup_lock = threading.Lock()
+        self.wakeup_pending = False
+        self.thread_id = None
+        self.commands = queue.Queue()
+        self.sessions: Dict[int, ServerSession] = {}
+        self.waiting: Set[ServerSession] = set()
+        self.next_id = 0
+        self.running = False
+        self.stats = {'accepted': 0, 'refused': 0, 'rejected': 0, 'opened': 0, 'closed': 0,
+                      'slow_consumers': 0, 'bytes_in': 0, 'bytes_out': 0, 'messages_in': 0,
+                      'messages_out': 0, 'send_errors': 0, 'thread_time': 0.0}
+
+    def bind(self) -> None:
+        """
+        Метод открытия слушающего сокета.
+
+        После вызова фактический адрес сервера (в том числе при port=0) доступен в атрибутах ip и port.
+
+        :return: None
+        """
+
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((self.ip, self.port))
+        self.listener.listen(self.backlog)
+        self.listener.setblocking(False)
+        self.ip, self.port = self.listener.getsockname()[:2]
+
+    def serve_forever(self) -> None:
+        """
+        Метод цикла обработки событий сервера, выполняется до вызова stop.
+
+        :return: None
+        """
+
+        if self.listener is None:
+            self.bind()
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.listener, selectors.EVENT_READ)
+        self.wakeup_reader.setblocking(False)
+        self.selector.register(self.wakeup_reader, selectors.EVENT_READ)
+        self.thread_id = threading.get_ident()
+        self.running = True
+        try:
+            while self.running:
+                for key, events in self.selector.select(timeout=self.get_timeout()):
+                    if key.fileobj is self.listener:
+                        self.accept()
+                    elif key.fileobj is self.wakeup_reader:
+                        self.execute_commands()
+                    elif key.data.stage != ServerSession.CLOSED_STAGE:
+                        if events & selectors.EVENT_WRITE:
+                            self.flush(session=key.data)
+                        if events & selectors.EVENT_READ and key.data.stage != ServerSession.CLOSED_STAGE:
+                            self.read(session=key.data)
+                if not self.commands.empty():
+                    self.execute_commands()
+                self.check_pending()
+                self.stats['thread_time'] = time.thread_time()
+        finally:
+            for session in list(self.sessions.values()):
+                self.close_session_now(session=session)
+            self.selector.close()
+            self.listener.close()
+            self.listener = None
+
+    def get_timeout(self) -> Optional[float]:
+        """
+        Метод вычисления времени ожидания событий до ближайшего таймера подключений,
+        ещё не прошедших стадию запроса.
+
+        :return: float, время ожидания в секундах (None, если таймеров нет)
+        """
+
+        timers = [min(session.deadline, session.keepalive or session.deadline) for session in self.waiting]
+        if not timers:
+            return None
+        return max(0.0, min(timers) - time.monotonic())
+
+    def accept(self) -> None:
+        """
+        Метод приёма новых подключений из очереди слушающего сокета.
+
+        Подключения сверх max_sessions сразу закрываются.
+
+        :return: None
+        """
+
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except OSError:
+                return
+            if len(self.sessions) >= self.max_sessions:
+                self.stats['refused'] += 1
+                sock.close()
+                continue
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.next_id += 1
+            session = ServerSession(session_id=self.next_id, sock=sock, address=address,
+                                    deadline=time.monotonic() + self.request_timeout)
+            self.sessions[session.id] = session
+            self.waiting.add(session)
+            self.selector.register(sock, selectors.EVENT_READ, session)
+            self.stats['accepted'] += 1
+
+    def read(self, session: ServerSession) -> None:
+        """
+        Метод чтения данных подключения и их обработки в соответствии со стадией сессии.
+
+        :param session: ServerSession, сессия
+        :return: None
+        """
+
+        try:
+            data = session.socket.recv(self.recv_buffer_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            data = b''
+        if not data:
+            self.close_session_now(session=session)
+            return
+        self.stats['bytes_in'] += len(data)
+        if session.stage == ServerSession.REQUEST_STAGE:
+            self.handle_request(session=session, data=data)
+        elif session.stage == ServerSession.PENDING_STAGE:
+            self.close_session_now(session=session)
+        else:
+            try:
+                frames = session.decoder.feed(data)
+            except framing.FrameError:
+                self.close_session_now(session=session)
+                return
+            for frame in frames:
+                if session.stage == ServerSession.CLOSED_STAGE:
+                    return
+                self.handle_frame(session=session, frame=frame)
+
+    def handle_request(self, session: ServerSession, data: bytes) -> None:
+        """
+        Метод обработки запроса на подключение.
+
+        Решение принимает функция on_request: True – принять, False – отклонить,
+        None – решение будет передано позже методом decide. Без on_request все запросы принимаются.
+        Если отложенный запрос закрывается без решения (истёк request_timeout или клиент отключился),
+        вызывается функция on_cancelled, чтобы приложение закрыло окно с запросом.
+
+        :param session: ServerSession, сессия
+        :param data: bytes, прочитанные данные
+        :return: None
+        """
+
+        size = len(ChatSession.REQUEST_MESSAGE)
+        session.request += data
+        if len(session.request) < size:
+            return
+        request, rest = session.request[:size], session.request[size:]
+        if request != ChatSession.REQUEST_MESSAGE or rest:
+            self.close_session_now(session=session)
+            return
+        session.stage = ServerSession.PENDING_STAGE
+        session.keepalive = time.monotonic() + self.keepalive_interval
+        decision = self.on_request(session) if self.on_request else True
+        if decision is not None:
+            self.answer(session=session, accept=decision)
+        else:
+            session.deferred = True
+
+    def answer(self, session: ServerSession, accept: bool) -> None:
+        """
+        Метод отправки ответа на запрос на подключение.
+
+        При согласии сервер сразу отправляет свой открытый ключ.
+
+        :param session: ServerSession, сессия
+        :param accept: bool, принят ли запрос
+        :return: None
+        """
+
+        if session.stage != ServerSession.PENDING_STAGE:
+            return
+        if not accept:
+            self.stats['rejected'] += 1
+            try:
+                session.socket.send(ChatSession.NOK_RESPONSE)
+            except OSError:
+                pass
+            self.close_session_now(session=session)
+            return
+        session.stage = ServerSession.KEY_STAGE
+        self.waiting.discard(session)
+        session.chat = ChatSession(role=ChatSession.SERVER, ctr_parallel_threshold=self.ctr_parallel_threshold,
+                                   reservoir_low_watermark=None)
+        session.secret, my_open = session.chat.create_open_key(address=session.socket.getsockname())
+        self.write(session=session, data=b''.join([
+            ChatSession.OK_RESPONSE, framing.encode_frame(frame_type=framing.KEY_FRAME, payload=my_open)
+        ]))
+
+    def handle_frame(self, session: ServerSession, frame: framing.Frame) -> None:
+        """
+        Метод обработки полученного кадра.
+
+        :param session: ServerSession, сессия
+        :param frame: Frame, кадр
+        :return: None
+        """
+
+        if session.stage == ServerSession.KEY_STAGE and frame.type == framing.KEY_FRAME:
+            try:
+                hex_master, companion_modes = session.chat.compute_master(secret=session.secret,
+                                                                          companion_open=frame.payload)
+                session.chat.start(hex_master=hex_master, companion_modes=companion_modes)
+            except (ValueError, IndexError):
+                self.close_session_now(session=session)
+                return
+            session.secret = None
+            session.stage = ServerSession.CHATTING_STAGE
+            self.stats['opened'] += 1
+            if self.on_open:
+                self.on_open(session)
+        elif session.stage == ServerSession.CHATTING_STAGE and frame.type == framing.MESSAGE_FRAME:
+            try:
+                message = session.chat.decode_message(frame=frame)
+            except ValueError:
+                self.close_session_now(session=session)
+                return
+            self.stats['messages_in'] += 1
+            if self.on_message:
+                self.on_message(session, message)
+        else:
+            self.close_session_now(session=session)
+
+    def write(self, session: ServerSession, data: bytes) -> None:
+        """
+        Метод постановки данных в буфер отправки сессии и попытки их немедленной отправки.
+
+        :param session: ServerSession, сессия
+        :param data: bytes, данные
+        :return: None
+        """
+
+        if session.stage == ServerSession.CLOSED_STAGE:
+            return
+        session.outbound += data
+        if len(session.outbound) > self.max_send_buffer:
+            self.stats['slow_consumers'] += 1
+            self.close_session_now(session=session)
+            return
+        if not session.writing:
+            self.flush(session=session)
+
+    def flush(self, session: ServerSession) -> None:
+        """
+        Метод отправки данных из буфера сессии без блокировки.
+
+        Если сокет не принял все данные, сессия подписывается на событие готовности к записи,
+        после полной отправки подписка снимается.
+
+        :param session: ServerSession, сессия
+        :return: None
+        """
+
+        try:
+            sent = session.socket.send(session.outbound)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        except OSError:
+            self.close_session_now(session=session)
+            return
+        del session.outbound[:sent]
+        self.stats['bytes_out'] += sent
+        writing = bool(session.outbound)
+        if writing != session.writing:
+            session.writing = writing
+            events = selectors.EVENT_READ | selectors.EVENT_WRITE if writing else selectors.EVENT_READ
+            self.selector.modify(session.socket, events, session)
+
+    def check_pending(self) -> None:
+        """
+        Метод обработки таймеров подключений, ещё не прошедших стадию запроса.
+
+        Подключение, не приславшее запрос за request_timeout секунд, закрывается.
+        Пока запрос ожидает решения, каждые keepalive_interval секунд клиенту отправляется WAIT,
+        по истечении request_timeout запрос отклоняется.
+
+        :return: None
+        """
+
+        now = time.monotonic()
+        for session in list(self.waiting):
+            if session.stage == ServerSession.REQUEST_STAGE and now >= session.deadline:
+                self.close_session_now(session=session)
+            elif session.stage == ServerSession.PENDING_STAGE:
+                if now >= session.deadline:
+                    self.answer(session=session, accept=False)
+                elif now >= session.keepalive:
+                    session.keepalive = now + self.keepalive_interval
+                    self.write(session=session, data=ChatSession.WAIT_RESPONSE)
+
+    def execute_commands(self) -> None:
+        """
+        Метод выполнения команд, переданных из других потоков или из обработчиков событий сервера.
+
+        Признак ожидающего пробуждения сбрасывается до разбора очереди, поэтому команда,
+        поставленная во время разбора, либо будет выполнена сейчас, либо снова разбудит поток.
+
+        :return: None
+        """
+
+        with self.wakeup_lock:
+            self.wakeup_pending = False
+        try:
+            while self.wakeup_reader.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while not self.commands.empty():
+            command, session_id, args = self.commands.get_nowait()
+            if command == self.STOP_COMMAND:
+                self.running = False
+                continue
+            session = self.sessions.get(session_id)
+            if session is None:
+                continue
+            if command == self.SEND_COMMAND and session.stage == ServerSession.CHATTING_STAGE:
+                self.send_messages(session=session, messages=args)
+            elif command == self.DECIDE_COMMAND:
+                session.deferred = False
+                self.answer(session=session, accept=args)
+            elif command == self.CLOSE_COMMAND:
+                self.close_session_now(session=session)
+
+    def send_messages(self, session: ServerSession, messages: List[str]) -> None:
+        """
+        Метод шифрования и записи сообщений сессии.
+
+        Сообщение, которое нельзя передать одним кадром, не отправляется: оно передаётся функции
+        on_send_error, а остальные сообщения и другие сессии не затрагиваются.
+
+        :param session: ServerSession, сессия
+        :param messages: list, тексты сообщений
+        :return: None
+        """
+
+        frames = []
+        for msg in messages:
+            try:
+                frames.append(session.chat.encode_message(msg=msg))
+            except ValueError:
+                self.stats['send_errors'] += 1
+                if self.on_send_error:
+                    self.on_send_error(session, msg)
+        self.stats['messages_out'] += len(frames)
+        if frames:
+            self.write(session=session, data=framing.encode_frames(frames=frames))
+
+    def post_command(self, command: str, session_id: Optional[int] = None, args=None) -> None:
+        """
+        Метод постановки команды в очередь и пробуждения потока сервера.
+
+        Поток будится записью одного байта в неблокирующий сокет, только если он ещё не разбужен,
+        поэтому вызов никогда не блокируется. Команды, поставленные из обработчиков событий
+        (в потоке сервера), выполняются в конце текущей итерации цикла без пробуждения.
+
+        :param command: str, команда
+        :param session_id: int, идентификатор сессии
+        :param args: аргументы команды
+        :return: None
+        """
+
+        self.commands.put((command, session_id, args))
+        if threading.get_ident() == self.thread_id:
+            return
+        with self.wakeup_lock:
+            if self.wakeup_pending:
+                return
+            self.wakeup_pending = True
+        try:
+            self.wakeup_writer.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def send(self, session_id: int, msg: str) -> None:
+        """
+        Метод отправки сообщения собеседнику сессии.
+
+        :param session_id: int, идентификатор сессии
+        :param msg: str, текст сообщения
+        :return: None
+        """
+
+        self.post_command(command=self.SEND_COMMAND, session_id=session_id, args=[msg])
+
+    def decide(self, session_id: int, accept: bool) -> None:
+        """
+        Метод передачи решения по запросу, для которого on_request вернула None.
+
+        :param session_id: int, идентификатор сессии
+        :param accept: bool, принят ли запрос
+        :return: None
+        """
+
+        self.post_command(command=self.DECIDE_COMMAND, session_id=session_id, args=accept)
+
+    def close_session(self, session_id: int) -> None:
+        """
+        Метод закрытия сессии.
+
+        :param session_id: int, идентификатор сессии
+        :return: None
+        """
+
+        self.post_command(command=self.CLOSE_COMMAND, session_id=session_id)
+
+    def stop(self) -> None:
+        """
+        Метод остановки сервера с закрытием всех сессий.
+
+        :return: None
+        """
+
+        self.post_command(command=self.STOP_COMMAND)
+
+    def close_session_now(self, session: ServerSession) -> None:
+        """
+        Метод закрытия сессии в потоке сервера.
+
+        :param session: ServerSession, сессия
+        :return: None
+        """
+
+        if session.stage == ServerSession.CLOSED_STAGE:
+            return
+        opened = session.stage == ServerSession.CHATTING_STAGE
+        cancelled = session.stage == ServerSession.PENDING_STAGE and session.deferred
+        session.stage = ServerSession.CLOSED_STAGE
+        self.sessions.pop(session.id, None)
+        self.waiting.discard(session)
+        try:
+            self.selector.unregister(session.socket)
+        except (KeyError, ValueError):
+            pass
+        session.socket.close()
+        if session.chat:
+            session.chat.stop()
+        self.stats['closed'] += 1
+        if opened and self.on_closed:
+            self.on_closed(session)
+        if cancelled and self.on_cancelled:
+            self.on_cancelled(session)
+
+    def get_stats(self) -> dict:
+        """
+        Метод получения статистики сервера.
+
+        thread_time – процессорное время потока сервера в секундах.
+
+        :return: dict, счётчики подключений, байтов и сообщений и текущее количество сессий
+        """
+
+        stats = dict(self.stats)
+        stats['sessions'] = len(self.sessions)
+        return stats
+
+
+def start_server_thread(server: SessionServer) -> threading.Thread:
+    """
+    Функция запуска сервера в отдельном потоке.
+
+    :param server: SessionServer, сервер
+    :return: threading.Thread, поток сервера
+    """
+
+    if server.listener is None:
+        server.bind()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return thread
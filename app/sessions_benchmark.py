@@ -0,0 +1,229 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import time
+from typing import Dict, List, Optional
+from app import framing
+from app.session import ChatSession
+from app.session_server import SessionServer, start_server_thread
+
+
+SESSION_COUNTS = [10, 100, 300]
+MESSAGES_PER_SESSION = 10
+MESSAGE_SIZE = 256
+
+
+def get_rss() -> int:
+    """
+    Функция получения объёма резидентной памяти текущего процесса.
+
+    :return: int, объём памяти в байтах (0, если /proc недоступен)
+    """
+
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return 0
+
+
+def serve(pipe, backlog: int) -> None:
+    """
+    Функция процесса сервера: отвечает эхом на каждое сообщение и по запросу возвращает статистику.
+
+    :param pipe: Connection, канал связи с процессом замеров
+    :param backlog: int, длина очереди слушающего сокета
+    :return: None
+    """
+
+    server = SessionServer(ip='127.0.0.1', port=0, backlog=backlog)
+    server.on_message = lambda session, msg: server.send(session_id=session.id, msg=msg)
+    start_server_thread(server=server)
+    pipe.send(server.port)
+    while pipe.recv() != SessionServer.STOP_COMMAND:
+        pipe.send(dict(server.get_stats(), rss=get_rss()))
+    server.stop()
+
+
+class BenchmarkClient:
+    """
+    Класс блокирующего клиента для замеров многосессионного сервера.
+
+    """
+
+    def __init__(self, port: int):
+        self.socket = socket.create_connection(('127.0.0.1', port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.decoder = framing.FrameDecoder()
+        self.frames = []
+        self.chat = ChatSession(role=ChatSession.CLIENT, reservoir_low_watermark=None)
+
+    def handshake(self) -> None:
+        """
+        Метод запроса на подключение и обмена ключами.
+
+        :return: None
+        """
+
+        self.socket.sendall(ChatSession.REQUEST_MESSAGE)
+        if self.receive_exactly(size=len(ChatSession.OK_RESPONSE)) != ChatSession.OK_RESPONSE:
+            raise ConnectionError
+        secret, my_open = self.chat.create_open_key(address=self.socket.getsockname())
+        self.socket.sendall(framing.encode_frame(frame_type=framing.KEY_FRAME, payload=my_open))
+        hex_master, companion_modes = self.chat.compute_master(secret=secret,
+                                                               companion_open=self.receive_frame().payload)
+        self.chat.start(hex_master=hex_master, companion_modes=companion_modes)
+
+    def receive_exactly(self, size: int) -> bytes:
+        """
+        Метод чтения ровно size байтов.
+
+        :param size: int, количество байтов
+        :return: bytes, прочитанные данные
+        """
+
+        data = b''
+        while len(data) < size:
+            chunk = self.socket.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError
+            data += chunk
+        return data
+
+    def receive_frame(self) -> framing.Frame:
+        """
+        Метод получения очередного кадра.
+
+        :return: Frame, кадр
+        """
+
+        while not self.frames:
+            data = self.socket.recv(SessionServer.RECV_BUFFER_SIZE)
+            if not data:
+                raise ConnectionError
+            self.frames.extend(self.decoder.feed(data))
+        return self.frames.pop(0)
+
+    def send(self, msg: str) -> None:
+        """
+        Метод отправки сообщения.
+
+        :param msg: str, текст сообщения
+        :return: None
+        """
+
+        self.socket.sendall(framing.encode_frames(frames=[self.chat.encode_message(msg=msg)]))
+
+    def receive(self) -> str:
+        """
+        Метод получения сообщения.
+
+        :return: str, текст сообщения
+        """
+
+        return self.chat.decode_message(frame=self.receive_frame())
+
+    def close(self) -> None:
+        """
+        Метод закрытия подключения.
+
+        :return: None
+        """
+
+        self.chat.stop()
+        self.socket.close()
+
+
+def measure(sessions: int, messages: int = MESSAGES_PER_SESSION, size: int = MESSAGE_SIZE) -> Dict[str, float]:
+    """
+    Функция замера нагрузки на сервер при заданном количестве одновременных сессий.
+
+    Сервер запускается в отдельном процессе, поэтому его память и процессорное время
+    не смешиваются с расходами клиентов. Сначала устанавливаются все сессии, затем каждая
+    отправляет messages сообщений по кругу и получает их эхо от сервера.
+
+    :param sessions: int, количество одновременных сессий
+    :param messages: int, количество сообщений от каждой сессии
+    :param size: int, длина сообщения в символах
+    :return: dict, результаты замера
+    """
+
+    pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=serve, args=(child_pipe, max(sessions, SessionServer.BACKLOG)))
+    process.start()
+    try:
+        port = pipe.recv()
+        pipe.send('stats')
+        idle = pipe.recv()
+
+        start = time.perf_counter()
+        clients = []
+        for _ in range(sessions):
+            client = BenchmarkClient(port=port)
+            client.handshake()
+            clients.append(client)
+        handshake_time = time.perf_counter() - start
+        pipe.send('stats')
+        opened = pipe.recv()
+
+        msg = 'ё' * size
+        start = time.perf_counter()
+        for _ in range(messages):
+            for client in clients:
+                client.send(msg=msg)
+            for client in clients:
+                if client.receive() != msg:
+                    raise RuntimeError
+        chat_time = time.perf_counter() - start
+        pipe.send('stats')
+        chatted = pipe.recv()
+
+        for client in clients:
+            client.close()
+        pipe.send(SessionServer.STOP_COMMAND)
+    finally:
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+    total = sessions * messages
+    return {
+        'sessions': sessions,
+        'messages': total,
+        'handshakes_per_sec': sessions / handshake_time,
+        'handshake_cpu_ms': 1e3 * (opened['thread_time'] - idle['thread_time']) / sessions,
+        'rss_per_session_kb': (opened['rss'] - idle['rss']) / sessions / 1024,
+        'messages_per_sec': 2 * total / chat_time,
+        'message_cpu_us': 1e6 * (chatted['thread_time'] - opened['thread_time']) / (2 * total),
+        'server_rss_mb': chatted['rss'] / 1024 / 1024,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Функция запуска замеров многосессионного сервера из командной строки (python -m app.sessions_benchmark).
+
+    :param argv: list, аргументы командной строки
+    :return: int, код возврата
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m app.sessions_benchmark')
+    parser.add_argument('--sessions', type=int, action='append', help='количество сессий (можно указать несколько раз)')
+    parser.add_argument('--messages', type=int, default=MESSAGES_PER_SESSION, help='сообщений от каждой сессии')
+    parser.add_argument('--size', type=int, default=MESSAGE_SIZE, help='длина сообщения в символах')
+    args = parser.parse_args(argv)
+
+    print(f'{"sessions":>8} {"hs/s":>8} {"hs cpu ms":>10} {"rss/sess KB":>12} '
+          f'{"msg/s":>10} {"msg cpu us":>11} {"rss MB":>8}')
+    for sessions in args.sessions or SESSION_COUNTS:
+        result = measure(sessions=sessions, messages=args.messages, size=args.size)
+        print(f'{result["sessions"]:>8} {result["handshakes_per_sec"]:>8.1f} {result["handshake_cpu_ms"]:>10.2f} '
+              f'{result["rss_per_session_kb"]:>12.1f} {result["messages_per_sec"]:>10.1f} '
+              f'{result["message_cpu_us"]:>11.1f} {result["server_rss_mb"]:>8.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
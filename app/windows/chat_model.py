@@ -0,0 +1,147 @@
+import time
+from typing import List, Optional
+from PyQt5 import QtCore
+from app.message_store import MessageStore, StoredMessage
+
+
+class ChatModel(QtCore.QAbstractListModel):
+    """
+    Класс модели списка сообщений чата.
+
+    Данные берутся из MessageStore, модель показывает только последние сообщения хранилища:
+    сначала не больше page_size, а более старые подгружаются порциями методом fetch_older,
+    когда окно чата прокручено к началу. Представление запрашивает данные только видимых строк.
+
+    """
+
+    PAGE_SIZE = 200
+    PREFIXES = {MessageStore.OWN: 'Вы: ', MessageStore.COMPANION: 'Собеседник: ', MessageStore.SYSTEM: ''}
+
+    def __init__(self, store: Optional[MessageStore] = None, page_size: int = PAGE_SIZE,
+                 parent: Optional[QtCore.QObject] = None):
+        super().__init__(parent)
+        self.store = store if store is not None else MessageStore()
+        self.page_size = page_size
+        self.first_seq = self.store.end_seq
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        """
+        Метод получения количества строк, загруженных в модель.
+
+        :param parent: QtCore.QModelIndex object, родительский индекс (у списка – недействительный)
+        :return: int, количество строк
+        """
+
+        if parent.isValid():
+            return 0
+        return self.store.end_seq - self.first_seq
+
+    def data(self, index: QtCore.QModelIndex, role: int = QtCore.Qt.DisplayRole):
+        """
+        Метод получения данных строки.
+
+        :param index: QtCore.QModelIndex object, индекс строки
+        :param role: int, роль данных
+        :return: текст сообщения с отправителем (DisplayRole), время сообщения (ToolTipRole) или None
+        """
+
+        if not index.isValid() or not 0 <= index.row() < self.rowCount():
+            return None
+        if role not in [QtCore.Qt.DisplayRole, QtCore.Qt.ToolTipRole]:
+            return None
+        message = self.store.get(seq=self.first_seq + index.row())
+        if role == QtCore.Qt.ToolTipRole:
+            return time.strftime('%d.%m.%Y %H:%M:%S', time.localtime(message.timestamp))
+        return f'{self.PREFIXES[message.sender]}{message.text}'
+
+    def append_messages(self, messages: List[StoredMessage]) -> None:
+        """
+        Метод добавления нескольких сообщений одним обновлением модели.
+
+        Если хранилище превысило ограничение, самые старые строки удаляются также одним обновлением.
+
+        :param messages: list, добавляемые сообщения
+        :return: None
+        """
+
+        if not messages:
+            return
+        rows = self.rowCount()
+        self.beginInsertRows(QtCore.QModelIndex(), rows, rows + len(messages) - 1)
+        self.store.extend(messages=messages)
+        self.endInsertRows()
+        excess = self.store.excess()
+        if excess:
+            removed = min(self.rowCount(), max(0, self.store.start_seq + excess - self.first_seq))
+            if removed:
+                self.beginRemoveRows(QtCore.QModelIndex(), 0, removed - 1)
+            self.store.trim()
+            self.first_seq = max(self.first_seq, self.store.start_seq)
+            if removed:
+                self.endRemoveRows()
+
+    def append_message(self, sender: int, text: str, timestamp: Optional[float] = None) -> None:
+        """
+        Метод добавления одного сообщения.
+
+        :param sender: int, отправитель (MessageStore.OWN, COMPANION или SYSTEM)
+        :param text: str, текст сообщения
+        :param timestamp: float, время сообщения (по умолчанию текущее)
+        :return: None
+        """
+
+        self.append_messages(messages=[StoredMessage(sender=sender, text=text,
+                                                     timestamp=time.time() if timestamp is None else timestamp)])
+
+    def can_fetch_older(self) -> bool:
+        """
+        Метод проверки наличия в хранилище сообщений, ещё не загруженных в модель.
+
+        :return: bool, есть ли более старые сообщения
+        """
+
+        return self.first_seq > self.store.start_seq
+
+    def fetch_older(self) -> int:
+        """
+        Метод загрузки в модель очередной порции более старых сообщений.
+
+        :return: int, количество загруженных строк
+        """
+
+        count = min(self.page_size, self.first_seq - self.store.start_seq)
+        if count > 0:
+            self.beginInsertRows(QtCore.QModelIndex(), 0, count - 1)
+            self.first_seq -= count
+            self.endInsertRows()
+        return max(count, 0)
+
+    def release_older(self) -> int:
+        """
+        Метод выгрузки из модели старых строк, когда окно чата прокручено до конца.
+
+        Если в модель загружено больше трёх порций строк, в ней остаются две последние порции.
+        Выгруженные сообщения остаются в хранилище и подгружаются снова методом fetch_older.
+
+        :return: int, количество выгруженных строк
+        """
+
+        if self.rowCount() <= 3 * self.page_size:
+            return 0
+        count = self.rowCount() - 2 * self.page_size
+        self.beginRemoveRows(QtCore.QModelIndex(), 0, count - 1)
+        self.first_seq += count
+        self.endRemoveRows()
+        return count
+
+    def clear(self) -> None:
+        """
+        Метод удаления всех сообщений.
+
+        :return: None
+        """
+
+        self.beginResetModel()
+        self.store.clear()
+        self.first_seq = self.store.end_seq
+        self.endResetModel()
@@ -1,5 +1,8 @@
-from typing import Tuple
+import time
+from typing import List, Optional, Tuple
 from PyQt5 import QtCore, QtGui, QtWidgets
+from app.message_store import MessageStore, StoredMessage
+from app.windows.chat_model import ChatModel
 
 
 class ChatWindow(QtWidgets.QMainWindow):
@@ -10,10 +13,13 @@ class ChatWindow(QtWidgets.QMainWindow):
 
     SEND_SIGNAL = QtCore.pyqtSignal()
     DISCONNECT_SIGNAL = QtCore.pyqtSignal()
+    SEARCH_SIGNAL = QtCore.pyqtSignal(str)
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.lost_companion = False
+        self.status_message = ''
+        self.chat_model = ChatModel()
         self.setupUi()
 
     def setupUi(self) -> None:
@@ -35,20 +41,35 @@ class ChatWindow(QtWidgets.QMainWindow):
         font.setFamily("Times New Roman")
         font.setPointSize(12)
         self.setFont(font)
+        # Поле поиска по истории переписки
+        self.search_layout = QtWidgets.QVBoxLayout()
+        self.search_layout.setObjectName("search_layout")
+        self.search_line = QtWidgets.QLineEdit(self.centralwidget)
+        self.search_line.setFixedSize(QtCore.QSize(550, 30))
+        self.search_line.setObjectName("search_line")
+        self.search_layout.addWidget(self.search_line, 0, QtCore.Qt.AlignHCenter | QtCore.Qt.AlignTop)
+        self.gridLayout.addLayout(self.search_layout, 0, 0, 1, 1)
         # Поле чата
         self.chat_plain_layout = QtWidgets.QVBoxLayout()
         self.chat_plain_layout.setObjectName("chat_plain_layout")
-        self.chat_plain = QtWidgets.QPlainTextEdit(self.centralwidget)
-        self.chat_plain.setFixedSize(QtCore.QSize(550, 350))
+        self.chat_plain = QtWidgets.QListView(self.centralwidget)
+        self.chat_plain.setFixedSize(QtCore.QSize(550, 310))
         self.chat_plain.setFocusPolicy(QtCore.Qt.NoFocus)
         self.chat_plain.setStyleSheet(
-            "QPlainTextEdit {\n"
+            "QListView {\n"
             "border: 1px solid black;\n"
             "}"
         )
         self.chat_plain.setObjectName("chat_plain")
+        self.chat_plain.setModel(self.chat_model)
+        self.chat_plain.setWordWrap(True)
+        self.chat_plain.setSelectionMode(QtWidgets.QAbstractItemView.NoSelection)
+        self.chat_plain.setVerticalScrollMode(QtWidgets.QAbstractItemView.ScrollPerPixel)
+        self.chat_plain.setLayoutMode(QtWidgets.QListView.Batched)
+        self.chat_plain.setBatchSize(ChatModel.PAGE_SIZE)
+        self.chat_plain.verticalScrollBar().valueChanged.connect(self.scrolled)
         self.chat_plain_layout.addWidget(self.chat_plain, 0, QtCore.Qt.AlignHCenter | QtCore.Qt.AlignVCenter)
-        self.gridLayout.addLayout(self.chat_plain_layout, 0, 0, 1, 1)
+        self.gridLayout.addLayout(self.chat_plain_layout, 1, 0, 1, 1)
         # Поле ввода сообщения
         self.msg_input_layout = QtWidgets.QVBoxLayout()
         self.msg_input_layout.setObjectName("msg_input_layout")
@@ -56,7 +77,7 @@ class ChatWindow(QtWidgets.QMainWindow):
         self.msg_input_line.setFixedSize(QtCore.QSize(550, 40))
         self.msg_input_line.setObjectName("msg_input_line")
         self.msg_input_layout.addWidget(self.msg_input_line, 0, QtCore.Qt.AlignHCenter | QtCore.Qt.AlignTop)
-        self.gridLayout.addLayout(self.msg_input_layout, 1, 0, 1, 1)
+        self.gridLayout.addLayout(self.msg_input_layout, 2, 0, 1, 1)
         # Кнопки отправки сообщения и отключения от чата
         self.send_disconnect_layout = QtWidgets.QHBoxLayout()
         self.send_disconnect_layout.setObjectName("send_disconnect_layout")
@@ -68,11 +89,12 @@ class ChatWindow(QtWidgets.QMainWindow):
         self.disconnect_btn.setObjectName("disconnect_btn")
         self.send_disconnect_layout.addWidget(self.send_btn)
         self.send_disconnect_layout.addWidget(self.disconnect_btn)
-        self.gridLayout.addLayout(self.send_disconnect_layout, 2, 0, 1, 1)
+        self.gridLayout.addLayout(self.send_disconnect_layout, 3, 0, 1, 1)
         # Привязка функций к кнопкам
         self.send_btn.clicked.connect(self.SEND_SIGNAL.emit)
         self.disconnect_btn.clicked.connect(self.DISCONNECT_SIGNAL.emit)
         self.msg_input_line.returnPressed.connect(self.SEND_SIGNAL.emit)
+        self.search_line.returnPressed.connect(lambda: self.SEARCH_SIGNAL.emit(self.search_line.text()))
 
         self.setCentralWidget(self.centralwidget)
         self.statusbar = QtWidgets.QStatusBar(self)
@@ -91,22 +113,108 @@ class ChatWindow(QtWidgets.QMainWindow):
         _translate = QtCore.QCoreApplication.translate
         self.setWindowTitle(_translate("ChatWindow", "KuznechikChat"))
         self.msg_input_line.setPlaceholderText(_translate("ChatWindow", "Текст сообщения..."))
+        self.search_line.setPlaceholderText(_translate("ChatWindow", "Поиск по истории..."))
         self.send_btn.setText(_translate("ChatWindow", "Отправить"))
         self.disconnect_btn.setText(_translate("ChatWindow", "Отключиться"))
 
-    def start_chatting(self, companion: Tuple[str, int]) -> None:
+    def start_chatting(self, companion: Tuple[str, int], previous: Optional[List[StoredMessage]] = None) -> None:
         """
         Метод, вызывающийся при старте обмена сообщения.
 
-        Выводит на экран приветственное сообщение
+        Выводит на экран последние сообщения из истории переписки с собеседником, приветственное сообщение
         и устанавливает текст для полосы статуса.
 
         :param companion: tuple, кортеж (IP-адрес, порт)
+        :param previous: list, последние сообщения из истории переписки
         :return: None
         """
 
-        self.chat_plain.setPlainText(f'Добро пожаловать в чат! Ваш собеседник: {companion[0]}')
-        self.statusbar.showMessage(f'Connected to: {companion[0]}')
+        self.chat_model.clear()
+        self.chat_model.append_messages(messages=previous or [])
+        self.chat_model.append_message(sender=MessageStore.SYSTEM,
+                                       text=f'Добро пожаловать в чат! Ваш собеседник: {companion[0]}')
+        self.chat_plain.scrollToBottom()
+        self.status_message = f'Connected to: {companion[0]}'
+        self.statusbar.showMessage(self.status_message)
+
+    def set_send_blocked(self, blocked: bool) -> None:
+        """
+        Метод, вызывающийся при заполнении и освобождении очереди отправки.
+
+        Пока собеседник не успевает принимать сообщения, кнопка отправки недоступна.
+
+        :param blocked: bool, заполнена ли очередь отправки
+        :return: None
+        """
+
+        self.send_btn.setEnabled(not blocked)
+        if blocked:
+            self.statusbar.showMessage('Собеседник не успевает принимать сообщения...')
+        else:
+            self.statusbar.showMessage(self.status_message)
+
+    def show_search_results(self, query: str, messages: List[StoredMessage]) -> None:
+        """
+        Метод вывода результатов поиска по истории переписки.
+
+        :param query: str, поисковый запрос
+        :param messages: list, найденные сообщения, начиная с самых новых
+        :return: None
+        """
+
+        prefixes = {MessageStore.OWN: 'Вы', MessageStore.COMPANION: 'Собеседник'}
+        lines = [f'Поиск «{query}»: найдено сообщений – {len(messages)}']
+        lines.extend(f'{time.strftime("%d.%m.%Y %H:%M", time.localtime(msg.timestamp))} '
+                     f'{prefixes.get(msg.sender, "")}: {msg.text}' for msg in messages)
+        self.append_messages(messages=[StoredMessage(sender=MessageStore.SYSTEM, text=line, timestamp=time.time())
+                                       for line in lines])
+
+    def show_send_error(self, msg: str) -> None:
+        """
+        Метод, вызывающийся, если сообщение не удалось отправить.
+
+        :param msg: str, текст неотправленного сообщения
+        :return: None
+        """
+
+        self.append_messages(messages=[StoredMessage(sender=MessageStore.SYSTEM, text=f'Не отправлено: {msg}',
+                                                     timestamp=time.time())])
+
+    def append_messages(self, messages: List[StoredMessage]) -> None:
+        """
+        Метод вывода нескольких сообщений одним обновлением окна чата.
+
+        Если окно чата было прокручено до конца, оно остаётся прокрученным до конца,
+        а старые строки выгружаются из модели, чтобы размер модели не рос.
+
+        :param messages: list, выводимые сообщения
+        :return: None
+        """
+
+        scrollbar = self.chat_plain.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        self.chat_model.append_messages(messages=messages)
+        if at_bottom:
+            self.chat_model.release_older()
+            self.chat_plain.scrollToBottom()
+
+    def scrolled(self, value: int) -> None:
+        """
+        Метод, вызывающийся при прокрутке окна чата.
+
+        При прокрутке к началу подгружает порцию более старых сообщений,
+        сохраняя положение видимых строк.
+
+        :param value: int, положение полосы прокрутки
+        :return: None
+        """
+
+        if value == 0 and self.chat_model.can_fetch_older():
+            scrollbar = self.chat_plain.verticalScrollBar()
+            maximum = scrollbar.maximum()
+            self.chat_model.fetch_older()
+            self.chat_plain.doItemsLayout()
+            scrollbar.setValue(scrollbar.maximum() - maximum)
 
     def show_disconnected_message(self) -> None:
         """
@@ -0,0 +1,145 @@
+from functools import lru_cache
+from typing import List, Tuple
+from gost import consts
+import gost.tables as tables
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+BATCH_CHUNK = 65536
+BATCH_THRESHOLD = 32
+
+
+def is_available() -> bool:
+    """
+    Функция проверки доступности пакетного движка.
+
+    :return: bool, установлен ли NumPy
+    """
+
+    return np is not None
+
+
+def _tables_to_array(int_tables: Tuple[Tuple[int, ...], ...]) -> 'np.ndarray':
+    """
+    Функция перевода таблиц 128-битных значений в массив NumPy.
+
+    Каждое значение хранится как 16 байт (старший байт первым) и просматривается как пара uint64,
+    так как сложение по модулю 2 не зависит от порядка байтов.
+
+    :param int_tables: tuple, 16 таблиц по 256 значений 128-битных блоков
+    :return: np.ndarray, массив формы (16, 256, 2) типа uint64
+    """
+
+    raw = b''.join(value.to_bytes(16, 'big') for table in int_tables for value in table)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(16, 256, 16).view(np.uint64).copy()
+
+
+@lru_cache(maxsize=None)
+def get_batch_tables() -> Tuple['np.ndarray', ...]:
+    """
+    Функция получения таблиц пакетного движка.
+
+    Таблицы строятся один раз из таблиц модуля tables.
+
+    :return: tuple, (таблицы LS, таблицы L^-1, таблицы L^-1 S^-1, обратная подстановка S^-1)
+    """
+
+    linear_tables, combined_tables, _ = tables.get_decryption_tables()
+    return (_tables_to_array(int_tables=tables.get_encryption_tables()),
+            _tables_to_array(int_tables=linear_tables),
+            _tables_to_array(int_tables=combined_tables),
+            np.array(consts.INVERSE_NONLINEAR_CONSTS, dtype=np.uint8))
+
+
+def keys_to_array(keys: List[int]) -> 'np.ndarray':
+    """
+    Функция перевода раундовых ключей в массив NumPy.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: np.ndarray, массив формы (10, 16) типа uint8
+    """
+
+    raw = b''.join(key.to_bytes(16, 'big') for key in keys)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(keys), 16).copy()
+
+
+def to_blocks(data) -> 'np.ndarray':
+    """
+    Функция представления данных в виде массива блоков.
+
+    :param data: np.ndarray формы (N, 16) типа uint8 или bytes-like объект длиной, кратной 16
+    :return: np.ndarray, массив формы (N, 16) типа uint8
+    """
+
+    if isinstance(data, np.ndarray):
+        if data.dtype != np.uint8 or data.ndim != 2 or data.shape[1] != 16:
+            raise ValueError
+        return data
+    buffer = memoryview(data).cast('B')
+    if len(buffer) % 16:
+        raise ValueError
+    return np.frombuffer(buffer, dtype=np.uint8).reshape(-1, 16)
+
+
+def _lookup(blocks: 'np.ndarray', table: 'np.ndarray') -> 'np.ndarray':
+    """
+    Функция табличного преобразования массива блоков.
+
+    Для каждой позиции байта выбирается значение из соответствующей таблицы,
+    результаты складываются по модулю 2.
+
+    :param blocks: np.ndarray, массив блоков формы (N, 16) типа uint8
+    :param table: np.ndarray, таблицы формы (16, 256, 2) типа uint64
+    :return: np.ndarray, массив блоков формы (N, 16) типа uint8
+    """
+
+    result = table[0][blocks[:, 0]]
+    for i in range(1, 16):
+        result ^= table[i][blocks[:, i]]
+    return result.view(np.uint8)
+
+
+def batch_encryption(blocks: 'np.ndarray', keys: 'np.ndarray') -> 'np.ndarray':
+    """
+    Функция пакетного шифрования массива блоков.
+
+    Все десять раундов выполняются одновременно для всех блоков.
+
+    :param blocks: np.ndarray, массив блоков открытого текста формы (N, 16) типа uint8
+    :param keys: np.ndarray, раундовые ключи формы (10, 16) типа uint8
+    :return: np.ndarray, массив блоков шифротекста формы (N, 16) типа uint8
+    """
+
+    enc_tables = get_batch_tables()[0]
+    result = np.empty_like(blocks)
+    for start in range(0, len(blocks), BATCH_CHUNK):
+        x = blocks[start:start + BATCH_CHUNK]
+        for i in range(9):
+            x = _lookup(blocks=x ^ keys[i], table=enc_tables)
+        result[start:start + BATCH_CHUNK] = x ^ keys[9]
+    return result
+
+
+def batch_decryption(blocks: 'np.ndarray', inverse_keys: 'np.ndarray') -> 'np.ndarray':
+    """
+    Функция пакетного дешифрования массива блоков.
+
+    Повторяет схему табличного дешифрования из модуля tables для всех блоков одновременно.
+
+    :param blocks: np.ndarray, массив блоков шифротекста формы (N, 16) типа uint8
+    :param inverse_keys: np.ndarray, раундовые ключи для табличного дешифрования формы (10, 16) типа uint8
+    :return: np.ndarray, массив блоков открытого текста формы (N, 16) типа uint8
+    """
+
+    _, linear_tables, combined_tables, inv_sbox = get_batch_tables()
+    result = np.empty_like(blocks)
+    for start in range(0, len(blocks), BATCH_CHUNK):
+        x = _lookup(blocks=blocks[start:start + BATCH_CHUNK] ^ inverse_keys[9], table=linear_tables)
+        for i in range(8, 0, -1):
+            x = _lookup(blocks=x, table=combined_tables) ^ inverse_keys[i]
+        result[start:start + BATCH_CHUNK] = inv_sbox[x] ^ inverse_keys[0]
+    return result
@@ -0,0 +1,216 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+from gost.crypto import GOST34122018
+import gost.batch as batch
+import gost.engines as engines
+import gost.utils as utils
+
+
+BENCH_WARMUP = 1
+BENCH_REPEAT = 5
+BENCH_MIN_TIME = 0.2
+BULK_BLOCKS = 256
+REGRESSION_TOLERANCE = 0.1
+
+
+def calibrate(func: Callable[[], None], min_time: float = BENCH_MIN_TIME) -> int:
+    """
+    Функция подбора количества вызовов в одном замере.
+
+    Количество удваивается, пока один замер не займёт не меньше min_time секунд.
+
+    :param func: callable, измеряемая функция без аргументов
+    :param min_time: float, минимальная длительность одного замера в секундах
+    :return: int, количество вызовов в одном замере
+    """
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if time.perf_counter() - start >= min_time:
+            return number
+        number *= 2
+
+
+def measure(name: str, func: Callable[[], None], blocks: int = 1, warmup: int = BENCH_WARMUP,
+            repeat: int = BENCH_REPEAT, min_time: float = BENCH_MIN_TIME) -> Dict[str, float]:
+    """
+    Функция замера производительности.
+
+    После прогревочных замеров выполняется repeat замеров, по которым считаются
+    медиана, минимум, максимум и стандартное отклонение скорости.
+
+    :param name: str, имя замера
+    :param func: callable, измеряемая функция без аргументов
+    :param blocks: int, количество блоков, обрабатываемых за один вызов
+    :param warmup: int, количество прогревочных замеров
+    :param repeat: int, количество учитываемых замеров
+    :param min_time: float, минимальная длительность одного замера в секундах
+    :return: dict, результаты замера
+    """
+
+    number = calibrate(func=func, min_time=min_time)
+    rates = []
+    for i in range(warmup + repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            rates.append(number / elapsed)
+    ops = statistics.median(rates)
+    return {
+        'name': name,
+        'blocks': blocks,
+        'number': number,
+        'repeat': repeat,
+        'ops_per_sec': ops,
+        'ops_min': min(rates),
+        'ops_max': max(rates),
+        'ops_stdev': statistics.stdev(rates) if len(rates) > 1 else 0.0,
+        'blocks_per_sec': ops * blocks,
+        'ns_per_block': 1e9 / (ops * blocks),
+    }
+
+
+def get_cases(engine_names: List[str], bulk_blocks: int = BULK_BLOCKS) -> List[tuple]:
+    """
+    Функция формирования списка замеров.
+
+    :param engine_names: list, имена движков шифра, для которых замеряется обработка сообщений
+    :param bulk_blocks: int, количество блоков в пакетных замерах
+    :return: list, кортежи (имя замера, функция, количество блоков за вызов)
+    """
+
+    master = list(os.urandom(32))
+    block = list(os.urandom(16))
+    key = GOST34122018(master_key=master, engine=GOST34122018.REFERENCE_ENGINE, use_cache=False)
+    encrypt, decrypt = GOST34122018.ENCRYPT_FLAG, GOST34122018.DECRYPT_FLAG
+    cases = [
+        ('nonlinear_transform', lambda: utils.nonlinear_transform(x_list=block), 1),
+        ('nonlinear_transform_inverse', lambda: utils.nonlinear_transform(x_list=block, inverse=True), 1),
+        ('linear_transform', lambda: utils.linear_transform(x_list=block), 1),
+        ('linear_transform_inverse', lambda: utils.linear_transform(x_list=block, inverse=True), 1),
+        ('feistel_network', lambda: utils.feistel_network(left=block, right=block, const_ind=0), 1),
+        ('get_round_keys', lambda: key.get_round_keys(master=master), 1),
+        ('data_splitting', lambda: utils.data_splitting(data='Ё' * (8 * bulk_blocks)), bulk_blocks),
+    ]
+    bulk = [list(os.urandom(16)) for _ in range(bulk_blocks)]
+    raw = bytes(sum(bulk, []))
+    for engine in engine_names:
+        cipher = GOST34122018(master_key=master, engine=engine, use_cache=False)
+        for flag in [encrypt, decrypt]:
+            cases.append((f'message_prehandling[{engine}].{flag}',
+                          lambda c=cipher, f=flag: c.message_prehandling(msg=block, flag=f), 1))
+            cases.append((f'message_prehandling[{engine}].{flag}.bulk',
+                          lambda c=cipher, f=flag: [c.message_prehandling(msg=b, flag=f) for b in bulk], bulk_blocks))
+            if engine != GOST34122018.REFERENCE_ENGINE:
+                cases.append((f'blocks_prehandling[{engine}].{flag}.bulk',
+                              lambda c=cipher, f=flag: c.blocks_prehandling(data=raw, flag=f), bulk_blocks))
+    return cases
+
+
+def run(engine_names: List[str] = None, pattern: str = '', warmup: int = BENCH_WARMUP, repeat: int = BENCH_REPEAT,
+        min_time: float = BENCH_MIN_TIME, bulk_blocks: int = BULK_BLOCKS) -> Dict[str, object]:
+    """
+    Функция запуска набора замеров.
+
+    :param engine_names: list, имена движков шифра (по умолчанию все зарегистрированные)
+    :param pattern: str, подстрока, которую должно содержать имя замера
+    :param warmup: int, количество прогревочных замеров
+    :param repeat: int, количество учитываемых замеров
+    :param min_time: float, минимальная длительность одного замера в секундах
+    :param bulk_blocks: int, количество блоков в пакетных замерах
+    :return: dict, сведения об окружении и результаты замеров
+    """
+
+    results = []
+    engine_names = engine_names or engines.get_engine_names()
+    for name, func, blocks in get_cases(engine_names=engine_names, bulk_blocks=bulk_blocks):
+        if pattern in name:
+            results.append(measure(name=name, func=func, blocks=blocks, warmup=warmup,
+                                   repeat=repeat, min_time=min_time))
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': batch.is_available(),
+        'results': results,
+    }
+
+
+def compare(report: Dict[str, object], baseline: Dict[str, object],
+            tolerance: float = REGRESSION_TOLERANCE) -> List[Dict[str, object]]:
+    """
+    Функция сравнения результатов с сохранённым эталоном.
+
+    Замер считается регрессией, если скорость (блоков в секунду) упала более чем на tolerance.
+
+    :param report: dict, текущие результаты
+    :param baseline: dict, эталонные результаты
+    :param tolerance: float, допустимая доля падения скорости
+    :return: list, сравнение по каждому замеру, присутствующему в обоих наборах
+    """
+
+    previous = {result['name']: result for result in baseline['results']}
+    comparison = []
+    for result in report['results']:
+        if result['name'] not in previous:
+            continue
+        ratio = result['blocks_per_sec'] / previous[result['name']]['blocks_per_sec']
+        comparison.append({'name': result['name'], 'ratio': ratio, 'regression': ratio < 1 - tolerance})
+    return comparison
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Функция запуска набора замеров из командной строки (python -m gost.benchmark).
+
+    :param argv: list, аргументы командной строки
+    :return: int, код возврата (1 при обнаружении регрессий)
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m gost.benchmark')
+    parser.add_argument('--engine', action='append', choices=engines.get_engine_names(),
+                        help='движок шифра (по умолчанию все)')
+    parser.add_argument('--filter', default='', help='подстрока имени замера')
+    parser.add_argument('--warmup', type=int, default=BENCH_WARMUP)
+    parser.add_argument('--repeat', type=int, default=BENCH_REPEAT)
+    parser.add_argument('--min-time', type=float, default=BENCH_MIN_TIME)
+    parser.add_argument('--blocks', type=int, default=BULK_BLOCKS, help='количество блоков в пакетных замерах')
+    parser.add_argument('--output', help='файл для записи результатов в формате JSON')
+    parser.add_argument('--baseline', help='файл эталонных результатов для сравнения')
+    parser.add_argument('--tolerance', type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    report = run(engine_names=args.engine, pattern=args.filter, warmup=args.warmup, repeat=args.repeat,
+                 min_time=args.min_time, bulk_blocks=args.blocks)
+    print(f'{"name":<48} {"ops/s":>12} {"±stdev":>10} {"ns/block":>12}')
+    for result in report['results']:
+        print(f'{result["name"]:<48} {result["ops_per_sec"]:>12.1f} '
+              f'{result["ops_stdev"]:>10.1f} {result["ns_per_block"]:>12.1f}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+    regressions = 0
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            comparison = compare(report=report, baseline=json.load(file), tolerance=args.tolerance)
+        print()
+        for item in comparison:
+            regressions += item['regression']
+            mark = 'REGRESSION' if item['regression'] else ''
+            print(f'{item["name"]:<48} {item["ratio"]:>8.2f}x {mark}')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
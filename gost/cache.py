@@ -0,0 +1,141 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Tuple
+
+
+KEY_SCHEDULE_CACHE_SIZE = 32
+
+
+class KeyScheduleEntry:
+    """
+    Класс записи кэша раундовых ключей.
+
+    Раундовые ключи хранятся неизменяемыми числами Python, поэтому затереть их в памяти невозможно:
+    при вытеснении запись лишь освобождает ссылки, а память освобождается сборщиком мусора.
+
+    """
+
+    def __init__(self, round_keys: List[int]):
+        self.round_keys = list(round_keys)
+        self.derived = {}
+        self.lock = threading.Lock()
+
+    def get_derived(self, name: str, builder: Callable[[], Any]) -> Any:
+        """
+        Метод получения производного от раундовых ключей значения.
+
+        Значение (ключи для табличного дешифрования, массивы NumPy, сгенерированные функции и т.д.)
+        вычисляется при первом обращении и хранится вместе с раундовыми ключами.
+
+        :param name: str, имя производного значения
+        :param builder: callable, функция вычисления значения
+        :return: производное значение
+        """
+
+        with self.lock:
+            if name not in self.derived:
+                self.derived[name] = builder()
+            return self.derived[name]
+
+    def release(self) -> None:
+        """
+        Метод освобождения записи при вытеснении из кэша.
+
+        Список ключей и ссылки на производные значения очищаются.
+        Сами производные значения не изменяются, так как могут использоваться открытыми сессиями.
+
+        :return: None
+        """
+
+        with self.lock:
+            self.round_keys.clear()
+            self.derived.clear()
+
+
+class KeyScheduleCache:
+    """
+    Класс общего для процесса кэша раундовых ключей с вытеснением давно не используемых записей (LRU).
+
+    """
+
+    def __init__(self, maxsize: int = KEY_SCHEDULE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.salt = os.urandom(16)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_digest(self, master: bytes) -> bytes:
+        """
+        Метод вычисления ключа записи кэша.
+
+        Используется хэш мастер-ключа со случайной солью процесса, поэтому сам мастер-ключ в кэше не хранится.
+
+        :param master: bytes, мастер-ключ
+        :return: bytes, хэш мастер-ключа
+        """
+
+        return hashlib.blake2b(master, key=self.salt, digest_size=32).digest()
+
+    def get_entry(self, master: bytes, builder: Callable[[], List[int]]) -> Tuple[KeyScheduleEntry, List[int]]:
+        """
+        Метод получения записи кэша для мастер-ключа.
+
+        При отсутствии записи раундовые ключи вычисляются функцией builder,
+        а при превышении размера кэша вытесняется давно не используемая запись.
+        Копия раундовых ключей снимается под блокировкой, поэтому вытеснение записи
+        другим потоком не затрагивает вызывающую сторону.
+
+        :param master: bytes, мастер-ключ
+        :param builder: callable, функция формирования раундовых ключей
+        :return: tuple, (запись кэша, копия раундовых ключей)
+        """
+
+        digest = self.get_digest(master=master)
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(digest)
+                return entry, list(entry.round_keys)
+            self.misses += 1
+        round_keys = builder()
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                entry = KeyScheduleEntry(round_keys=round_keys)
+                self.entries[digest] = entry
+            self.entries.move_to_end(digest)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)[1].release()
+                self.evictions += 1
+        return entry, list(round_keys)
+
+    def clear(self) -> None:
+        """
+        Метод очистки кэша с освобождением всех записей.
+
+        :return: None
+        """
+
+        with self.lock:
+            while self.entries:
+                self.entries.popitem()[1].release()
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Метод получения статистики кэша.
+
+        :return: dict, количество попаданий, промахов, вытеснений и текущий размер кэша
+        """
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self.entries), 'maxsize': self.maxsize}
+
+
+KEY_SCHEDULE_CACHE = KeyScheduleCache()
@@ -0,0 +1,103 @@
+import random
+from typing import Callable, List, Tuple
+import gost.tables as tables
+import gost.utils as utils
+
+
+VALIDATION_SAMPLES = 8
+
+
+def _lookup_expression(prefix: str, key: int = 0) -> str:
+    """
+    Функция формирования выражения 16 табличных подстановок с учётом сложения с раундовым ключом.
+
+    Сложение блока с ключом выполняется побайтно внутри индексов таблиц,
+    так как ((x ^ K) >> s) & 255 = ((x >> s) & 255) ^ K_s.
+
+    :param prefix: str, префикс имён таблиц
+    :param key: int, раундовый ключ, складываемый с блоком перед подстановкой
+    :return: str, выражение на языке Python
+    """
+
+    terms = []
+    for i in range(16):
+        shift = 8 * (15 - i)
+        key_byte = (key >> shift) & 255
+        index = f'x >> {shift}' if i == 0 else (f'(x >> {shift}) & 255' if shift else 'x & 255')
+        if key_byte:
+            index = f'({index}) ^ {key_byte}'
+        terms.append(f'{prefix}{i}[{index}]')
+    return ' ^\n         '.join(terms)
+
+
+def generate_source(keys: List[int], inverse_keys: List[int]) -> str:
+    """
+    Функция генерации исходного кода развёрнутых функций шифрования и дешифрования.
+
+    Все раунды записываются последовательно, раундовые ключи подставляются как константы,
+    таблицы передаются как значения аргументов по умолчанию (локальные имена).
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param inverse_keys: list, раундовые ключи для табличного дешифрования
+    :return: str, исходный код функций encrypt и decrypt
+    """
+
+    def table_args(prefix: str) -> str:
+        return ', '.join(f'{prefix}{i}={prefix}{i}' for i in range(16))
+
+    lines = [f'def encrypt(x, {table_args("T")}):']
+    for i in range(9):
+        lines.append(f'    x = ({_lookup_expression(prefix="T", key=keys[i])})')
+    lines.append(f'    return x ^ {hex(keys[9])}')
+    lines.append('')
+    lines.append(f'def decrypt(x, {table_args("L")}, {table_args("D")}, {table_args("S")}):')
+    lines.append(f'    x = ({_lookup_expression(prefix="L", key=inverse_keys[9])})')
+    for i in range(8, 0, -1):
+        lines.append(f'    x = ({_lookup_expression(prefix="D")}) ^ {hex(inverse_keys[i])}')
+    lines.append(f'    x = ({_lookup_expression(prefix="S")})')
+    lines.append(f'    return x ^ {hex(inverse_keys[0])}')
+    return '\n'.join(lines) + '\n'
+
+
+def compile_functions(keys: List[int], inverse_keys: List[int]) -> Tuple[Callable[[int], int], Callable[[int], int]]:
+    """
+    Функция компиляции развёрнутых функций шифрования и дешифрования для заданных раундовых ключей.
+
+    После компиляции функции сверяются с эталонной реализацией на случайных блоках.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param inverse_keys: list, раундовые ключи для табличного дешифрования
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    namespace = {}
+    for i, table in enumerate(tables.get_encryption_tables()):
+        namespace[f'T{i}'] = table
+    for prefix, table_set in zip('LDS', tables.get_decryption_tables()):
+        for i, table in enumerate(table_set):
+            namespace[f'{prefix}{i}'] = table
+    exec(compile(generate_source(keys=keys, inverse_keys=inverse_keys), '<gost-unrolled>', 'exec'), namespace)
+    encrypt, decrypt = namespace['encrypt'], namespace['decrypt']
+    validate_functions(keys=keys, encrypt=encrypt, decrypt=decrypt)
+    return encrypt, decrypt
+
+
+def validate_functions(keys: List[int], encrypt: Callable[[int], int], decrypt: Callable[[int], int],
+                       samples: int = VALIDATION_SAMPLES) -> None:
+    """
+    Функция сверки сгенерированных функций с эталонной реализацией.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param encrypt: callable, функция шифрования блока
+    :param decrypt: callable, функция дешифрования блока
+    :param samples: int, количество случайных блоков
+    :return: None
+    """
+
+    list_keys = [utils.int_to_block(x=key) for key in keys]
+    for _ in range(samples):
+        block = random.getrandbits(128)
+        expected = utils.cryptographic_transformation(msg=utils.int_to_block(x=block), keys=list_keys,
+                                                      in_range=range(9), last_ind=9)
+        if encrypt(block) != utils.block_to_int(block=expected) or decrypt(encrypt(block)) != block:
+            raise RuntimeError
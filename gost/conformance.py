@@ -0,0 +1,152 @@
+import argparse
+import random
+import sys
+from typing import Dict, List, Optional
+from gost.crypto import GOST34122018
+import gost.batch as batch
+import gost.engines as engines
+import gost.utils as utils
+
+
+# Контрольные примеры ГОСТ 34.12-2018 (приложение А.1)
+KAT_MASTER_KEY = 0x8899aabbccddeeff0011223344556677fedcba98765432100123456789abcdef
+KAT_ROUND_KEYS = [
+    0x8899aabbccddeeff0011223344556677,
+    0xfedcba98765432100123456789abcdef,
+    0xdb31485315694343228d6aef8cc78c44,
+    0x3d4553d8e9cfec6815ebadc40a9ffd04,
+    0x57646468c44a5e28d3e59246f429f1ac,
+    0xbd079435165c6432b532e82834da581b,
+    0x51e640757e8745de705727265a0098b1,
+    0x5a7925017b9fdd3ed72a91a22286f984,
+    0xbb44e25378c73123a5f32f73cdb6e517,
+    0x72e9dd7416bcf45b755dbaa88e4a4043,
+]
+KAT_PLAIN_TEXT = 0x1122334455667700ffeeddccbbaa9988
+KAT_CIPHER_TEXT = 0x7f679d90bebc24305a468d42b9d4edcd
+
+DIFFERENTIAL_KEYS = 8
+DIFFERENTIAL_BLOCKS = 64
+
+
+def check_known_answers(engine: str) -> List[str]:
+    """
+    Функция проверки движка на контрольных примерах ГОСТ 34.12-2018.
+
+    Проверяются развёртывание ключа, шифрование и дешифрование одного блока,
+    а также пакетная обработка (при наличии NumPy – пакетным движком).
+
+    :param engine: str, имя зарегистрированного движка
+    :return: list, описания обнаруженных расхождений (пустой список, если их нет)
+    """
+
+    failures = []
+    cipher = GOST34122018(master_key=KAT_MASTER_KEY, engine=engine, use_cache=False)
+    if cipher.int_round_keys != KAT_ROUND_KEYS:
+        failures.append(f'{engine}: раундовые ключи не совпадают с контрольными')
+    if cipher.encrypt_block(block=KAT_PLAIN_TEXT) != KAT_CIPHER_TEXT:
+        failures.append(f'{engine}: шифрование контрольного блока')
+    if cipher.decrypt_block(block=KAT_CIPHER_TEXT) != KAT_PLAIN_TEXT:
+        failures.append(f'{engine}: дешифрование контрольного блока')
+    count = 2 * batch.BATCH_THRESHOLD
+    plain_text = KAT_PLAIN_TEXT.to_bytes(16, 'big') * count
+    cipher_text = KAT_CIPHER_TEXT.to_bytes(16, 'big') * count
+    if cipher.encrypt_blocks(data=plain_text) != cipher_text:
+        failures.append(f'{engine}: пакетное шифрование контрольных блоков')
+    if cipher.decrypt_blocks(data=cipher_text) != plain_text:
+        failures.append(f'{engine}: пакетное дешифрование контрольных блоков')
+    return failures
+
+
+def check_differential(engine_names: List[str], keys: int = DIFFERENTIAL_KEYS, blocks: int = DIFFERENTIAL_BLOCKS,
+                       seed: Optional[int] = None) -> List[str]:
+    """
+    Функция сравнения движков с эталонной реализацией на случайных ключах и блоках.
+
+    Эталоном служит функция utils.cryptographic_transformation над списками байтов.
+
+    :param engine_names: list, имена проверяемых движков
+    :param keys: int, количество случайных мастер-ключей
+    :param blocks: int, количество случайных блоков для каждого ключа
+    :param seed: int, начальное значение генератора (для воспроизведения расхождений)
+    :return: list, описания обнаруженных расхождений (пустой список, если их нет)
+    """
+
+    failures = []
+    rng = random.Random(seed)
+    for _ in range(keys):
+        master = rng.getrandbits(256)
+        reference = GOST34122018(master_key=master, engine=engines.REFERENCE_ENGINE, use_cache=False)
+        plain_blocks = [rng.getrandbits(128) for _ in range(blocks)]
+        expected = []
+        for block in plain_blocks:
+            result = utils.cryptographic_transformation(msg=utils.int_to_block(x=block),
+                                                        keys=reference.round_keys,
+                                                        in_range=range(9), last_ind=9)
+            expected.append(utils.block_to_int(block=result))
+        plain_text = b''.join(block.to_bytes(16, 'big') for block in plain_blocks)
+        cipher_text = b''.join(block.to_bytes(16, 'big') for block in expected)
+        for engine in engine_names:
+            cipher = GOST34122018(master_key=master, engine=engine, use_cache=False)
+            if cipher.int_round_keys != reference.int_round_keys:
+                failures.append(f'{engine}: раундовые ключи для ключа {master:064x}')
+                continue
+            for block, result in zip(plain_blocks, expected):
+                if cipher.encrypt_block(block=block) != result:
+                    failures.append(f'{engine}: шифрование блока {block:032x} на ключе {master:064x}')
+                if cipher.decrypt_block(block=result) != block:
+                    failures.append(f'{engine}: дешифрование блока {result:032x} на ключе {master:064x}')
+            if cipher.encrypt_blocks(data=plain_text) != cipher_text:
+                failures.append(f'{engine}: пакетное шифрование на ключе {master:064x}')
+            if cipher.decrypt_blocks(data=cipher_text) != plain_text:
+                failures.append(f'{engine}: пакетное дешифрование на ключе {master:064x}')
+    return failures
+
+
+def run(engine_names: List[str] = None, keys: int = DIFFERENTIAL_KEYS, blocks: int = DIFFERENTIAL_BLOCKS,
+        seed: Optional[int] = None) -> Dict[str, List[str]]:
+    """
+    Функция полной проверки соответствия движков.
+
+    :param engine_names: list, имена проверяемых движков (по умолчанию все зарегистрированные)
+    :param keys: int, количество случайных мастер-ключей
+    :param blocks: int, количество случайных блоков для каждого ключа
+    :param seed: int, начальное значение генератора
+    :return: dict, расхождения для каждого движка
+    """
+
+    engine_names = engine_names or engines.get_engine_names()
+    report = {engine: check_known_answers(engine=engine) for engine in engine_names}
+    for failure in check_differential(engine_names=engine_names, keys=keys, blocks=blocks, seed=seed):
+        report[failure.split(':')[0]].append(failure)
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Функция запуска проверки соответствия из командной строки (python -m gost.conformance).
+
+    :param argv: list, аргументы командной строки
+    :return: int, код возврата (1 при обнаружении расхождений)
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m gost.conformance')
+    parser.add_argument('--engine', action='append', choices=engines.get_engine_names(),
+                        help='движок шифра (по умолчанию все)')
+    parser.add_argument('--keys', type=int, default=DIFFERENTIAL_KEYS)
+    parser.add_argument('--blocks', type=int, default=DIFFERENTIAL_BLOCKS)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    seed = args.seed if args.seed is not None else random.getrandbits(32)
+    report = run(engine_names=args.engine, keys=args.keys, blocks=args.blocks, seed=seed)
+    print(f'seed: {seed}, numpy: {batch.is_available()}')
+    for engine, failures in report.items():
+        print(f'{engine:<12} {"OK" if not failures else f"FAIL ({len(failures)})"}')
+        for failure in failures:
+            print(f'    {failure}')
+    return 1 if any(report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
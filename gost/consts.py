@@ -91,3 +91,18 @@ GALOIS_FIELD_CONSTS = [
     219, 117, 234, 23, 46, 92, 184, 179, 165, 137, 209, 97, 194, 71, 142, 223,
     125, 250, 55, 110, 220, 123, 246, 47, 94, 188, 187, 181, 169, 145, 225, 1,
 ]
+# Таблица логарифмов поля Галуа GF(2^8) (обратная к таблице степеней примитивного члена)
+GALOIS_FIELD_LOGS = [0] * 256
+for _power, _value in enumerate(GALOIS_FIELD_CONSTS[:255]):
+    GALOIS_FIELD_LOGS[_value] = _power
+# Таблицы произведений каждой линейной константы на все элементы поля GF(2^8)
+LINEAR_MUL_TABLES = [
+    [0] + [GALOIS_FIELD_CONSTS[(GALOIS_FIELD_LOGS[_const] + GALOIS_FIELD_LOGS[_x]) % 255] for _x in range(1, 256)]
+    for _const in LINEAR_CONSTS
+]
+del _power, _value
+# Представления констант для преобразований над блоками в виде 128-битных чисел
+BLOCK_MASK = (1 << 128) - 1
+ITER_CONSTS_INT = [int.from_bytes(bytes(_const), 'big') for _const in ITER_CONSTS]
+NONLINEAR_BYTES = bytes(NONLINEAR_CONSTS)
+INVERSE_NONLINEAR_BYTES = bytes(INVERSE_NONLINEAR_CONSTS)
@@ -1,5 +1,11 @@
-from typing import List
+from typing import List, Optional, Tuple, Union
+import gost.batch as batch
+import gost.cache as cache
+import gost.engines as engines
+import gost.streaming as streaming
+import gost.tables as tables
 import gost.utils as utils
+from gost import consts
 
 
 class GOST34122018:
@@ -10,54 +16,275 @@ class GOST34122018:
 
     ENCRYPT_FLAG = 'encrypt'
     DECRYPT_FLAG = 'decrypt'
+    REFERENCE_ENGINE = engines.REFERENCE_ENGINE
+    INTEGER_ENGINE = engines.INTEGER_ENGINE
+    TABLE_ENGINE = engines.TABLE_ENGINE
+    UNROLLED_ENGINE = engines.UNROLLED_ENGINE
+    BATCH_ENGINE = engines.BATCH_ENGINE
 
-    def __init__(self, master_key):
-        self.round_keys = self.get_round_keys(master=master_key)
+    def __init__(self, master_key, engine: str = TABLE_ENGINE, use_cache: bool = True):
+        if engine not in engines.ENGINES:
+            raise ValueError
+        self.engine = engine
+        self.schedule = None
+        if use_cache:
+            master = master_key.to_bytes(32, 'big') if isinstance(master_key, int) else bytes(master_key)
+            self.schedule, self.int_round_keys = cache.KEY_SCHEDULE_CACHE.get_entry(
+                master=master, builder=lambda: self.get_round_keys(master=master)
+            )
+        else:
+            self.int_round_keys = self.get_round_keys(master=master_key)
+        self.round_keys = [utils.int_to_block(x=key) for key in self.int_round_keys]
+        self.inverse_round_keys = None
+        self.engine_functions = self.get_derived(
+            name=f'engine:{engine}', builder=lambda: engines.build_engine(name=engine, keys=self.int_round_keys)
+        )
+        self.batch_keys = None
+
+    def get_derived(self, name: str, builder):
+        """
+        Метод получения производного от раундовых ключей значения.
+
+        При использовании кэша значение вычисляется один раз для мастер-ключа и хранится вместе с раундовыми ключами.
 
-    def get_round_keys(self, master: List[int]) -> List[list]:
+        :param name: str, имя производного значения
+        :param builder: callable, функция вычисления значения
+        :return: производное значение
+        """
+
+        if self.schedule is None:
+            return builder()
+        return self.schedule.get_derived(name=name, builder=builder)
+
+    def get_round_keys(self, master: Union[List[int], bytes, int]) -> List[int]:
         """
         Метод формирования раундовых ключей.
 
         Вычисляет 32 раунда сети Фейстеля, формируя 10 раундовых ключей.
+        Преобразование LS в каждом раунде выполняется по таблицам шифрования (см. gost.tables).
+        Ключи вычисляются и хранятся в виде 128-битных чисел.
 
-        :param master: list, мастер-ключ K
-        :return: list, список раундовых ключей, представленных в виде блоков
+        :param master: list, bytes или int, мастер-ключ K
+        :return: list, список раундовых ключей, представленных в виде 128-битных чисел
         """
 
-        result_list = [master[:16], master[16:]]
-        left_key, right_key = result_list[0], result_list[1]
+        if not isinstance(master, int):
+            master = utils.block_to_int(block=master)
+        left_key, right_key = master >> 128, master & consts.BLOCK_MASK
+        result_list = [left_key, right_key]
         for i in range(4):
             for j in range(8):
                 curr_index = 8 * i + j
-                left_key, right_key = utils.feistel_network(left=left_key, right=right_key, const_ind=curr_index)
+                left_key, right_key = tables.table_feistel_network(left=left_key, right=right_key, const_ind=curr_index)
             result_list.extend([left_key, right_key])
         return result_list
 
+    def get_transformation_params(self, flag: str) -> Tuple[range, int, bool]:
+        """
+        Метод получения параметров криптографического преобразования.
+
+        В зависимости от флага, определяет порядок индексов для итераций,
+        индекс ключа последнего раунда и направление преобразований.
+
+        :param flag: str, флаг, указывающий на шифрование/дешифрование сообщения
+        :return: tuple, (диапазон индексов раундовых ключей, индекс ключа 10 раунда, является ли преобразование обратным)
+        """
+
+        if flag not in [self.ENCRYPT_FLAG, self.DECRYPT_FLAG]:
+            raise ValueError
+        if flag == self.ENCRYPT_FLAG:
+            return range(9), 9, False
+        return range(9, 0, -1), 0, True
+
     def message_prehandling(self, msg: List[int], flag: str) -> List[int]:
         """
         Метод предобработки сообщения.
 
         В зависимости от флага, определяет порядок индексов для итераций и порядок функций преобразований.
-        Вызывает функцию криптографического преобразования.
+        Для эталонного движка вызывает функцию криптографического преобразования над списками,
+        для остальных зарегистрированных движков является адаптером к методу block_prehandling.
 
         :param msg: list, сообщение, представленное в виде блоков
         :param flag: str, флаг, указывающий на шифрование/дешифрование сообщения
         :return: list, зашифрованное/дешифрованное сообщение, представленное в виде блоков
         """
 
-        if flag not in [self.ENCRYPT_FLAG, self.DECRYPT_FLAG]:
-            raise ValueError
-        if flag == self.ENCRYPT_FLAG:
-            curr_range = range(9)
-            last_xor_ind = 9
-            inverse = False
-        else:
-            curr_range = range(9, 0, -1)
-            last_xor_ind = 0
-            inverse = True
+        curr_range, last_xor_ind, inverse = self.get_transformation_params(flag=flag)
+        if self.engine != self.REFERENCE_ENGINE:
+            block = self.block_prehandling(block=utils.block_to_int(block=msg), flag=flag)
+            return utils.int_to_block(x=block)
         result = utils.cryptographic_transformation(msg=msg,
                                                     keys=self.round_keys,
                                                     in_range=curr_range,
                                                     last_ind=last_xor_ind,
                                                     inverse=inverse)
         return result
+
+    def block_prehandling(self, block: int, flag: str) -> int:
+        """
+        Метод предобработки блока, представленного в виде 128-битного числа.
+
+        Вызывает функцию шифрования/дешифрования блока выбранного движка (см. gost.engines).
+
+        :param block: int, блок сообщения
+        :param flag: str, флаг, указывающий на шифрование/дешифрование сообщения
+        :return: int, зашифрованный/дешифрованный блок
+        """
+
+        inverse = self.get_transformation_params(flag=flag)[2]
+        return self.engine_functions[1 if inverse else 0](block)
+
+    def encrypt_block(self, block: Union[int, bytes]) -> Union[int, bytes]:
+        """
+        Метод шифрования одного блока.
+
+        :param block: int или bytes, блок открытого текста (128-битное число или 16 байт)
+        :return: int или bytes, блок шифротекста того же типа, что и входной блок
+        """
+
+        if isinstance(block, int):
+            return self.block_prehandling(block=block, flag=self.ENCRYPT_FLAG)
+        result = self.block_prehandling(block=int.from_bytes(block, 'big'), flag=self.ENCRYPT_FLAG)
+        return result.to_bytes(16, 'big')
+
+    def decrypt_block(self, block: Union[int, bytes]) -> Union[int, bytes]:
+        """
+        Метод дешифрования одного блока.
+
+        :param block: int или bytes, блок шифротекста (128-битное число или 16 байт)
+        :return: int или bytes, блок открытого текста того же типа, что и входной блок
+        """
+
+        if isinstance(block, int):
+            return self.block_prehandling(block=block, flag=self.DECRYPT_FLAG)
+        result = self.block_prehandling(block=int.from_bytes(block, 'big'), flag=self.DECRYPT_FLAG)
+        return result.to_bytes(16, 'big')
+
+    def blocks_prehandling(self, data, flag: str):
+        """
+        Метод пакетной предобработки нескольких блоков.
+
+        При установленном NumPy все блоки преобразуются одновременно пакетным движком,
+        иначе (а также для коротких сообщений, если выбран не пакетный движок)
+        блоки последовательно обрабатываются методом block_prehandling.
+
+        :param data: np.ndarray формы (N, 16) типа uint8 или bytes-like объект длиной, кратной 16
+        :param flag: str, флаг, указывающий на шифрование/дешифрование сообщения
+        :return: np.ndarray (для массива на входе) или bytes, зашифрованные/дешифрованные блоки
+        """
+
+        inverse = self.get_transformation_params(flag=flag)[2]
+        if not batch.is_available() or not isinstance(data, batch.np.ndarray):
+            buffer = memoryview(data).cast('B')
+            if len(buffer) % 16:
+                raise ValueError
+            if not batch.is_available() or \
+                    (len(buffer) < 16 * batch.BATCH_THRESHOLD and self.engine != self.BATCH_ENGINE):
+                return b''.join(
+                    self.block_prehandling(block=int.from_bytes(buffer[i:i + 16], 'big'),
+                                           flag=flag).to_bytes(16, 'big')
+                    for i in range(0, len(buffer), 16)
+                )
+        if self.batch_keys is None:
+            if self.inverse_round_keys is None:
+                self.inverse_round_keys = self.get_derived(
+                    name='inverse_round_keys', builder=lambda: tables.get_inverse_round_keys(keys=self.int_round_keys)
+                )
+            self.batch_keys = self.get_derived(
+                name='batch_keys', builder=lambda: (batch.keys_to_array(keys=self.int_round_keys),
+                                                    batch.keys_to_array(keys=self.inverse_round_keys))
+            )
+        blocks = batch.to_blocks(data=data)
+        if inverse:
+            result = batch.batch_decryption(blocks=blocks, inverse_keys=self.batch_keys[1])
+        else:
+            result = batch.batch_encryption(blocks=blocks, keys=self.batch_keys[0])
+        if isinstance(data, batch.np.ndarray):
+            return result
+        return result.tobytes()
+
+    def encrypt_blocks(self, data):
+        """
+        Метод пакетного шифрования нескольких блоков.
+
+        :param data: np.ndarray формы (N, 16) типа uint8 или bytes-like объект длиной, кратной 16
+        :return: np.ndarray или bytes, блоки шифротекста
+        """
+
+        return self.blocks_prehandling(data=data, flag=self.ENCRYPT_FLAG)
+
+    def decrypt_blocks(self, data):
+        """
+        Метод пакетного дешифрования нескольких блоков.
+
+        :param data: np.ndarray формы (N, 16) типа uint8 или bytes-like объект длиной, кратной 16
+        :return: np.ndarray или bytes, блоки открытого текста
+        """
+
+        return self.blocks_prehandling(data=data, flag=self.DECRYPT_FLAG)
+
+    def bytes_prehandling(self, data, flag: str, out: Optional[bytearray] = None) -> Union[bytes, bytearray]:
+        """
+        Метод предобработки сообщения, представленного любым bytes-like объектом.
+
+        Данные не копируются в списки байтов: блоки читаются через memoryview и обрабатываются пакетно.
+        При передаче буфера out результат записывается в него частями не более STREAM_CHUNK байт.
+
+        :param data: bytes-like объект длиной, кратной 16
+        :param flag: str, флаг, указывающий на шифрование/дешифрование сообщения
+        :param out: bytearray, буфер для результата длиной не меньше длины данных
+        :return: bytes (без буфера out) или переданный буфер out
+        """
+
+        buffer = memoryview(data).cast('B')
+        if len(buffer) % 16:
+            raise ValueError
+        if out is None:
+            return self.blocks_prehandling(data=buffer, flag=flag)
+        target = memoryview(out).cast('B')
+        if len(target) < len(buffer):
+            raise ValueError
+        for start in range(0, len(buffer), streaming.STREAM_CHUNK):
+            end = min(start + streaming.STREAM_CHUNK, len(buffer))
+            target[start:end] = self.blocks_prehandling(data=buffer[start:end], flag=flag)
+        return out
+
+    def encrypt_bytes(self, data, out: Optional[bytearray] = None) -> Union[bytes, bytearray]:
+        """
+        Метод шифрования сообщения, представленного любым bytes-like объектом.
+
+        :param data: bytes-like объект длиной, кратной 16, открытый текст
+        :param out: bytearray, буфер для шифротекста длиной не меньше длины данных
+        :return: bytes (без буфера out) или переданный буфер out
+        """
+
+        return self.bytes_prehandling(data=data, flag=self.ENCRYPT_FLAG, out=out)
+
+    def decrypt_bytes(self, data, out: Optional[bytearray] = None) -> Union[bytes, bytearray]:
+        """
+        Метод дешифрования сообщения, представленного любым bytes-like объектом.
+
+        :param data: bytes-like объект длиной, кратной 16, шифротекст
+        :param out: bytearray, буфер для открытого текста длиной не меньше длины данных
+        :return: bytes (без буфера out) или переданный буфер out
+        """
+
+        return self.bytes_prehandling(data=data, flag=self.DECRYPT_FLAG, out=out)
+
+    def encryptor(self) -> streaming.CipherContext:
+        """
+        Метод создания потокового контекста шифрования.
+
+        :return: CipherContext, контекст с методами update/update_into/finalize
+        """
+
+        return streaming.CipherContext(cipher=self, flag=self.ENCRYPT_FLAG)
+
+    def decryptor(self) -> streaming.CipherContext:
+        """
+        Метод создания потокового контекста дешифрования.
+
+        :return: CipherContext, контекст с методами update/update_into/finalize
+        """
+
+        return streaming.CipherContext(cipher=self, flag=self.DECRYPT_FLAG)
@@ -0,0 +1,165 @@
+from typing import Callable, Dict, List, Tuple
+import gost.batch as batch
+import gost.codegen as codegen
+import gost.tables as tables
+import gost.utils as utils
+
+
+BlockFunctions = Tuple[Callable[[int], int], Callable[[int], int]]
+
+REFERENCE_ENGINE = 'reference'
+INTEGER_ENGINE = 'integer'
+TABLE_ENGINE = 'table'
+UNROLLED_ENGINE = 'unrolled'
+BATCH_ENGINE = 'batch'
+
+ENGINES: Dict[str, Callable[[List[int]], BlockFunctions]] = {}
+
+
+def register_engine(name: str):
+    """
+    Функция (декоратор) регистрации движка шифра.
+
+    Движок задаётся функцией, которая по раундовым ключам (128-битным числам) возвращает пару функций
+    шифрования и дешифрования блока, представленного в виде 128-битного числа.
+    Зарегистрированные движки доступны классу GOST34122018, замерам производительности
+    и проверке соответствия эталонной реализации (gost.conformance).
+
+    :param name: str, имя движка
+    :return: callable, декоратор, регистрирующий функцию построения движка
+    """
+
+    def decorator(builder: Callable[[List[int]], BlockFunctions]) -> Callable[[List[int]], BlockFunctions]:
+        if name in ENGINES:
+            raise ValueError
+        ENGINES[name] = builder
+        return builder
+
+    return decorator
+
+
+def get_engine_names() -> List[str]:
+    """
+    Функция получения имён зарегистрированных движков.
+
+    :return: list, имена движков в порядке регистрации
+    """
+
+    return list(ENGINES)
+
+
+def build_engine(name: str, keys: List[int]) -> BlockFunctions:
+    """
+    Функция построения функций шифрования и дешифрования блока выбранного движка.
+
+    :param name: str, имя движка
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    if name not in ENGINES:
+        raise ValueError
+    return ENGINES[name](keys)
+
+
+@register_engine(name=REFERENCE_ENGINE)
+def reference_engine(keys: List[int]) -> BlockFunctions:
+    """
+    Эталонный движок: пошаговые преобразования над списками байтов.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    list_keys = [utils.int_to_block(x=key) for key in keys]
+
+    def encrypt(block: int) -> int:
+        result = utils.cryptographic_transformation(msg=utils.int_to_block(x=block), keys=list_keys,
+                                                    in_range=range(9), last_ind=9)
+        return utils.block_to_int(block=result)
+
+    def decrypt(block: int) -> int:
+        result = utils.cryptographic_transformation(msg=utils.int_to_block(x=block), keys=list_keys,
+                                                    in_range=range(9, 0, -1), last_ind=0, inverse=True)
+        return utils.block_to_int(block=result)
+
+    return encrypt, decrypt
+
+
+@register_engine(name=INTEGER_ENGINE)
+def integer_engine(keys: List[int]) -> BlockFunctions:
+    """
+    Движок, выполняющий пошаговые преобразования над 128-битными числами.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    def encrypt(block: int) -> int:
+        return utils.cryptographic_transformation_int(msg=block, keys=keys, in_range=range(9), last_ind=9)
+
+    def decrypt(block: int) -> int:
+        return utils.cryptographic_transformation_int(msg=block, keys=keys, in_range=range(9, 0, -1),
+                                                      last_ind=0, inverse=True)
+
+    return encrypt, decrypt
+
+
+@register_engine(name=TABLE_ENGINE)
+def table_engine(keys: List[int]) -> BlockFunctions:
+    """
+    Табличный движок: совмещённые LS-таблицы.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    inverse_keys = tables.get_inverse_round_keys(keys=keys)
+
+    def encrypt(block: int) -> int:
+        return tables.table_encryption(block=block, keys=keys)
+
+    def decrypt(block: int) -> int:
+        return tables.table_decryption(block=block, inverse_keys=inverse_keys)
+
+    return encrypt, decrypt
+
+
+@register_engine(name=UNROLLED_ENGINE)
+def unrolled_engine(keys: List[int]) -> BlockFunctions:
+    """
+    Развёрнутый движок: сгенерированные для раундовых ключей функции без циклов.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: tuple, (функция шифрования блока, функция дешифрования блока)
+    """
+
+    return codegen.compile_functions(keys=keys, inverse_keys=tables.get_inverse_round_keys(keys=keys))
+
+
+if batch.is_available():
+    @register_engine(name=BATCH_ENGINE)
+    def batch_engine(keys: List[int]) -> BlockFunctions:
+        """
+        Пакетный движок на NumPy (см. gost.batch), регистрируется только при установленном NumPy.
+
+        Блок обрабатывается как массив из одного блока, поэтому движок проверяется
+        на тех же контрольных примерах и случайных блоках, что и остальные движки.
+
+        :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+        :return: tuple, (функция шифрования блока, функция дешифрования блока)
+        """
+
+        batch_keys = batch.keys_to_array(keys=keys)
+        inverse_keys = batch.keys_to_array(keys=tables.get_inverse_round_keys(keys=keys))
+
+        def encrypt(block: int) -> int:
+            result = batch.batch_encryption(blocks=batch.to_blocks(data=block.to_bytes(16, 'big')), keys=batch_keys)
+            return int.from_bytes(result.tobytes(), 'big')
+
+        def decrypt(block: int) -> int:
+            result = batch.batch_decryption(blocks=batch.to_blocks(data=block.to_bytes(16, 'big')),
+                                            inverse_keys=inverse_keys)
+            return int.from_bytes(result.tobytes(), 'big')
+
+        return encrypt, decrypt
@@ -0,0 +1,239 @@
+import hmac
+import os
+from typing import List, Optional, Tuple
+from gost.crypto import GOST34122018
+from gost.modes import CTR_MIN_CHUNK_BLOCKS, CTR_PARALLEL_THRESHOLD, get_process_pool
+import gost.batch as batch
+import gost.tables as tables
+
+
+MGM_NONCE_SIZE = 16
+MGM_TAG_SIZE = 16
+BLOCK_MASK = (1 << 128) - 1
+HALF_MASK = (1 << 64) - 1
+
+
+class MGMAuthenticationError(ValueError):
+    """
+    Исключение, возникающее при несовпадении имитовставки.
+
+    """
+
+
+def gf128_table(h: int) -> List[int]:
+    """
+    Функция построения таблицы произведений элемента на все 4-битные многочлены.
+
+    Значения таблицы не приводятся по модулю порождающего многочлена:
+    приведение выполняется один раз для всей суммы произведений.
+
+    :param h: int, элемент поля GF(2^128)
+    :return: list, 16 произведений h на многочлены степени меньше 4
+    """
+
+    table = [0] * 16
+    for j in range(1, 16):
+        table[j] = (table[j >> 1] << 1) ^ (h if j & 1 else 0)
+    return table
+
+
+def gf128_multiply(table: List[int], x: int) -> int:
+    """
+    Функция умножения без приведения по таблице элемента (по 4 бита множителя за шаг).
+
+    :param table: list, таблица, полученная функцией gf128_table
+    :param x: int, второй множитель
+    :return: int, произведение степени меньше 256 (не приведённое)
+    """
+
+    z = 0
+    for shift in range(124, -1, -4):
+        z = (z << 4) ^ table[(x >> shift) & 15]
+    return z
+
+
+def gf128_reduce(z: int) -> int:
+    """
+    Функция приведения многочлена по модулю x^128 + x^7 + x^2 + x + 1.
+
+    :param z: int, многочлен степени меньше 256
+    :return: int, элемент поля GF(2^128)
+    """
+
+    for _ in range(2):
+        high = z >> 128
+        z = (z & BLOCK_MASK) ^ high ^ (high << 1) ^ (high << 2) ^ (high << 7)
+    return z
+
+
+def generate_counter_blocks(keys: List[int], initial: int, start: int, count: int, left: bool = False) -> bytes:
+    """
+    Функция шифрования последовательности счётчиков режима MGM.
+
+    Для последовательности Y увеличивается правая половина блока (incr_r),
+    для последовательности Z – левая (incr_l), обе по модулю 2^64.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param initial: int, первый счётчик последовательности
+    :param start: int, номер первого счётчика
+    :param count: int, количество счётчиков
+    :param left: bool, флаг, указывающий, что увеличивается левая половина блока
+    :return: bytes, зашифрованные счётчики длиной 16 * count байт
+    """
+
+    high, low = initial >> 64, initial & HALF_MASK
+    if batch.is_available() and count >= batch.BATCH_THRESHOLD:
+        np = batch.np
+        moving = np.arange(start, start + count, dtype=np.uint64) + np.uint64(high if left else low)
+        halves = np.empty((count, 2), dtype='>u8')
+        halves[:, 0 if left else 1] = moving
+        halves[:, 1 if left else 0] = low if left else high
+        counters = halves.view(np.uint8).reshape(-1, 16)
+        return batch.batch_encryption(blocks=counters, keys=batch.keys_to_array(keys=keys)).tobytes()
+    if left:
+        blocks = ((((high + i) & HALF_MASK) << 64) | low for i in range(start, start + count))
+    else:
+        blocks = ((high << 64) | ((low + i) & HALF_MASK) for i in range(start, start + count))
+    return b''.join(tables.table_encryption(block=block, keys=keys).to_bytes(16, 'big') for block in blocks)
+
+
+class MGMMode:
+    """
+    Класс режима аутентифицированного шифрования MGM (Р 1323565.1.026-2019) поверх шифра ГОСТ 34.12-2018.
+
+    """
+
+    def __init__(self, cipher: GOST34122018, tag_size: int = MGM_TAG_SIZE, workers: Optional[int] = None,
+                 parallel_threshold: int = CTR_PARALLEL_THRESHOLD):
+        if not 4 <= tag_size <= 16:
+            raise ValueError
+        self.cipher = cipher
+        self.tag_size = tag_size
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+
+    def counter_blocks(self, initial: int, count: int, left: bool = False) -> bytes:
+        """
+        Метод шифрования последовательности счётчиков.
+
+        Последовательности Y и Z не зависят от данных, поэтому при большом объёме
+        выработка разбивается на диапазоны, обрабатываемые в пуле процессов.
+
+        :param initial: int, первый счётчик последовательности
+        :param count: int, количество счётчиков
+        :param left: bool, флаг, указывающий, что увеличивается левая половина блока
+        :return: bytes, зашифрованные счётчики
+        """
+
+        keys = self.cipher.int_round_keys
+        if self.workers < 2 or 16 * count < self.parallel_threshold:
+            return generate_counter_blocks(keys=keys, initial=initial, start=0, count=count, left=left)
+        chunk = max(-(-count // self.workers), CTR_MIN_CHUNK_BLOCKS)
+        pool = get_process_pool(workers=self.workers)
+        futures = [pool.submit(generate_counter_blocks, keys, initial, i, min(chunk, count - i), left)
+                   for i in range(0, count, chunk)]
+        return b''.join(future.result() for future in futures)
+
+    def process(self, nonce: bytes, data: bytes, associated_data: bytes, inverse: bool) -> Tuple[bytes, bytes]:
+        """
+        Метод одновременного шифрования и вычисления имитовставки.
+
+        Каждый блок шифротекста за один проход складывается с гаммой E(Y_i)
+        и умножается на E(Z_i) в поле GF(2^128); произведения накапливаются без приведения.
+
+        :param nonce: bytes, уникальное значение длиной 16 байт со старшим битом, равным 0
+        :param data: bytes-like объект, открытый текст (при шифровании) или шифротекст (при дешифровании)
+        :param associated_data: bytes-like объект, ассоциированные данные (только аутентифицируются)
+        :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
+        :return: tuple, (результат преобразования данных, имитовставка)
+        """
+
+        if len(nonce) != MGM_NONCE_SIZE or nonce[0] & 0x80:
+            raise ValueError
+        icn = int.from_bytes(nonce, 'big')
+        data, associated_data = memoryview(data).cast('B'), memoryview(associated_data).cast('B')
+        a_count, c_count = -(-len(associated_data) // 16), -(-len(data) // 16)
+        y_stream = self.counter_blocks(initial=self.cipher.encrypt_block(block=icn), count=c_count)
+        z_stream = self.counter_blocks(initial=self.cipher.encrypt_block(block=icn | (1 << 127)),
+                                       count=a_count + c_count + 1, left=True)
+        accumulator = 0
+        for i in range(a_count):
+            block = bytes(associated_data[16 * i:16 * i + 16]).ljust(16, b'\0')
+            h = int.from_bytes(z_stream[16 * i:16 * i + 16], 'big')
+            accumulator ^= gf128_multiply(table=gf128_table(h=h), x=int.from_bytes(block, 'big'))
+        result = bytearray(len(data))
+        for i in range(c_count):
+            chunk = data[16 * i:16 * i + 16]
+            size = len(chunk)
+            gamma = int.from_bytes(y_stream[16 * i:16 * i + size], 'big')
+            output = int.from_bytes(chunk, 'big') ^ gamma
+            result[16 * i:16 * i + size] = output.to_bytes(size, 'big')
+            cipher_block = int.from_bytes(chunk, 'big') if inverse else output
+            h = int.from_bytes(z_stream[16 * (a_count + i):16 * (a_count + i) + 16], 'big')
+            accumulator ^= gf128_multiply(table=gf128_table(h=h), x=cipher_block << (8 * (16 - size)))
+        lengths = ((8 * len(associated_data)) << 64) | (8 * len(data))
+        h = int.from_bytes(z_stream[-16:], 'big')
+        accumulator ^= gf128_multiply(table=gf128_table(h=h), x=lengths)
+        tag = self.cipher.encrypt_block(block=gf128_reduce(z=accumulator)).to_bytes(16, 'big')
+        return bytes(result), tag[:self.tag_size]
+
+    def encrypt(self, nonce: bytes, data: bytes, associated_data: bytes = b'') -> Tuple[bytes, bytes]:
+        """
+        Метод аутентифицированного шифрования.
+
+        :param nonce: bytes, уникальное значение длиной 16 байт со старшим битом, равным 0
+        :param data: bytes-like объект, открытый текст
+        :param associated_data: bytes-like объект, ассоциированные данные
+        :return: tuple, (шифротекст, имитовставка)
+        """
+
+        return self.process(nonce=nonce, data=data, associated_data=associated_data, inverse=False)
+
+    def decrypt(self, nonce: bytes, data: bytes, tag: bytes, associated_data: bytes = b'') -> bytes:
+        """
+        Метод аутентифицированного дешифрования.
+
+        :param nonce: bytes, значение, использованное при шифровании
+        :param data: bytes-like объект, шифротекст
+        :param tag: bytes, имитовставка
+        :param associated_data: bytes-like объект, ассоциированные данные
+        :return: bytes, открытый текст
+        """
+
+        result, expected = self.process(nonce=nonce, data=data, associated_data=associated_data, inverse=True)
+        if len(tag) != self.tag_size or not hmac.compare_digest(expected, bytes(tag)):
+            raise MGMAuthenticationError
+        return result
+
+    def seal(self, data: bytes, associated_data: bytes = b'') -> bytes:
+        """
+        Метод шифрования сообщения со случайным уникальным значением.
+
+        :param data: bytes-like объект, открытый текст
+        :param associated_data: bytes-like объект, ассоциированные данные
+        :return: bytes, уникальное значение, шифротекст и имитовставка
+        """
+
+        nonce = bytearray(os.urandom(MGM_NONCE_SIZE))
+        nonce[0] &= 0x7f
+        nonce = bytes(nonce)
+        cipher_text, tag = self.encrypt(nonce=nonce, data=data, associated_data=associated_data)
+        return nonce + cipher_text + tag
+
+    def open(self, data: bytes, associated_data: bytes = b'') -> bytes:
+        """
+        Метод проверки и дешифрования сообщения, полученного методом seal.
+
+        :param data: bytes-like объект, уникальное значение, шифротекст и имитовставка
+        :param associated_data: bytes-like объект, ассоциированные данные
+        :return: bytes, открытый текст
+        """
+
+        if len(data) < MGM_NONCE_SIZE + self.tag_size:
+            raise MGMAuthenticationError
+        data = memoryview(data)
+        return self.decrypt(nonce=bytes(data[:MGM_NONCE_SIZE]),
+                            data=data[MGM_NONCE_SIZE:len(data) - self.tag_size],
+                            tag=bytes(data[len(data) - self.tag_size:]),
+                            associated_data=associated_data)
+
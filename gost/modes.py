@@ -0,0 +1,350 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from gost.crypto import GOST34122018
+import gost.batch as batch
+import gost.streaming as streaming
+import gost.tables as tables
+
+
+CTR_IV_SIZE = 8
+CTR_HEADER_SIZE = 16
+CTR_PARALLEL_THRESHOLD = 1 << 20
+CTR_MIN_CHUNK_BLOCKS = 4096
+RESERVOIR_LOW_WATERMARK = 16 * 1024
+RESERVOIR_HIGH_WATERMARK = 64 * 1024
+RESERVOIR_CHUNK_BLOCKS = 256
+
+_process_pools: Dict[int, ProcessPoolExecutor] = {}
+
+
+def get_process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Функция получения пула процессов для генерации гаммы.
+
+    Пул создаётся один раз для каждого числа процессов и переиспользуется всеми сообщениями.
+
+    :param workers: int, количество процессов
+    :return: ProcessPoolExecutor, пул процессов
+    """
+
+    if workers not in _process_pools:
+        _process_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+    return _process_pools[workers]
+
+
+def shutdown_process_pools() -> None:
+    """
+    Функция завершения всех созданных пулов процессов.
+
+    :return: None
+    """
+
+    while _process_pools:
+        _process_pools.popitem()[1].shutdown(wait=False, cancel_futures=True)
+
+
+def generate_keystream(keys: List[int], iv: bytes, start: int, count: int) -> bytes:
+    """
+    Функция выработки гаммы в режиме гаммирования (ГОСТ 34.13-2018).
+
+    Счётчик CTR_i формируется как IV || i, где i – 64-битный номер блока,
+    гамма – результат шифрования счётчиков.
+    Функция не использует экземпляр класса шифра, поэтому может выполняться в дочернем процессе.
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param iv: bytes, синхропосылка длиной 8 байт
+    :param start: int, номер первого блока гаммы
+    :param count: int, количество блоков гаммы
+    :return: bytes, гамма длиной 16 * count байт
+    """
+
+    if batch.is_available() and count >= batch.BATCH_THRESHOLD:
+        np = batch.np
+        counters = np.empty((count, 16), dtype=np.uint8)
+        counters[:, :8] = np.frombuffer(iv, dtype=np.uint8)
+        counters[:, 8:] = np.arange(start, start + count, dtype='>u8').view(np.uint8).reshape(-1, 8)
+        return batch.batch_encryption(blocks=counters, keys=batch.keys_to_array(keys=keys)).tobytes()
+    base = int.from_bytes(iv, 'big') << 64
+    return b''.join(tables.table_encryption(block=base | i, keys=keys).to_bytes(16, 'big')
+                    for i in range(start, start + count))
+
+
+def xor_bytes(data: bytes, gamma: bytes) -> bytes:
+    """
+    Функция сложения по модулю 2 данных с гаммой.
+
+    :param data: bytes-like объект, данные
+    :param gamma: bytes-like объект, гамма длиной не меньше длины данных
+    :return: bytes, результат сложения той же длины, что и данные
+    """
+
+    length = len(data)
+    result = int.from_bytes(data, 'big') ^ int.from_bytes(gamma[:length], 'big')
+    return result.to_bytes(length, 'big')
+
+
+class KeystreamReservoir:
+    """
+    Класс резервуара заранее выработанной гаммы.
+
+    """
+
+    def __init__(self, keys: List[int], iv: Optional[bytes] = None,
+                 low_watermark: int = RESERVOIR_LOW_WATERMARK, high_watermark: int = RESERVOIR_HIGH_WATERMARK):
+        if low_watermark > high_watermark:
+            raise ValueError
+        self.keys = keys
+        self.iv = iv or os.urandom(CTR_IV_SIZE)
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.buffer = bytearray()
+        self.buffer_start = 0
+        self.hits = 0
+        self.misses = 0
+        self.is_closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self) -> None:
+        """
+        Метод запуска фонового потока пополнения резервуара.
+
+        :return: None
+        """
+
+        self.thread.start()
+
+    def close(self) -> None:
+        """
+        Метод остановки фонового потока и очистки резервуара.
+
+        :return: None
+        """
+
+        with self.condition:
+            self.is_closed = True
+            self.buffer = bytearray()
+            self.condition.notify_all()
+
+    def run(self) -> None:
+        """
+        Метод фонового потока пополнения резервуара.
+
+        Ожидает, пока объём гаммы не опустится ниже нижней границы,
+        после чего небольшими порциями вырабатывает гамму до верхней границы.
+        Номер первого блока порции фиксируется до выработки: если за это время
+        отправитель забрал гамму в обход резервуара, порция отбрасывается и счётчики не повторяются.
+
+        :return: None
+        """
+
+        while True:
+            with self.condition:
+                while not self.is_closed and len(self.buffer) >= self.low_watermark:
+                    self.condition.wait()
+                if self.is_closed:
+                    return
+                start = self.buffer_start + len(self.buffer) // 16
+            while True:
+                chunk = generate_keystream(keys=self.keys, iv=self.iv, start=start, count=RESERVOIR_CHUNK_BLOCKS)
+                with self.condition:
+                    if self.is_closed:
+                        return
+                    if self.buffer_start + len(self.buffer) // 16 != start:
+                        break
+                    self.buffer += chunk
+                    if len(self.buffer) >= self.high_watermark:
+                        break
+                    start += RESERVOIR_CHUNK_BLOCKS
+
+    def take(self, length: int, generate: Optional[Callable[..., bytes]] = None) -> Tuple[int, bytes]:
+        """
+        Метод получения гаммы для очередного сообщения.
+
+        Если в резервуаре достаточно гаммы – она забирается целиком из буфера (попадание),
+        иначе недостающая часть вырабатывается в вызывающем потоке (промах): функцией generate,
+        если она задана (например, CTRMode.keystream, распараллеливающий длинную гамму), иначе синхронно.
+
+        :param length: int, длина сообщения в байтах
+        :param generate: callable, функция выработки гаммы с аргументами iv, length и start
+        :return: tuple, (номер первого блока гаммы, гамма)
+        """
+
+        size = -(-length // 16) * 16
+        with self.condition:
+            start = self.buffer_start
+            if len(self.buffer) >= size:
+                self.hits += 1
+                gamma = bytes(self.buffer[:size])
+                del self.buffer[:size]
+                self.buffer_start += size // 16
+                if len(self.buffer) < self.low_watermark:
+                    self.condition.notify()
+                return start, gamma
+            self.misses += 1
+            gamma = bytes(self.buffer)
+            extra_start = self.buffer_start + len(self.buffer) // 16
+            extra_count = (size - len(gamma)) // 16
+            self.buffer = bytearray()
+            self.buffer_start = extra_start + extra_count
+            self.condition.notify()
+        if generate is not None:
+            return start, gamma + generate(iv=self.iv, length=16 * extra_count, start=extra_start)
+        return start, gamma + generate_keystream(keys=self.keys, iv=self.iv, start=extra_start, count=extra_count)
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Метод получения статистики резервуара.
+
+        :return: dict, количество попаданий, промахов и текущий объём гаммы в байтах
+        """
+
+        with self.condition:
+            return {'hits': self.hits, 'misses': self.misses, 'buffered': len(self.buffer)}
+
+
+class CTRMode:
+    """
+    Класс режима гаммирования (CTR) по ГОСТ 34.13-2018 поверх шифра ГОСТ 34.12-2018.
+
+    """
+
+    def __init__(self, cipher: GOST34122018, workers: Optional[int] = None,
+                 parallel_threshold: int = CTR_PARALLEL_THRESHOLD):
+        self.cipher = cipher
+        self.workers = workers or os.cpu_count() or 1
+        self.parallel_threshold = parallel_threshold
+        self.reservoir = None
+
+    def enable_prefetch(self, low_watermark: int = RESERVOIR_LOW_WATERMARK,
+                        high_watermark: int = RESERVOIR_HIGH_WATERMARK) -> KeystreamReservoir:
+        """
+        Метод включения фоновой выработки гаммы для отправляемых сообщений.
+
+        :param low_watermark: int, объём гаммы в байтах, ниже которого резервуар пополняется
+        :param high_watermark: int, объём гаммы в байтах, до которого резервуар пополняется
+        :return: KeystreamReservoir, запущенный резервуар гаммы
+        """
+
+        self.disable_prefetch()
+        self.reservoir = KeystreamReservoir(keys=self.cipher.int_round_keys,
+                                            low_watermark=low_watermark, high_watermark=high_watermark)
+        self.reservoir.start()
+        return self.reservoir
+
+    def disable_prefetch(self) -> None:
+        """
+        Метод отключения фоновой выработки гаммы.
+
+        :return: None
+        """
+
+        if self.reservoir:
+            self.reservoir.close()
+            self.reservoir = None
+
+    def keystream(self, iv: bytes, length: int, start: int = 0) -> bytes:
+        """
+        Метод выработки гаммы заданной длины.
+
+        Если длина гаммы не меньше порога распараллеливания, выработка разбивается
+        на непрерывные диапазоны счётчиков, которые обрабатываются в пуле процессов.
+
+        :param iv: bytes, синхропосылка длиной 8 байт
+        :param length: int, длина гаммы в байтах
+        :param start: int, номер первого блока гаммы
+        :return: bytes, гамма длиной не меньше length байт (кратной 16)
+        """
+
+        if len(iv) != CTR_IV_SIZE:
+            raise ValueError
+        count = -(-length // 16)
+        keys = self.cipher.int_round_keys
+        if self.workers < 2 or length < self.parallel_threshold:
+            return generate_keystream(keys=keys, iv=iv, start=start, count=count)
+        chunk = max(-(-count // self.workers), CTR_MIN_CHUNK_BLOCKS)
+        pool = get_process_pool(workers=self.workers)
+        futures = [pool.submit(generate_keystream, keys, iv, start + i, min(chunk, count - i))
+                   for i in range(0, count, chunk)]
+        return b''.join(future.result() for future in futures)
+
+    def encryptor(self, iv: bytes, start: int = 0) -> streaming.CTRContext:
+        """
+        Метод создания потокового контекста зашифрования.
+
+        :param iv: bytes, синхропосылка длиной 8 байт
+        :param start: int, номер первого блока гаммы
+        :return: CTRContext, контекст с методами update/update_into/finalize
+        """
+
+        if len(iv) != CTR_IV_SIZE:
+            raise ValueError
+        return streaming.CTRContext(mode=self, iv=iv, start=start)
+
+    def decryptor(self, iv: bytes, start: int = 0) -> streaming.CTRContext:
+        """
+        Метод создания потокового контекста расшифрования.
+
+        В режиме гаммирования совпадает с контекстом зашифрования.
+
+        :param iv: bytes, синхропосылка длиной 8 байт
+        :param start: int, номер первого блока гаммы
+        :return: CTRContext, контекст с методами update/update_into/finalize
+        """
+
+        return self.encryptor(iv=iv, start=start)
+
+    def transform(self, data: bytes, iv: bytes, start: int = 0) -> bytes:
+        """
+        Метод зашифрования/расшифрования данных в режиме гаммирования.
+
+        Данные складываются по модулю 2 с гаммой, поэтому дополнение последнего блока не требуется,
+        а зашифрование и расшифрование совпадают.
+
+        :param data: bytes-like объект, открытый текст или шифротекст
+        :param iv: bytes, синхропосылка длиной 8 байт
+        :param start: int, номер первого блока гаммы
+        :return: bytes, результат преобразования той же длины, что и данные
+        """
+
+        if len(data) == 0:
+            return b''
+        return xor_bytes(data=data, gamma=self.keystream(iv=iv, length=len(data), start=start))
+
+    def encrypt(self, data: bytes) -> bytes:
+        """
+        Метод зашифрования сообщения.
+
+        При включённой фоновой выработке гамма берётся из резервуара сессии (недостающая часть
+        длинного сообщения вырабатывается в пуле процессов, как и без резервуара),
+        иначе используется случайная синхропосылка и счётчик с нуля.
+
+        :param data: bytes-like объект, открытый текст
+        :return: bytes, заголовок (синхропосылка и номер первого блока гаммы), за которым следует шифротекст
+        """
+
+        if self.reservoir:
+            iv = self.reservoir.iv
+            start, gamma = self.reservoir.take(length=len(data), generate=self.keystream)
+            cipher_text = xor_bytes(data=data, gamma=gamma) if len(data) else b''
+        else:
+            iv, start = os.urandom(CTR_IV_SIZE), 0
+            cipher_text = self.transform(data=data, iv=iv)
+        return iv + start.to_bytes(CTR_HEADER_SIZE - CTR_IV_SIZE, 'big') + cipher_text
+
+    def decrypt(self, data: bytes) -> bytes:
+        """
+        Метод расшифрования сообщения, начинающегося с заголовка.
+
+        :param data: bytes-like объект, заголовок (синхропосылка и номер первого блока гаммы) и шифротекст
+        :return: bytes, открытый текст
+        """
+
+        if len(data) < CTR_HEADER_SIZE:
+            raise ValueError
+        data = memoryview(data)
+        return self.transform(data=data[CTR_HEADER_SIZE:],
+                              iv=bytes(data[:CTR_IV_SIZE]),
+                              start=int.from_bytes(data[CTR_IV_SIZE:CTR_HEADER_SIZE], 'big'))
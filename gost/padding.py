@@ -0,0 +1,53 @@
+BLOCK_SIZE = 16
+PADDING_MARKER = b'\x80'
+
+
+def padded_size(length: int, block_size: int = BLOCK_SIZE) -> int:
+    """
+    Функция вычисления длины сообщения после дополнения.
+
+    :param length: int, длина исходного сообщения
+    :param block_size: int, длина блока
+    :return: int, длина дополненного сообщения (всегда больше исходной)
+    """
+
+    return length + block_size - length % block_size
+
+
+def pad(data, block_size: int = BLOCK_SIZE) -> bytes:
+    """
+    Функция дополнения сообщения по процедуре 2 ГОСТ 34.13-2018.
+
+    К сообщению приписывается единичный бит (байт 0x80) и нули до длины, кратной длине блока.
+    Дополнение выполняется всегда, поэтому сообщение любой длины (в том числе пустое
+    или начинающееся с нулевых байтов) однозначно восстанавливается.
+
+    :param data: bytes-like объект, исходное сообщение
+    :param block_size: int, длина блока
+    :return: bytes, дополненное сообщение
+    """
+
+    data = memoryview(data).cast('B')
+    return b''.join([data, PADDING_MARKER, bytes(padded_size(length=len(data), block_size=block_size) - len(data) - 1)])
+
+
+def unpad(data, block_size: int = BLOCK_SIZE) -> memoryview:
+    """
+    Функция удаления дополнения, выполненного по процедуре 2 ГОСТ 34.13-2018.
+
+    Просматривается только последний блок, поэтому время работы не зависит от длины сообщения.
+    Результат возвращается без копирования данных.
+
+    :param data: bytes-like объект, дополненное сообщение
+    :param block_size: int, длина блока
+    :return: memoryview, исходное сообщение
+    """
+
+    data = memoryview(data).cast('B')
+    if not data or len(data) % block_size:
+        raise ValueError
+    tail = bytes(data[-block_size:])
+    index = tail.rfind(PADDING_MARKER)
+    if index < 0 or tail.count(0, index + 1) != block_size - index - 1:
+        raise ValueError
+    return data[:len(data) - block_size + index]
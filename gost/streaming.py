@@ -0,0 +1,171 @@
+STREAM_CHUNK = 64 * 1024
+
+
+class CipherContext:
+    """
+    Класс потокового контекста шифрования/дешифрования в режиме простой замены.
+
+    """
+
+    def __init__(self, cipher, flag: str):
+        cipher.get_transformation_params(flag=flag)
+        self.cipher = cipher
+        self.flag = flag
+        self.buffer = bytearray()
+        self.is_finalized = False
+
+    def output_size(self, length: int) -> int:
+        """
+        Метод вычисления размера результата очередного вызова update.
+
+        :param length: int, длина очередной порции данных
+        :return: int, количество байтов, которое будет записано
+        """
+
+        total = len(self.buffer) + length
+        return total - total % 16
+
+    def update(self, data) -> bytes:
+        """
+        Метод обработки очередной порции данных.
+
+        Неполный последний блок сохраняется до следующего вызова.
+
+        :param data: bytes-like объект, очередная порция данных произвольной длины
+        :return: bytes, результат преобразования всех накопленных полных блоков
+        """
+
+        result = bytearray(self.output_size(length=memoryview(data).nbytes))
+        self.update_into(data=data, buffer=result)
+        return bytes(result)
+
+    def update_into(self, data, buffer) -> int:
+        """
+        Метод обработки очередной порции данных с записью результата в буфер вызывающей стороны.
+
+        Данные обрабатываются частями не более STREAM_CHUNK байт,
+        поэтому объём промежуточной памяти не зависит от длины сообщения.
+
+        :param data: bytes-like объект, очередная порция данных произвольной длины
+        :param buffer: изменяемый bytes-like объект длиной не меньше output_size(len(data))
+        :return: int, количество записанных в буфер байтов
+        """
+
+        if self.is_finalized:
+            raise ValueError
+        data = memoryview(data).cast('B')
+        out = memoryview(buffer).cast('B')
+        if len(out) < self.output_size(length=len(data)):
+            raise ValueError
+        written = 0
+        if self.buffer:
+            need = 16 - len(self.buffer)
+            if len(data) < need:
+                self.buffer += data
+                return 0
+            self.buffer += data[:need]
+            out[:16] = self.cipher.blocks_prehandling(data=self.buffer, flag=self.flag)
+            self.buffer.clear()
+            data = data[need:]
+            written = 16
+        body = len(data) - len(data) % 16
+        for start in range(0, body, STREAM_CHUNK):
+            end = min(start + STREAM_CHUNK, body)
+            out[written:written + end - start] = self.cipher.blocks_prehandling(data=data[start:end], flag=self.flag)
+            written += end - start
+        self.buffer += data[body:]
+        return written
+
+    def finalize(self) -> bytes:
+        """
+        Метод завершения обработки.
+
+        В режиме простой замены длина всех данных должна быть кратна длине блока.
+
+        :return: bytes, пустая строка байтов (все блоки уже выданы методом update)
+        """
+
+        if self.is_finalized or self.buffer:
+            raise ValueError
+        self.is_finalized = True
+        return b''
+
+
+class CTRContext:
+    """
+    Класс потокового контекста зашифрования/расшифрования в режиме гаммирования.
+
+    """
+
+    def __init__(self, mode, iv: bytes, start: int = 0):
+        self.mode = mode
+        self.iv = iv
+        self.next_block = start
+        self.gamma = b''
+        self.is_finalized = False
+
+    def output_size(self, length: int) -> int:
+        """
+        Метод вычисления размера результата очередного вызова update.
+
+        :param length: int, длина очередной порции данных
+        :return: int, количество байтов, которое будет записано
+        """
+
+        return length
+
+    def update(self, data) -> bytes:
+        """
+        Метод обработки очередной порции данных.
+
+        :param data: bytes-like объект, очередная порция данных произвольной длины
+        :return: bytes, результат преобразования той же длины
+        """
+
+        result = bytearray(memoryview(data).nbytes)
+        self.update_into(data=data, buffer=result)
+        return bytes(result)
+
+    def update_into(self, data, buffer) -> int:
+        """
+        Метод обработки очередной порции данных с записью результата в буфер вызывающей стороны.
+
+        Гамма для всей порции вырабатывается одним вызовом mode.keystream, поэтому порции
+        не короче порога распараллеливания обрабатываются в пуле процессов;
+        неиспользованный остаток гаммы последнего блока сохраняется до следующего вызова.
+
+        :param data: bytes-like объект, очередная порция данных произвольной длины
+        :param buffer: изменяемый bytes-like объект длиной не меньше длины данных
+        :return: int, количество записанных в буфер байтов
+        """
+
+        if self.is_finalized:
+            raise ValueError
+        data = memoryview(data).cast('B')
+        out = memoryview(buffer).cast('B')
+        if len(out) < len(data):
+            raise ValueError
+        if len(self.gamma) < len(data):
+            count = -(-(len(data) - len(self.gamma)) // 16)
+            self.gamma += self.mode.keystream(iv=self.iv, length=16 * count, start=self.next_block)
+            self.next_block += count
+        gamma = memoryview(self.gamma)
+        for start in range(0, len(data), STREAM_CHUNK):
+            chunk = data[start:start + STREAM_CHUNK]
+            result = int.from_bytes(chunk, 'big') ^ int.from_bytes(gamma[start:start + len(chunk)], 'big')
+            out[start:start + len(chunk)] = result.to_bytes(len(chunk), 'big')
+        self.gamma = bytes(gamma[len(data):])
+        return len(data)
+
+    def finalize(self) -> bytes:
+        """
+        Метод завершения обработки.
+
+        :return: bytes, пустая строка байтов (режим гаммирования не требует дополнения)
+        """
+
+        if self.is_finalized:
+            raise ValueError
+        self.is_finalized = True
+        self.gamma = b''
+        return b''
@@ -0,0 +1,163 @@
+from functools import lru_cache
+from typing import List, Tuple
+from gost import consts
+import gost.utils as utils
+
+
+def _linear_tables(inverse: bool = False) -> Tuple[Tuple[int, ...], ...]:
+    """
+    Функция построения таблиц линейного преобразования для каждой позиции байта блока.
+
+    Линейное преобразование линейно над GF(2), поэтому вычисляется только для базисных
+    значений (по одному установленному биту), остальные элементы таблиц получаются их сложением по модулю 2.
+
+    :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
+    :return: tuple, 16 таблиц по 256 значений 128-битных блоков
+    """
+
+    result = []
+    for i in range(16):
+        basis = []
+        for bit in range(8):
+            block = [0] * 16
+            block[i] = 1 << bit
+            basis.append(int.from_bytes(bytes(utils.linear_transform(x_list=block, inverse=inverse)), 'big'))
+        table = [0] * 256
+        for value in range(1, 256):
+            low_bit = value & -value
+            table[value] = table[value ^ low_bit] ^ basis[low_bit.bit_length() - 1]
+        result.append(tuple(table))
+    return tuple(result)
+
+
+@lru_cache(maxsize=None)
+def get_encryption_tables() -> Tuple[Tuple[int, ...], ...]:
+    """
+    Функция получения таблиц совмещённого преобразования LS для шифрования.
+
+    Элемент таблицы [i][x] равен результату линейного преобразования блока,
+    в котором на позиции i стоит значение нелинейного преобразования x, а остальные байты нулевые.
+    Таблицы вычисляются один раз при первом обращении.
+
+    :return: tuple, 16 таблиц по 256 значений 128-битных блоков
+    """
+
+    linear_tables = _linear_tables()
+    sbox = consts.NONLINEAR_CONSTS
+    return tuple(tuple(table[sbox[x]] for x in range(256)) for table in linear_tables)
+
+
+@lru_cache(maxsize=None)
+def get_decryption_tables() -> Tuple[Tuple[Tuple[int, ...], ...], ...]:
+    """
+    Функция получения таблиц для дешифрования.
+
+    Возвращает три набора таблиц:
+    таблицы обратного линейного преобразования L^-1,
+    таблицы совмещённого преобразования L^-1 S^-1
+    и таблицы обратного нелинейного преобразования S^-1 со сдвигом на позицию байта.
+    Таблицы вычисляются один раз при первом обращении.
+
+    :return: tuple, (таблицы L^-1, таблицы L^-1 S^-1, таблицы S^-1)
+    """
+
+    linear_tables = _linear_tables(inverse=True)
+    inv_sbox = consts.INVERSE_NONLINEAR_CONSTS
+    combined_tables = tuple(tuple(table[inv_sbox[x]] for x in range(256)) for table in linear_tables)
+    substitution_tables = tuple(tuple(inv_sbox[x] << (8 * (15 - i)) for x in range(256)) for i in range(16))
+    return linear_tables, combined_tables, substitution_tables
+
+
+def get_inverse_round_keys(keys: List[int]) -> List[int]:
+    """
+    Функция формирования раундовых ключей для табличного дешифрования.
+
+    При дешифровании сложение с ключом переносится через линейное преобразование,
+    поэтому раундовые ключи K_2...K_9 заменяются на L^-1(K_i).
+
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: list, раундовые ключи для табличного дешифрования
+    """
+
+    return [keys[0]] + [
+        int.from_bytes(bytes(utils.linear_transform(x_list=list(key.to_bytes(16, 'big')), inverse=True)), 'big')
+        for key in keys[1:9]
+    ] + [keys[9]]
+
+
+def table_feistel_network(left: int, right: int, const_ind: int) -> Tuple[int, int]:
+    """
+    Функция табличной отработки ячейки сети Фейстеля при формировании раундовых ключей.
+
+    Преобразование LS над суммой ключа и итерационной константы выполняется
+    как 16 обращений к таблицам шифрования.
+
+    :param left: int, L-блок сети Фейстеля
+    :param right: int, R-блок сети Фейстеля
+    :param const_ind: int, индекс для текущей итерационной константы
+    :return: tuple, результирующая пара ключей (K(i)', K(i+1)')
+    """
+
+    t0, t1, t2, t3, t4, t5, t6, t7, t8, t9, t10, t11, t12, t13, t14, t15 = get_encryption_tables()
+    x = left ^ consts.ITER_CONSTS_INT[const_ind]
+    x = (t0[x >> 120] ^ t1[(x >> 112) & 255] ^ t2[(x >> 104) & 255] ^ t3[(x >> 96) & 255] ^
+         t4[(x >> 88) & 255] ^ t5[(x >> 80) & 255] ^ t6[(x >> 72) & 255] ^ t7[(x >> 64) & 255] ^
+         t8[(x >> 56) & 255] ^ t9[(x >> 48) & 255] ^ t10[(x >> 40) & 255] ^ t11[(x >> 32) & 255] ^
+         t12[(x >> 24) & 255] ^ t13[(x >> 16) & 255] ^ t14[(x >> 8) & 255] ^ t15[x & 255])
+    return x ^ right, left
+
+
+def table_encryption(block: int, keys: List[int]) -> int:
+    """
+    Функция табличного шифрования блока.
+
+    Каждый из первых девяти раундов выполняется как 16 обращений к таблицам и сложение по модулю 2.
+
+    :param block: int, блок открытого текста, представленный в виде 128-битного числа
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :return: int, блок шифротекста
+    """
+
+    t0, t1, t2, t3, t4, t5, t6, t7, t8, t9, t10, t11, t12, t13, t14, t15 = get_encryption_tables()
+    x = block
+    for i in range(9):
+        x ^= keys[i]
+        x = (t0[x >> 120] ^ t1[(x >> 112) & 255] ^ t2[(x >> 104) & 255] ^ t3[(x >> 96) & 255] ^
+             t4[(x >> 88) & 255] ^ t5[(x >> 80) & 255] ^ t6[(x >> 72) & 255] ^ t7[(x >> 64) & 255] ^
+             t8[(x >> 56) & 255] ^ t9[(x >> 48) & 255] ^ t10[(x >> 40) & 255] ^ t11[(x >> 32) & 255] ^
+             t12[(x >> 24) & 255] ^ t13[(x >> 16) & 255] ^ t14[(x >> 8) & 255] ^ t15[x & 255])
+    return x ^ keys[9]
+
+
+def table_decryption(block: int, inverse_keys: List[int]) -> int:
+    """
+    Функция табличного дешифрования блока.
+
+    Сначала выполняется обратное линейное преобразование блока, сложенного с ключом K_10,
+    затем восемь раундов совмещённого преобразования L^-1 S^-1 и последнее обратное нелинейное преобразование.
+
+    :param block: int, блок шифротекста, представленный в виде 128-битного числа
+    :param inverse_keys: list, раундовые ключи для табличного дешифрования
+    :return: int, блок открытого текста
+    """
+
+    linear_tables, combined_tables, substitution_tables = get_decryption_tables()
+    l0, l1, l2, l3, l4, l5, l6, l7, l8, l9, l10, l11, l12, l13, l14, l15 = linear_tables
+    t0, t1, t2, t3, t4, t5, t6, t7, t8, t9, t10, t11, t12, t13, t14, t15 = combined_tables
+    s0, s1, s2, s3, s4, s5, s6, s7, s8, s9, s10, s11, s12, s13, s14, s15 = substitution_tables
+    x = block ^ inverse_keys[9]
+    x = (l0[x >> 120] ^ l1[(x >> 112) & 255] ^ l2[(x >> 104) & 255] ^ l3[(x >> 96) & 255] ^
+         l4[(x >> 88) & 255] ^ l5[(x >> 80) & 255] ^ l6[(x >> 72) & 255] ^ l7[(x >> 64) & 255] ^
+         l8[(x >> 56) & 255] ^ l9[(x >> 48) & 255] ^ l10[(x >> 40) & 255] ^ l11[(x >> 32) & 255] ^
+         l12[(x >> 24) & 255] ^ l13[(x >> 16) & 255] ^ l14[(x >> 8) & 255] ^ l15[x & 255])
+    for i in range(8, 0, -1):
+        x = (t0[x >> 120] ^ t1[(x >> 112) & 255] ^ t2[(x >> 104) & 255] ^ t3[(x >> 96) & 255] ^
+             t4[(x >> 88) & 255] ^ t5[(x >> 80) & 255] ^ t6[(x >> 72) & 255] ^ t7[(x >> 64) & 255] ^
+             t8[(x >> 56) & 255] ^ t9[(x >> 48) & 255] ^ t10[(x >> 40) & 255] ^ t11[(x >> 32) & 255] ^
+             t12[(x >> 24) & 255] ^ t13[(x >> 16) & 255] ^ t14[(x >> 8) & 255] ^ t15[x & 255])
+        x ^= inverse_keys[i]
+    x = (s0[x >> 120] ^ s1[(x >> 112) & 255] ^ s2[(x >> 104) & 255] ^ s3[(x >> 96) & 255] ^
+         s4[(x >> 88) & 255] ^ s5[(x >> 80) & 255] ^ s6[(x >> 72) & 255] ^ s7[(x >> 64) & 255] ^
+         s8[(x >> 56) & 255] ^ s9[(x >> 48) & 255] ^ s10[(x >> 40) & 255] ^ s11[(x >> 32) & 255] ^
+         s12[(x >> 24) & 255] ^ s13[(x >> 16) & 255] ^ s14[(x >> 8) & 255] ^ s15[x & 255])
+    return x ^ inverse_keys[0]
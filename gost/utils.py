@@ -1,21 +1,20 @@
-from typing import List
+from typing import List, Union
 from gost import consts
+from gost import padding
 
 
 def data_splitting(data: str) -> List[list]:
     """
     Функция "конвертации" сообщения из строки в блоки данных.
 
+    Сообщение дополняется по процедуре 2 ГОСТ 34.13-2018 (см. gost.padding).
+
     :param data: str, текст отправляемого сообщения
     :return: list, сообщение, представленное в виде блоков
     """
 
-    int_list_msg = list(data.encode(encoding='utf-8'))
-    remain = len(int_list_msg) % 16
-    data_blocks = [[0] * (16 - remain) + int_list_msg[:remain]]
-    for i in range(remain, len(int_list_msg[remain:]), 16):
-        data_blocks.append(int_list_msg[i:i + 16])
-    return data_blocks
+    padded = padding.pad(data=data.encode(encoding='utf-8'))
+    return [list(padded[i:i + 16]) for i in range(0, len(padded), 16)]
 
 
 def xor_transform(a: List[int], b: List[int]) -> List[int]:
@@ -47,23 +46,21 @@ def linear_transform(x_list: List[int], inverse: bool = False) -> List[int]:
     """
     Функция линейного преобразования в поле Галуа GF(2^8).
 
+    Умножение на линейные константы выполняется по предвычисленным таблицам произведений.
+
     :param x_list: list, входной блок данных
     :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
     :return: list, результирующий блок
     """
 
-    galois_cs = consts.GALOIS_FIELD_CONSTS
-    linear_cs = consts.LINEAR_CONSTS
+    mul_tables = consts.LINEAR_MUL_TABLES
     result_list = x_list[:]
-    for i in range(len(result_list)):
+    for _ in range(len(result_list)):
         xor_sum = 0
         if inverse:
             result_list.append(result_list.pop(0))
         for j in range(len(result_list)):
-            if result_list[j] != 0:
-                x_power = galois_cs.index(result_list[j])
-                const_power = galois_cs.index(linear_cs[j])
-                xor_sum ^= galois_cs[(x_power + const_power) % 255]
+            xor_sum ^= mul_tables[j][result_list[j]]
         if inverse:
             result_list[-1] = xor_sum
         else:
@@ -115,3 +112,94 @@ def cryptographic_transformation(msg: List[int], keys: List[list], in_range: ran
         result = func_list[1](x_list=result, inverse=inverse)
     result = xor_transform(a=result, b=keys[last_ind])
     return result
+
+
+def block_to_int(block: Union[List[int], bytes]) -> int:
+    """
+    Функция перевода блока данных из списка байтов (или bytes) в число.
+
+    Первый байт блока является старшим разрядом числа.
+
+    :param block: list или bytes, блок данных
+    :return: int, блок, представленный в виде числа
+    """
+
+    return int.from_bytes(bytes(block), 'big')
+
+
+def int_to_block(x: int, length: int = 16) -> List[int]:
+    """
+    Функция перевода блока данных из числа в список байтов.
+
+    :param x: int, блок, представленный в виде числа
+    :param length: int, длина блока в байтах
+    :return: list, блок данных
+    """
+
+    return list(x.to_bytes(length, 'big'))
+
+
+def nonlinear_transform_int(x: int, inverse: bool = False) -> int:
+    """
+    Функция нелинейного биективного преобразования блока, представленного в виде 128-битного числа.
+
+    :param x: int, входной блок данных
+    :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
+    :return: int, результирующий блок
+    """
+
+    _consts = consts.INVERSE_NONLINEAR_BYTES if inverse else consts.NONLINEAR_BYTES
+    return int.from_bytes(x.to_bytes(16, 'big').translate(_consts), 'big')
+
+
+def linear_transform_int(x: int, inverse: bool = False) -> int:
+    """
+    Функция линейного преобразования в поле Галуа GF(2^8) блока, представленного в виде 128-битного числа.
+
+    Каждый шаг R (R^-1) выполняется сдвигом числа на один байт
+    с записью результата функции l в освободившийся байт.
+
+    :param x: int, входной блок данных
+    :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
+    :return: int, результирующий блок
+    """
+
+    m0, m1, m2, m3, m4, m5, m6, m7, m8, m9, m10, m11, m12, m13, m14, m15 = consts.LINEAR_MUL_TABLES
+    mask = consts.BLOCK_MASK
+    for _ in range(16):
+        if inverse:
+            x = ((x << 8) & mask) | (x >> 120)
+        xor_sum = (m0[x >> 120] ^ m1[(x >> 112) & 255] ^ m2[(x >> 104) & 255] ^ m3[(x >> 96) & 255] ^
+                   m4[(x >> 88) & 255] ^ m5[(x >> 80) & 255] ^ m6[(x >> 72) & 255] ^ m7[(x >> 64) & 255] ^
+                   m8[(x >> 56) & 255] ^ m9[(x >> 48) & 255] ^ m10[(x >> 40) & 255] ^ m11[(x >> 32) & 255] ^
+                   m12[(x >> 24) & 255] ^ m13[(x >> 16) & 255] ^ m14[(x >> 8) & 255] ^ m15[x & 255])
+        if inverse:
+            x = (x & ~255) | xor_sum
+        else:
+            x = (xor_sum << 120) | (x >> 8)
+    return x
+
+
+def cryptographic_transformation_int(msg: int, keys: List[int], in_range: range,
+                                     last_ind: int, inverse: bool = False) -> int:
+    """
+    Функция криптографического преобразования блока, представленного в виде 128-битного числа.
+
+    Выполняет шифрование/дешифрование блока без создания промежуточных списков.
+
+    :param msg: int, блок сообщения
+    :param keys: list, раундовые ключи, представленные в виде 128-битных чисел
+    :param in_range: range, диапазон индексов для раундовых ключей
+    :param last_ind: int, индекс раундового ключа для 10 раунда
+    :param inverse: bool, флаг, указывающий, является ли преобразование обратным (при дешифровании)
+    :return: int, результирующий блок
+    """
+
+    result = msg
+    for i in in_range:
+        result ^= keys[i]
+        if inverse:
+            result = nonlinear_transform_int(x=linear_transform_int(x=result, inverse=True), inverse=True)
+        else:
+            result = linear_transform_int(x=nonlinear_transform_int(x=result))
+    return result ^ keys[last_ind]
@@ -1,7 +1,9 @@
 from app.chat_app import KuznechikChatApp
+import multiprocessing
 import sys
 
 
 if __name__ == '__main__':
-    app = KuznechikChatApp(sys.argv)
+    multiprocessing.freeze_support()
+    app = KuznechikChatApp(sys.argv, use_asyncio='--asyncio' in sys.argv)
     sys.exit(app.exec_())
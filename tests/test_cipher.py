@@ -0,0 +1,111 @@
+import pytest
+import gost.conformance as conformance
+import gost.engines as engines
+from gost.crypto import GOST34122018
+from gost.mgm import MGMAuthenticationError, MGMMode
+from gost.modes import CTRMode
+
+
+# Контрольный пример режима MGM (Р 1323565.1.026-2019, приложение А)
+MGM_KEY = bytes.fromhex('8899aabbccddeeff0011223344556677fedcba98765432100123456789abcdef')
+MGM_NONCE = bytes.fromhex('1122334455667700ffeeddccbbaa9988')
+MGM_ASSOCIATED_DATA = bytes.fromhex('02020202020202020101010101010101'
+                                    '04040404040404040303030303030303'
+                                    'ea0505050505050505')
+MGM_PLAIN_TEXT = bytes.fromhex('1122334455667700ffeeddccbbaa9988'
+                               '00112233445566778899aabbcceeff0a'
+                               '112233445566778899aabbcceeff0a00'
+                               '2233445566778899aabbcceeff0a0011'
+                               'aabbcc')
+MGM_CIPHER_TEXT = bytes.fromhex('a9757b8147956e9055b8a33de89f42fc'
+                                '8075d2212bf9fd5bd3f7069aadc16b39'
+                                '497ab15915a6ba85936b5d0ea9f6851c'
+                                'c60c14d4d3f883d0ab94420695c76deb'
+                                '2c7552')
+MGM_TAG = bytes.fromhex('cf5d656f40c34f5c46e8bb0e29fcdb4c')
+
+
+@pytest.fixture
+def mgm():
+    """
+    Режим MGM на ключе контрольного примера.
+
+    """
+
+    return MGMMode(cipher=GOST34122018(master_key=list(MGM_KEY), use_cache=False))
+
+
+@pytest.mark.parametrize('engine', engines.get_engine_names())
+def test_known_answers(engine):
+    """
+    Развёртывание ключа, шифрование и дешифрование контрольного блока ГОСТ 34.12-2018 каждым движком.
+
+    """
+
+    assert conformance.check_known_answers(engine=engine) == []
+
+
+def test_engines_match_reference():
+    """
+    Все движки совпадают с эталонной реализацией на случайных ключах и блоках.
+
+    """
+
+    assert conformance.check_differential(engine_names=engines.get_engine_names(), keys=2, blocks=8, seed=1) == []
+
+
+def test_mgm_known_answer(mgm):
+    """
+    Шифрование и дешифрование контрольного примера MGM.
+
+    """
+
+    assert mgm.encrypt(nonce=MGM_NONCE, data=MGM_PLAIN_TEXT, associated_data=MGM_ASSOCIATED_DATA) == \
+        (MGM_CIPHER_TEXT, MGM_TAG)
+    assert mgm.decrypt(nonce=MGM_NONCE, data=MGM_CIPHER_TEXT, tag=MGM_TAG,
+                       associated_data=MGM_ASSOCIATED_DATA) == MGM_PLAIN_TEXT
+
+
+@pytest.mark.parametrize('field, index', [('cipher_text', 0), ('cipher_text', 66), ('tag', 15),
+                                          ('associated_data', 40), ('nonce', 15)])
+def test_mgm_tamper_rejected(mgm, field, index):
+    """
+    Изменение одного бита шифротекста, имитовставки, ассоциированных данных или уникального значения отклоняется.
+
+    """
+
+    values = {'cipher_text': bytearray(MGM_CIPHER_TEXT), 'tag': bytearray(MGM_TAG),
+              'associated_data': bytearray(MGM_ASSOCIATED_DATA), 'nonce': bytearray(MGM_NONCE)}
+    values[field][index] ^= 1
+    with pytest.raises(MGMAuthenticationError):
+        mgm.decrypt(nonce=bytes(values['nonce']), data=bytes(values['cipher_text']), tag=bytes(values['tag']),
+                    associated_data=bytes(values['associated_data']))
+
+
+def test_mgm_sealed_message(mgm):
+    """
+    Сообщение, полученное методом seal, открывается только с теми же ассоциированными данными.
+
+    """
+
+    sealed = mgm.seal(data=b'message', associated_data=b'client\x00')
+    assert mgm.open(data=sealed, associated_data=b'client\x00') == b'message'
+    with pytest.raises(MGMAuthenticationError):
+        mgm.open(data=sealed, associated_data=b'client\x01')
+    with pytest.raises(MGMAuthenticationError):
+        mgm.open(data=sealed[:-1])
+
+
+def test_ctr_streaming_matches_whole_message():
+    """
+    Потоковый контекст режима гаммирования совпадает с шифрованием сообщения целиком.
+
+    """
+
+    mode = CTRMode(cipher=GOST34122018(master_key=list(MGM_KEY), use_cache=False))
+    data = bytes(range(256)) * 20 + b'tail'
+    iv = bytes(8)
+    context = mode.encryptor(iv=iv)
+    streamed = b''.join(context.update(data=data[start:start + 1000]) for start in range(0, len(data), 1000))
+    assert streamed == mode.transform(data=data, iv=iv)
+    assert mode.decryptor(iv=iv).update(data=streamed) == data
@@ -0,0 +1,73 @@
+import pytest
+from app import framing
+
+
+def test_frames_round_trip():
+    """
+    Несколько кадров, записанных одной порцией, разделяются декодером.
+
+    """
+
+    frames = [framing.Frame(type=framing.KEY_FRAME, flags=0, payload=b'open key'),
+              framing.Frame(type=framing.MESSAGE_FRAME, flags=framing.COMPRESSED_FLAG, payload=b''),
+              framing.Frame(type=framing.MESSAGE_FRAME, flags=0, payload=bytes(range(256)) * 10)]
+    decoder = framing.FrameDecoder()
+    assert decoder.feed(data=framing.encode_frames(frames=frames)) == frames
+    assert decoder.pending() == 0
+
+
+def test_torn_frames_byte_by_byte():
+    """
+    Кадры, приходящие по одному байту, собираются целиком и только после получения последнего байта.
+
+    """
+
+    frames = [framing.Frame(type=framing.MESSAGE_FRAME, flags=0, payload=b'first'),
+              framing.Frame(type=framing.MESSAGE_FRAME, flags=0, payload=b'second message')]
+    data = framing.encode_frames(frames=frames)
+    decoder = framing.FrameDecoder()
+    received = []
+    for i in range(len(data)):
+        received.extend(decoder.feed(data=data[i:i + 1]))
+        if i < framing.HEADER_SIZE + len(b'first') - 1:
+            assert not received
+    assert received == frames
+    assert decoder.pending() == 0
+
+
+def test_truncated_frame_stays_pending():
+    """
+    Неполный кадр не выдаётся и ожидает продолжения.
+
+    """
+
+    data = framing.encode_frame(frame_type=framing.MESSAGE_FRAME, payload=b'x' * 100)
+    decoder = framing.FrameDecoder()
+    assert decoder.feed(data=data[:framing.HEADER_SIZE - 1]) == []
+    assert decoder.feed(data=data[framing.HEADER_SIZE - 1:-1]) == []
+    assert decoder.pending() == len(data) - 1
+    assert decoder.feed(data=data[-1:]) == [framing.Frame(type=framing.MESSAGE_FRAME, flags=0, payload=b'x' * 100)]
+
+
+def test_oversized_frame_rejected_by_decoder():
+    """
+    Заголовок с длиной больше max_size отклоняется до получения полезной нагрузки.
+
+    """
+
+    decoder = framing.FrameDecoder(max_size=1024)
+    with pytest.raises(framing.FrameError):
+        decoder.feed(data=framing.FRAME_HEADER.pack(framing.MESSAGE_FRAME, 0, 1025))
+    assert framing.FrameDecoder(max_size=1024).feed(
+        data=framing.encode_frame(frame_type=framing.MESSAGE_FRAME, payload=bytes(1024))
+    )[0].payload == bytes(1024)
+
+
+def test_oversized_frame_rejected_by_encoder():
+    """
+    Полезная нагрузка длиннее MAX_FRAME_SIZE не кадрируется.
+
+    """
+
+    with pytest.raises(framing.FrameError):
+        framing.encode_frame(frame_type=framing.MESSAGE_FRAME, payload=bytes(framing.MAX_FRAME_SIZE + 1))
@@ -0,0 +1,165 @@
+import os
+import pytest
+from app.history import INDEX_ENTRY, INDEX_ENTRY_SIZE, HistoryLog
+from app.message_store import StoredMessage
+from gost.mgm import MGMAuthenticationError
+
+
+KEY = bytes(range(32))
+MESSAGES = [StoredMessage(sender=i % 2, text=f'сообщение {i}', timestamp=1000.0 + i) for i in range(10)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    """
+    Путь истории с записанными сообщениями MESSAGES.
+
+    """
+
+    path = str(tmp_path / 'peer')
+    history = HistoryLog(path=path, key=KEY)
+    for message in MESSAGES:
+        history.append(message=message)
+    history.close()
+    return path
+
+
+def truncate(file_path: str, size: int) -> None:
+    """
+    Обрезка файла до указанной длины (имитация аварийного завершения).
+
+    """
+
+    with open(file_path, 'r+b') as file:
+        file.truncate(size)
+
+
+def patch(file_path: str, offset: int, data: bytes) -> None:
+    """
+    Запись данных в файл по смещению (имитация подмены).
+
+    """
+
+    with open(file_path, 'r+b') as file:
+        file.seek(offset)
+        file.write(data)
+
+
+def test_reopen(path):
+    """
+    После повторного открытия все сообщения читаются, поиск по времени работает по индексу.
+
+    """
+
+    history = HistoryLog(path=path, key=KEY)
+    assert len(history) == len(MESSAGES)
+    assert history.get_range(start=0, stop=len(MESSAGES)) == MESSAGES
+    assert history.find_time(timestamp=1004.5) == 5
+    history.close()
+
+
+def test_truncated_index_entry(path):
+    """
+    Неполная запись индекса и хвост журнала, на который она указывала, отбрасываются.
+
+    """
+
+    truncate(file_path=f'{path}.idx', size=len(MESSAGES) * INDEX_ENTRY_SIZE - 5)
+    history = HistoryLog(path=path, key=KEY)
+    assert len(history) == len(MESSAGES) - 1
+    assert history.get_range(start=0, stop=len(MESSAGES)) == MESSAGES[:-1]
+    assert history.append(message=MESSAGES[-1]) == len(MESSAGES) - 1
+    history.close()
+    history = HistoryLog(path=path, key=KEY)
+    assert history.get_range(start=0, stop=len(MESSAGES)) == MESSAGES
+    history.close()
+
+
+def test_truncated_log(path):
+    """
+    Записи индекса, указывающие за конец журнала, отбрасываются.
+
+    """
+
+    truncate(file_path=f'{path}.log', size=os.path.getsize(f'{path}.log') - 3)
+    history = HistoryLog(path=path, key=KEY)
+    assert len(history) == len(MESSAGES) - 1
+    assert history.get_range(start=0, stop=len(MESSAGES)) == MESSAGES[:-1]
+    history.close()
+    assert os.path.getsize(f'{path}.idx') == (len(MESSAGES) - 1) * INDEX_ENTRY_SIZE
+
+
+def test_empty_log(path):
+    """
+    При пустом журнале индекс очищается целиком.
+
+    """
+
+    truncate(file_path=f'{path}.log', size=0)
+    history = HistoryLog(path=path, key=KEY)
+    assert len(history) == 0
+    history.close()
+    assert os.path.getsize(f'{path}.idx') == 0
+
+
+def test_tampered_record(path):
+    """
+    Изменение байта записи журнала обнаруживается только при чтении этой записи.
+
+    """
+
+    with open(f'{path}.idx', 'rb') as file:
+        offset = INDEX_ENTRY.unpack_from(file.read(), 3 * INDEX_ENTRY_SIZE)[0]
+    with open(f'{path}.log', 'rb') as file:
+        file.seek(offset + 20)
+        byte = file.read(1)
+    patch(file_path=f'{path}.log', offset=offset + 20, data=bytes([byte[0] ^ 1]))
+    history = HistoryLog(path=path, key=KEY)
+    with pytest.raises(MGMAuthenticationError):
+        history.get(seq=3)
+    assert history.get(seq=4) == MESSAGES[4]
+    history.close()
+
+
+def test_tampered_index(path):
+    """
+    Подмена времени или перестановка записей в индексе обнаруживается по ассоциированным данным.
+
+    """
+
+    with open(f'{path}.idx', 'rb') as file:
+        index = file.read()
+    offset, _, length, sender = INDEX_ENTRY.unpack_from(index, 0)
+    patch(file_path=f'{path}.idx', offset=0, data=INDEX_ENTRY.pack(offset, 0.0, length, sender))
+    patch(file_path=f'{path}.idx', offset=INDEX_ENTRY_SIZE, data=index[2 * INDEX_ENTRY_SIZE:3 * INDEX_ENTRY_SIZE])
+    patch(file_path=f'{path}.idx', offset=2 * INDEX_ENTRY_SIZE, data=index[INDEX_ENTRY_SIZE:2 * INDEX_ENTRY_SIZE])
+    history = HistoryLog(path=path, key=KEY)
+    for seq in range(3):
+        with pytest.raises(MGMAuthenticationError):
+            history.get(seq=seq)
+    assert history.get(seq=3) == MESSAGES[3]
+    history.close()
+
+
+def test_write_error(path, monkeypatch):
+    """
+    После ошибки записи flush и append вызывают исключение, а не блокируются.
+
+    """
+
+    history = HistoryLog(path=path, key=KEY)
+
+    def fail(messages):
+        raise OSError(28, 'No space left on device')
+
+    monkeypatch.setattr(history, 'write_records', fail)
+    history.append(message=MESSAGES[0])
+    with pytest.raises(OSError):
+        history.flush()
+    with pytest.raises(OSError):
+        history.append(message=MESSAGES[1])
+    assert len(history) == len(MESSAGES)
+    history.close()
+    history = HistoryLog(path=path, key=KEY)
+    assert history.get_range(start=0, stop=len(MESSAGES)) == MESSAGES
+    history.close()
@@ -0,0 +1,56 @@
+import pytest
+from gost import padding
+
+
+@pytest.mark.parametrize('length', [0, 1, 15, 16, 17, 31, 32, 100])
+def test_round_trip(length):
+    """
+    Дополнение всегда удлиняет сообщение до кратной длине блока длины и однозначно снимается.
+
+    """
+
+    data = bytes(range(1, length + 1))
+    padded = padding.pad(data=data)
+    assert len(padded) == padding.padded_size(length=length)
+    assert len(padded) % padding.BLOCK_SIZE == 0 and len(padded) > length
+    assert bytes(padding.unpad(data=padded)) == data
+
+
+def test_full_block_gets_padding_block():
+    """
+    К сообщению длиной ровно в блок приписывается целый блок дополнения.
+
+    """
+
+    padded = padding.pad(data=b'A' * 16)
+    assert padded == b'A' * 16 + padding.PADDING_MARKER + bytes(15)
+    assert bytes(padding.unpad(data=padded)) == b'A' * 16
+
+
+@pytest.mark.parametrize('data', [b'\x00' * 5, b'\x80', b'text\x80', b'\x80\x00\x00', b'\x00' * 15 + b'\x80'])
+def test_ambiguous_tails(data):
+    """
+    Сообщения, оканчивающиеся нулями или байтом 0x80, восстанавливаются без потерь.
+
+    """
+
+    assert bytes(padding.unpad(data=padding.pad(data=data))) == data
+
+
+@pytest.mark.parametrize('data', [
+    b'',
+    b'\x80' + bytes(14),
+    bytes(16),
+    b'A' * 16,
+    b'\x80' + bytes(14) + b'\x01',
+    b'A' * 15,
+    b'A' * 16 + b'\x80' + bytes(13) + b'\x00\x01',
+])
+def test_invalid_padding(data):
+    """
+    Пустые данные, данные некратной длины и последний блок без корректного дополнения отклоняются.
+
+    """
+
+    with pytest.raises(ValueError):
+        padding.unpad(data=data)
@@ -0,0 +1,77 @@
+import os
+import pytest
+from app import framing
+from app.session import ChatSession
+
+
+MASTER = 'ab' * 32
+
+
+def start_pair(mode: str, compression: bool = False):
+    """
+    Пара сессий клиента и сервера с общим мастер-ключом и согласованным режимом.
+
+    """
+
+    client = ChatSession(role=ChatSession.CLIENT, reservoir_low_watermark=None, compression=compression)
+    server = ChatSession(role=ChatSession.SERVER, reservoir_low_watermark=None, compression=compression)
+    client.start(hex_master=MASTER, companion_modes=[mode])
+    server.start(hex_master=MASTER, companion_modes=[mode])
+    return client, server
+
+
+def receive(session: ChatSession, writes) -> list:
+    """
+    Разбор записей в сокет на кадры и их дешифрование.
+
+    """
+
+    decoder = framing.FrameDecoder()
+    return [session.decode_message(frame=frame) for data in writes for frame in decoder.feed(data=data)]
+
+
+@pytest.mark.parametrize('mode', ChatSession.SUPPORTED_MODES)
+def test_round_trip(mode, monkeypatch):
+    """
+    Короткие и потоково шифруемые длинные сообщения восстанавливаются в порядке отправки.
+
+    """
+
+    monkeypatch.setattr(ChatSession, 'STREAM_THRESHOLD', 1024)
+    client, server = start_pair(mode=mode)
+    messages = ['привет', os.urandom(3000).hex(), '', 'ё' * 777]
+    assert receive(session=server, writes=client.iterate_writes(messages=messages)) == messages
+    client.stop()
+    server.stop()
+
+
+@pytest.mark.parametrize('mode', ChatSession.SUPPORTED_MODES)
+def test_oversized_message_rejected(mode, monkeypatch):
+    """
+    Сообщение длиннее кадра отклоняется у отправителя, не нарушая последующие сообщения (в том числе номера MGM).
+
+    """
+
+    monkeypatch.setattr(ChatSession, 'STREAM_THRESHOLD', 1024)
+    monkeypatch.setattr(framing, 'MAX_FRAME_SIZE', 4096)
+    client, server = start_pair(mode=mode)
+    big = 'x' * 5000
+    with pytest.raises(framing.FrameError):
+        client.encode_message(msg=big)
+    rejected = []
+    writes = list(client.iterate_writes(messages=['before', big, 'after'], rejected=rejected))
+    assert rejected == [big]
+    assert receive(session=server, writes=writes) == ['before', 'after']
+    client.stop()
+    server.stop()
+
+
+def test_no_common_mode():
+    """
+    Без общего режима шифрования сессия не запускается (исключение ValueError).
+
+    """
+
+    client = ChatSession(role=ChatSession.CLIENT, reservoir_low_watermark=None)
+    with pytest.raises(ValueError):
+        client.start(hex_master=MASTER, companion_modes=['foo'])